@@ -0,0 +1,125 @@
+"""Bounded, TTL'd in-memory map shared by the serve registry and the idempotency cache.
+
+Values are NamedTuples whose last field is ``ts`` (epoch seconds). Entries are kept in write
+order, so expiry and the size bound both trim from the front like a ring buffer: entries older
+than ``ttl_s`` expire, and past ``max_entries`` the oldest are evicted.
+
+The map lives in one process. With several workers each has its own map, and an entry is
+only seen by the worker that wrote it. ``save``/``load`` (JSON rows, written atomically) exist
+for dev restarts: callers save on graceful shutdown and load on startup, so entries written
+since the last clean shutdown are lost on a crash.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+V = TypeVar("V", bound=tuple)
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_flag(name: str) -> bool:
+    val = os.environ.get(name, "").strip().lower()
+    return val in ("1", "true", "yes", "on")
+
+
+class BoundedTTLMap(ABC, Generic[V]):
+    """Subclasses add their own counters and implement ``_parse_row`` for ``load``."""
+
+    def __init__(self, *, max_entries: int, ttl_s: float) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = max(1.0, ttl_s)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, V]" = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+
+    def _trim(self, now: float) -> None:
+        # Caller holds the lock
+        entries = self._entries
+        cutoff = now - self.ttl_s
+        while entries and next(iter(entries.values()))[-1] < cutoff:
+            entries.popitem(last=False)
+            self.expired += 1
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evicted += 1
+
+    def get(self, key: str) -> Optional[V]:
+        """The live entry for ``key``, or None when unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[-1] < time.time() - self.ttl_s:
+            return None
+        return entry
+
+    def put_many(self, items: Iterable[Tuple[str, V]]) -> int:
+        """Write entries (one lock acquisition); returns how many were written."""
+        n = 0
+        with self._lock:
+            entries = self._entries
+            for key, value in items:
+                entries[key] = value
+                entries.move_to_end(key)  # an overwrite is the newest entry
+                n += 1
+            self._trim(time.time())
+        return n
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "capacity": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def save(self, path: Path) -> int:
+        """Write live entries as compact rows ``[key, *value]``; returns the row count."""
+        with self._lock:
+            self._trim(time.time())
+            rows = [[key, *value] for key, value in self._entries.items()]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(rows, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+        return len(rows)
+
+    @abstractmethod
+    def _parse_row(self, row: List[Any]) -> V:
+        """Turn a saved ``row[1:]`` back into a value; raise TypeError/ValueError to skip it."""
+
+    def load(self, path: Path) -> int:
+        """Restore rows saved by ``save`` (expired rows are dropped); returns the size after."""
+        try:
+            rows = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return 0
+        loaded = []
+        for row in rows if isinstance(rows, list) else ():
+            try:
+                loaded.append((str(row[0]), self._parse_row(row[1:])))
+            except (TypeError, ValueError, IndexError):
+                continue
+        loaded.sort(key=lambda r: r[1][-1])
+        with self._lock:
+            for key, value in loaded:
+                self._entries[key] = value
+            self._trim(time.time())
+            return len(self._entries)
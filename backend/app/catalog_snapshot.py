@@ -0,0 +1,219 @@
+"""Compiled catalog snapshot: all canonical items in one versioned, checksummed file.
+
+Layout (big-endian):
+- fixed header: magic ``EV3CATSN`` | format (u16) | reserved (u16) | index_len (u32) | body_len (u64) | sha256 (32 bytes)
+- index: UTF-8 JSON ``{"format", "count", "built_at", "source_dir_mtime_ns", "entries": [...], "skipped": [...]}``
+- body: UTF-8 JSON array of the canonical documents (compact separators)
+
+Each index entry records the item's metadata and its byte range inside the body:
+``[id, type, skill, difficulty, template_id, status, file_name, mtime_ns, size, offset, length]``.
+The whole body parses with a single ``json.loads``; a single item can be read by slicing
+``body[offset:offset + length]``. The sha256 covers index + body. ``skipped`` lists
+``[file_name, mtime_ns, size]`` for source files that did not parse, so freshness checks can
+tell them apart from files added after the build.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, NamedTuple, Tuple
+
+MAGIC = b"EV3CATSN"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(">8sHHIQ32s")
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is missing, corrupt, stale, or of an unknown format."""
+
+
+class SnapshotEntry(NamedTuple):
+    id: str
+    type: str | None
+    skill: str | None
+    difficulty: str | None
+    template_id: str | None
+    status: str | None
+    file_name: str
+    mtime_ns: int
+    size: int
+    offset: int
+    length: int
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def build_snapshot(canonical_dir: Path, out_path: Path) -> int:
+    """Compile ``canonical_dir/*.json`` into ``out_path``; returns the number of items written.
+
+    Unparseable files are skipped (same as the per-file loader). The file is written to a
+    temporary sibling and renamed so readers never observe a partial snapshot.
+    """
+    entries: List[list] = []
+    skipped: List[list] = []
+    chunks: List[bytes] = []
+    offset = 1  # after the opening "["
+    for p in sorted(canonical_dir.glob("*.json")):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        try:
+            obj = json.loads(p.read_text(encoding="utf-8"))
+        except Exception:
+            obj = None
+        if not isinstance(obj, dict):
+            skipped.append([p.name, st.st_mtime_ns, st.st_size])
+            continue
+        doc = _dumps(obj)
+        tags = obj.get("tags") or {}
+        entries.append([
+            obj.get("id") if isinstance(obj.get("id"), str) else "",
+            obj.get("type"),
+            tags.get("skill"),
+            tags.get("difficulty"),
+            obj.get("template_id"),
+            obj.get("status"),
+            p.name,
+            st.st_mtime_ns,
+            st.st_size,
+            offset,
+            len(doc),
+        ])
+        chunks.append(doc)
+        offset += len(doc) + 1  # account for the "," (or closing "]")
+    body = b"[" + b",".join(chunks) + b"]"
+    index = _dumps({
+        "format": FORMAT_VERSION,
+        "count": len(entries),
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "source_dir_mtime_ns": canonical_dir.stat().st_mtime_ns,
+        "entries": entries,
+        "skipped": skipped,
+    })
+    digest = hashlib.sha256(index + body).digest()
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(index), len(body), digest)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(header)
+        f.write(index)
+        f.write(body)
+    os.replace(tmp, out_path)
+    return len(entries)
+
+
+def _read_raw(path: Path) -> Tuple[Dict[str, Any], bytes]:
+    try:
+        data = path.read_bytes()
+    except OSError as exc:
+        raise SnapshotError(f"unreadable: {exc}") from exc
+    if len(data) < _HEADER.size:
+        raise SnapshotError("truncated header")
+    magic, fmt, _reserved, index_len, body_len, digest = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or fmt != FORMAT_VERSION:
+        raise SnapshotError("unknown format")
+    start = _HEADER.size
+    if len(data) != start + index_len + body_len:
+        raise SnapshotError("length mismatch")
+    payload = memoryview(data)[start:]
+    if hashlib.sha256(payload).digest() != digest:
+        raise SnapshotError("checksum mismatch")
+    index = json.loads(bytes(payload[:index_len]))
+    body = bytes(payload[index_len:])
+    return index, body
+
+
+def _check_fresh(index: Dict[str, Any], canonical_dir: Path | None) -> None:
+    """Compare every source file's (mtime_ns, size) with the index in one ``os.scandir`` pass.
+
+    In-place edits do not touch the directory mtime, so the directory alone is not enough.
+    """
+    if canonical_dir is None:
+        return
+    built = {e[6]: (e[7], e[8]) for e in index.get("entries") or []}
+    built.update((name, (mtime_ns, size)) for name, mtime_ns, size in index.get("skipped") or [])
+    try:
+        with os.scandir(canonical_dir) as it:
+            current = {
+                d.name: (st.st_mtime_ns, st.st_size)
+                for d in it
+                if d.name.endswith(".json") and not d.name.startswith(".") and d.is_file()  # same set as glob("*.json")
+                for st in (d.stat(),)
+            }
+    except OSError as exc:
+        raise SnapshotError(f"canonical directory unreadable: {exc}") from exc
+    if current != built:
+        changed = sorted(n for n in built.keys() | current.keys() if built.get(n) != current.get(n))
+        raise SnapshotError(f"stale ({len(changed)} source file(s) changed since build, e.g. {changed[0]})")
+
+
+def read_snapshot(path: Path, *, canonical_dir: Path | None = None) -> Tuple[List[Dict[str, Any]], List[SnapshotEntry]]:
+    """Load and verify a snapshot; returns ``(items, entries)`` in the same order.
+
+    When ``canonical_dir`` is given, a snapshot is rejected as stale if any source file was
+    added, removed, or changed (mtime or size) since the build.
+    """
+    index, body = _read_raw(path)
+    _check_fresh(index, canonical_dir)
+    items = json.loads(body)
+    entries = [SnapshotEntry(*e) for e in index.get("entries") or []]
+    if not isinstance(items, list) or len(items) != len(entries):
+        raise SnapshotError("count mismatch")
+    return items, entries
+
+
+def read_snapshot_index(path: Path, *, canonical_dir: Path | None = None) -> Tuple[List[SnapshotEntry], int]:
+    """Verify a snapshot without keeping the body resident; returns ``(entries, body_start)``.
+
+    ``body_start`` is the absolute file offset of the body, so an item's document lives at
+    ``body_start + entry.offset`` for ``entry.length`` bytes. The checksum is computed in
+    fixed-size chunks so memory stays bounded by the index size.
+    """
+    try:
+        with path.open("rb") as f:
+            return read_snapshot_index_from(f, canonical_dir=canonical_dir)
+    except OSError as exc:
+        raise SnapshotError(f"unreadable: {exc}") from exc
+
+
+def read_snapshot_index_from(f: BinaryIO, *, canonical_dir: Path | None = None) -> Tuple[List[SnapshotEntry], int]:
+    """``read_snapshot_index`` over an already open file (read from its start).
+
+    Callers that keep the handle for body reads verify through it, so the checked bytes are
+    the ones later read even if the path is replaced in between.
+    """
+    try:
+        f.seek(0)
+        head = f.read(_HEADER.size)
+        if len(head) < _HEADER.size:
+            raise SnapshotError("truncated header")
+        magic, fmt, _reserved, index_len, body_len, digest = _HEADER.unpack(head)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise SnapshotError("unknown format")
+        index_bytes = f.read(index_len)
+        hasher = hashlib.sha256(index_bytes)
+        remaining = body_len
+        while remaining > 0:
+            chunk = f.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+        if len(index_bytes) != index_len or remaining != 0 or f.read(1):
+            raise SnapshotError("length mismatch")
+    except OSError as exc:
+        raise SnapshotError(f"unreadable: {exc}") from exc
+    if hasher.digest() != digest:
+        raise SnapshotError("checksum mismatch")
+    index = json.loads(index_bytes)
+    _check_fresh(index, canonical_dir)
+    entries = [SnapshotEntry(*e) for e in index.get("entries") or []]
+    return entries, _HEADER.size + index_len
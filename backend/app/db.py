@@ -1,66 +1,243 @@
 import os
 import sqlite3
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Callable
+from typing import Callable, List, Optional, Tuple
 
 ROOT = Path(__file__).resolve().parents[2]
 DEV_DIR = ROOT / "dev_state"
 DB_PATH = DEV_DIR / "app.db"
 
+# One reusable connection per thread (sync routes run on a bounded threadpool)
+_local = threading.local()
+
 
 def _get_db_path() -> Path:
     DEV_DIR.mkdir(parents=True, exist_ok=True)
     return DB_PATH
 
 
+def _pool_enabled() -> bool:
+    val = os.environ.get("DB_POOL", "1").strip().lower()
+    return val in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def open_connection(path: Optional[Path] = None, *, busy_ms: Optional[int] = None) -> sqlite3.Connection:
+    """Open a new tuned connection (not pooled; the caller owns it) to ``path`` (default: the dev DB).
+
+    Tuning: WAL, synchronous=NORMAL, busy timeout, larger statement cache. Overrides:
+    DB_JOURNAL_MODE (default WAL), DB_SYNCHRONOUS (default NORMAL), DB_BUSY_TIMEOUT_MS
+    (default 5000; ``busy_ms`` wins), DB_CACHED_STATEMENTS (default 256).
+    """
+    if path is None:
+        path = _get_db_path()
+    busy_ms = max(0, _env_int("DB_BUSY_TIMEOUT_MS", 5000) if busy_ms is None else busy_ms)
+    conn = sqlite3.connect(path, timeout=busy_ms / 1000.0, cached_statements=max(0, _env_int("DB_CACHED_STATEMENTS", 256)))
+    conn.row_factory = sqlite3.Row
+    journal = os.environ.get("DB_JOURNAL_MODE", "WAL").strip().upper() or "WAL"
+    synchronous = os.environ.get("DB_SYNCHRONOUS", "NORMAL").strip().upper() or "NORMAL"
+    if journal in ("WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"):
+        conn.execute(f"PRAGMA journal_mode={journal}")
+    if synchronous in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    conn.execute(f"PRAGMA busy_timeout={busy_ms}")
+    return conn
+
+
 def connect() -> sqlite3.Connection:
+    """Return this thread's pooled connection (opened on first use).
+
+    Callers keep using ``with connect() as conn:``; the context manager commits or rolls back
+    but does not close, so the connection and its prepared-statement cache are reused.
+    DB_POOL=0 restores a fresh, untuned connection per call.
+    """
     path = _get_db_path()
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
+    if not _pool_enabled():
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    key = (os.getpid(), path)  # never reuse a connection inherited across fork or for another file
+    cached = getattr(_local, "conn", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    conn = open_connection(path)
+    _local.conn = (key, conn)
     return conn
 
 
-def ensure_tables() -> None:
-    try:
-        with connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS selection_state (
-                  session_id TEXT PRIMARY KEY,
-                  last_type TEXT,
-                  active_type_norm TEXT,
-                  serves_in_current_type INTEGER,
-                  recent_ids_json TEXT,
-                  updated_at TEXT
-                )
-                """
-            )
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS attempt_events (
-                  id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  ts TEXT NOT NULL,
-                  session_id TEXT NOT NULL,
-                  serve_id TEXT,
-                  attempt_id TEXT,
-                  item_id TEXT,
-                  item_type TEXT,
-                  action TEXT NOT NULL CHECK(action IN ('served','answered')),
-                  correct INTEGER
+def close_connection() -> None:
+    """Close the calling thread's pooled connection, if any."""
+    cached = getattr(_local, "conn", None)
+    _local.conn = None
+    if cached is not None:
+        try:
+            cached[1].close()
+        except Exception:
+            pass
+
+
+def _has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    if not _has_column(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _m1_baseline(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS selection_state (
+          session_id TEXT PRIMARY KEY,
+          last_type TEXT,
+          active_type_norm TEXT,
+          serves_in_current_type INTEGER,
+          recent_ids_json TEXT,
+          updated_at TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS attempt_events (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          ts TEXT NOT NULL,
+          session_id TEXT NOT NULL,
+          serve_id TEXT,
+          attempt_id TEXT,
+          item_id TEXT,
+          item_type TEXT,
+          action TEXT NOT NULL CHECK(action IN ('served','answered')),
+          correct INTEGER
+        )
+        """
+    )
+    # Dev DBs created before serve/attempt ids were tracked
+    _add_column(conn, "attempt_events", "serve_id", "TEXT")
+    _add_column(conn, "attempt_events", "attempt_id", "TEXT")
+
+
+def _m2_shared_selection_state(conn: sqlite3.Connection) -> None:
+    _add_column(conn, "selection_state", "playlist_ids_json", "TEXT")
+    # Optimistic concurrency for shared (multi-worker) selection state
+    _add_column(conn, "selection_state", "version", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _m3_event_indexes(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attempt_events_session ON attempt_events(session_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attempt_events_item ON attempt_events(item_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attempt_events_ts ON attempt_events(ts)")
+
+
+# Progress rollup key: same normalization as /api/progress applies to raw events
+ROLLUP_TYPE_SQL = "UPPER(COALESCE(NULLIF(item_type, ''), 'unknown'))"
+
+
+def backfill_progress_rollup(conn: sqlite3.Connection) -> int:
+    """Rebuild progress_rollup from attempt_events (caller commits); returns rows written."""
+    conn.execute("DELETE FROM progress_rollup")
+    cur = conn.execute(
+        f"""
+        INSERT INTO progress_rollup(session_id, item_type, attempts, correct)
+        SELECT session_id, {ROLLUP_TYPE_SQL},
+               SUM(action = 'answered'), SUM(action = 'answered' AND correct = 1)
+        FROM attempt_events
+        GROUP BY session_id, {ROLLUP_TYPE_SQL}
+        """
+    )
+    return cur.rowcount
+
+
+def _m4_progress_rollup(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS progress_rollup (
+          session_id TEXT NOT NULL,
+          item_type TEXT NOT NULL,
+          attempts INTEGER NOT NULL DEFAULT 0,
+          correct INTEGER NOT NULL DEFAULT 0,
+          PRIMARY KEY (session_id, item_type)
+        ) WITHOUT ROWID
+        """
+    )
+    backfill_progress_rollup(conn)
+
+
+def _m5_answer_latency(conn: sqlite3.Connection) -> None:
+    # Time from serve to answer (ms), attributed from the serve registry; NULL when unknown
+    _add_column(conn, "attempt_events", "answer_ms", "INTEGER")
+
+
+def _m6_rate_buckets(conn: sqlite3.Connection) -> None:
+    # Token buckets shared by worker processes (RATE_LIMIT_BACKEND=sqlite); full buckets are purged
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rate_buckets (
+          key TEXT PRIMARY KEY,
+          tokens REAL NOT NULL,
+          ts REAL NOT NULL,
+          full_at REAL NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+
+
+# Ordered, append-only: never edit an applied migration, add a new one instead
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "baseline tables", _m1_baseline),
+    (2, "shared selection state columns", _m2_shared_selection_state),
+    (3, "attempt_events indexes", _m3_event_indexes),
+    (4, "progress rollup", _m4_progress_rollup),
+    (5, "attempt_events answer latency", _m5_answer_latency),
+    (6, "rate limit buckets", _m6_rate_buckets),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TEXT NOT NULL)")
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return int(row[0] or 0)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations, each in its own write transaction; returns the schema version.
+
+    BEGIN IMMEDIATE takes the write lock before re-reading the version, so concurrent workers
+    starting up apply each migration exactly once.
+    """
+    current = schema_version(conn)
+    conn.commit()
+    for version, name, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) < version:
+                apply(conn)
+                conn.execute(
+                    "INSERT INTO schema_version(version, name, applied_at) VALUES (?, ?, ?)",
+                    (version, name, datetime.now(timezone.utc).isoformat()),
                 )
-                """
-            )
-            # Best-effort add columns for existing dev DBs
-            try:
-                cur.execute("ALTER TABLE attempt_events ADD COLUMN serve_id TEXT")
-            except Exception:
-                pass
-            try:
-                cur.execute("ALTER TABLE attempt_events ADD COLUMN attempt_id TEXT")
-            except Exception:
-                pass
             conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
+    return current
+
+
+def ensure_tables() -> None:
+    try:
+        migrate(connect())
     except Exception:
         # Dev-only; fail silently
         pass
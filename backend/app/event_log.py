@@ -0,0 +1,295 @@
+"""Segmented, indexed NDJSON event log for the file persistence backend.
+
+Layout under ``dev_state/events/``:
+- ``events-000001.ndjson``: append-only segments, one JSON event per line. The active (last)
+  segment rotates once it exceeds EVENT_SEGMENT_BYTES (default 8 MiB).
+- ``events-000001.idx.json``: sidecar index ``{"size": covered_bytes, "sessions": {session_id: [offsets]}}``.
+  Closed segments get their index at rotation. The active segment's index is written on close;
+  after a crash, whatever lies beyond ``size`` is rescanned on open.
+
+The active segment stays open with a buffered writer (flushed once per appended batch), and
+per-session reads seek straight to the indexed line offsets instead of parsing the whole log.
+A legacy single-file ``dev_state/events.ndjson`` is adopted as segment 0 on first open.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+_SEGMENT_RE = re.compile(r"^events-(\d{6})\.ndjson$")
+
+
+def segment_bytes_from_env() -> int:
+    try:
+        return max(1024, int(os.environ.get("EVENT_SEGMENT_BYTES", str(8 << 20))))
+    except ValueError:
+        return 8 << 20
+
+
+def _segment_path(directory: Path, number: int) -> Path:
+    return directory / f"events-{number:06d}.ndjson"
+
+
+def _index_path(segment: Path) -> Path:
+    return segment.with_name(segment.name[: -len(".ndjson")] + ".idx.json")
+
+
+def _parse_ts(value: Any) -> Optional[datetime]:
+    try:
+        ts = datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _unlink_segment(segment: Path) -> None:
+    for p in (segment, _index_path(segment)):
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+
+class _Segment:
+    __slots__ = ("number", "path", "size", "sessions")
+
+    def __init__(self, number: int, path: Path) -> None:
+        self.number = number
+        self.path = path
+        self.size = 0  # bytes covered by ``sessions``
+        self.sessions: Dict[str, List[int]] = {}
+
+    def load_index(self) -> None:
+        try:
+            data = json.loads(_index_path(self.path).read_text(encoding="utf-8"))
+            size = int(data.get("size") or 0)
+            sessions = data.get("sessions") or {}
+        except Exception:
+            size, sessions = 0, {}
+        try:
+            actual = self.path.stat().st_size
+        except OSError:
+            actual = 0
+        if size > actual or not isinstance(sessions, dict):
+            size, sessions = 0, {}  # segment was truncated/rewritten: rebuild
+        self.size = size
+        self.sessions = {str(k): [int(o) for o in v] for k, v in sessions.items() if isinstance(v, list)}
+        if actual > self.size:
+            self.scan_tail()
+
+    def scan_tail(self) -> None:
+        """Index complete lines past ``size`` (after a crash or for an adopted legacy file)."""
+        with self.path.open("rb") as f:
+            f.seek(self.size)
+            offset = self.size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial last line: leave it for the next scan
+                try:
+                    sid = json.loads(line).get("session_id")
+                except Exception:
+                    sid = None
+                if isinstance(sid, str) and sid:
+                    self.sessions.setdefault(sid, []).append(offset)
+                offset += len(line)
+            self.size = offset
+
+    def save_index(self) -> None:
+        target = _index_path(self.path)
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_text(json.dumps({"size": self.size, "sessions": self.sessions}, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, target)
+
+
+class SegmentedEventLog:
+    def __init__(self, directory: Path, *, segment_bytes: int = 8 << 20, legacy_path: Optional[Path] = None) -> None:
+        self.directory = directory
+        self.segment_bytes = max(1024, segment_bytes)
+        self._lock = threading.Lock()
+        self._writer: Optional[BinaryIO] = None
+        directory.mkdir(parents=True, exist_ok=True)
+        if legacy_path is not None and legacy_path.exists() and not any(directory.glob("events-*.ndjson")):
+            os.replace(legacy_path, _segment_path(directory, 0))
+        self._segments: List[_Segment] = []
+        for p in sorted(directory.glob("events-*.ndjson")):
+            m = _SEGMENT_RE.match(p.name)
+            if m:
+                seg = _Segment(int(m.group(1)), p)
+                seg.load_index()
+                self._segments.append(seg)
+        if not self._segments:
+            self._segments.append(_Segment(1, _segment_path(directory, 1)))
+
+    # --- Writing ---
+    def _active(self) -> _Segment:
+        return self._segments[-1]
+
+    def _open_writer(self) -> BinaryIO:
+        if self._writer is None:
+            seg = self._active()
+            self._writer = seg.path.open("ab", buffering=1 << 16)
+            if self._writer.tell() > seg.size:
+                self._writer.write(b"\n")  # terminate a torn tail line (never indexed)
+            seg.size = self._writer.tell()
+        return self._writer
+
+    def _rotate(self) -> None:
+        seg = self._active()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        seg.save_index()
+        self._segments.append(_Segment(seg.number + 1, _segment_path(self.directory, seg.number + 1)))
+
+    def append(self, events: List[Dict[str, Any]]) -> None:
+        """Append one batch (buffered writes + one flush) and index it by session.
+
+        A batch that crosses EVENT_SEGMENT_BYTES continues in a new segment.
+        """
+        if not events:
+            return
+        with self._lock:
+            f = self._open_writer()
+            seg = self._active()
+            offset = seg.size
+            for e in events:
+                line = json.dumps(e, ensure_ascii=False).encode("utf-8") + b"\n"
+                if offset > 0 and offset + len(line) > self.segment_bytes:
+                    f.flush()
+                    seg.size = offset
+                    self._rotate()
+                    f = self._open_writer()
+                    seg = self._active()
+                    offset = seg.size
+                sid = e.get("session_id")
+                if isinstance(sid, str) and sid:
+                    seg.sessions.setdefault(sid, []).append(offset)
+                f.write(line)
+                offset += len(line)
+            f.flush()  # visible to readers (not fsynced)
+            seg.size = offset
+
+    # --- Reading ---
+    def read_session(self, session_id: str) -> List[Dict[str, Any]]:
+        """All events for one session, in append order, read by offset."""
+        return list(self.iter_session(session_id))
+
+    def iter_session(self, session_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream one session's events in append order (offsets snapshotted up front)."""
+        with self._lock:
+            plan = [(seg.path, list(seg.sessions.get(session_id, ()))) for seg in self._segments]
+        for path, offsets in plan:
+            if not offsets:
+                continue
+            try:
+                with path.open("rb") as f:
+                    for offset in offsets:
+                        f.seek(offset)
+                        try:
+                            event = json.loads(f.readline())
+                        except Exception:
+                            continue
+                        yield event
+            except OSError:
+                continue
+
+    def iter_range(self, start: Optional[str], end: Optional[str]) -> Iterator[Dict[str, Any]]:
+        """Stream events with ``start <= ts < end`` across all sessions, in append order.
+
+        Scans every segment line by line up to its indexed size (constant memory).
+        """
+        lo = _parse_ts(start) if start else None
+        hi = _parse_ts(end) if end else None
+        with self._lock:
+            plan = [(seg.path, seg.size) for seg in self._segments]
+        for path, size in plan:
+            try:
+                with path.open("rb") as f:
+                    read = 0
+                    for line in f:
+                        read += len(line)
+                        if read > size:
+                            break
+                        try:
+                            event = json.loads(line)
+                        except Exception:
+                            continue
+                        ts = _parse_ts(event.get("ts"))
+                        if ts is None or (lo is not None and ts < lo) or (hi is not None and ts >= hi):
+                            continue
+                        yield event
+            except OSError:
+                continue
+
+    # --- Lifecycle ---
+    def close(self) -> None:
+        """Flush the writer and persist the active segment's index."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            seg = self._active()
+            if seg.path.exists():
+                seg.save_index()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "bytes": sum(seg.size for seg in self._segments),
+                "sessions": len({sid for seg in self._segments for sid in seg.sessions}),
+                "segment_bytes": self.segment_bytes,
+            }
+
+    def compact(self, *, retain_days: Optional[float] = None, max_segments: Optional[int] = None) -> Dict[str, int]:
+        """Rewrite the log into fresh, full segments, dropping events older than ``retain_days``
+        and then whole oldest segments beyond ``max_segments`` (their counts cover events with a
+        session id). Run with the backend stopped.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retain_days) if retain_days is not None else None
+        kept = dropped = 0
+        self.close()
+        with self._lock:
+            old = list(self._segments)
+            self._segments = [_Segment(old[-1].number + 1, _segment_path(self.directory, old[-1].number + 1))]
+        batch: List[Dict[str, Any]] = []
+        for seg in old:
+            try:
+                with seg.path.open("rb") as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except Exception:
+                            continue  # torn/blank line
+                        ts = _parse_ts(event.get("ts"))
+                        if cutoff is not None and ts is not None and ts < cutoff:
+                            dropped += 1
+                            continue
+                        batch.append(event)
+                        if len(batch) >= 1000:
+                            self.append(batch)
+                            kept += len(batch)
+                            batch = []
+            except OSError:
+                continue
+        self.append(batch)
+        kept += len(batch)
+        self.close()
+        for seg in old:
+            _unlink_segment(seg.path)
+        if max_segments is not None and max_segments > 0:
+            with self._lock:
+                excess = self._segments[:-max_segments]
+                self._segments = self._segments[-max_segments:]
+            for seg in excess:
+                n = sum(len(v) for v in seg.sessions.values())
+                kept -= n
+                dropped += n
+                _unlink_segment(seg.path)
+        return {"kept": kept, "dropped": dropped, "segments": len(self._segments)}
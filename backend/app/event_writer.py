@@ -0,0 +1,208 @@
+"""Group-commit event writer: takes attempt-event persistence off the request path.
+
+Routes enqueue events (stamped with their own ``ts``) and return; a background thread drains
+the queue and hands batches to a sink (``executemany`` + one commit for SQLite, one append for
+the NDJSON file). A batch is written when it reaches EVENT_BATCH_MAX events or EVENT_FLUSH_MS
+after its first event, whichever comes first.
+
+Backpressure when the queue holds EVENT_QUEUE_MAX events (EVENT_BACKPRESSURE):
+- ``block`` (default): wait for room, up to EVENT_BLOCK_MS, then drop
+- ``drop``: drop the new events immediately
+- ``sync``: write the new events inline on the caller's thread
+
+Readers call ``flush()`` first so a session always sees its own events. The app flushes and
+stops the writer on shutdown. EVENT_WRITER=0 writes inline as before.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+Sink = Callable[[List[Dict[str, Any]]], None]
+
+
+def is_enabled() -> bool:
+    val = os.environ.get("EVENT_WRITER", "1").strip().lower()
+    return val in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+class EventWriter:
+    def __init__(
+        self,
+        sink: Sink,
+        *,
+        max_queue: int = 10000,
+        batch_max: int = 500,
+        flush_ms: int = 5,
+        policy: str = "block",
+        block_ms: int = 50,
+    ) -> None:
+        self._sink = sink
+        self._max_queue = max(1, max_queue)
+        self._batch_max = max(1, batch_max)
+        self._flush_s = max(0, flush_ms) / 1000.0
+        self._policy = policy if policy in ("block", "drop", "sync") else "block"
+        self._block_s = max(0, block_ms) / 1000.0
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._flush_waiters = 0
+        # Sequence numbers: events accepted so far vs events handed to the sink
+        self._accepted = 0
+        self._done = 0
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+        self._inline = 0
+        self._flushes = 0
+        self._errors = 0
+
+    @classmethod
+    def from_env(cls, sink: Sink) -> "EventWriter":
+        return cls(
+            sink,
+            max_queue=_env_int("EVENT_QUEUE_MAX", 10000),
+            batch_max=_env_int("EVENT_BATCH_MAX", 500),
+            flush_ms=_env_int("EVENT_FLUSH_MS", 5),
+            policy=os.environ.get("EVENT_BACKPRESSURE", "block").strip().lower(),
+            block_ms=_env_int("EVENT_BLOCK_MS", 50),
+        )
+
+    def _ensure_started(self) -> None:
+        # Caller holds self._cond
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, events: List[Dict[str, Any]]) -> int:
+        """Enqueue events; returns how many were accepted (queued or written inline)."""
+        if not events:
+            return 0
+        inline: List[Dict[str, Any]] = []
+        with self._cond:
+            self._ensure_started()
+            deadline: Optional[float] = None
+            accepted = 0
+            for e in events:
+                while len(self._queue) >= self._max_queue and self._policy == "block":
+                    now = time.monotonic()
+                    deadline = deadline if deadline is not None else now + self._block_s
+                    if now >= deadline:
+                        break
+                    self._cond.wait(deadline - now)
+                if len(self._queue) >= self._max_queue:
+                    if self._policy == "sync":
+                        inline.append(e)
+                        continue
+                    self._dropped += 1
+                    continue
+                self._queue.append(e)
+                self._accepted += 1
+                accepted += 1
+            self._cond.notify_all()
+        if inline and self._write(inline):
+            with self._cond:
+                self._inline += len(inline)
+        return accepted + len(inline)
+
+    def try_submit(self, events: List[Dict[str, Any]]) -> bool:
+        """Enqueue all events only if they fit right now (never waits or writes inline).
+
+        For callers that must not block, such as the event loop; on False they fall back to ``submit``.
+        """
+        with self._cond:
+            if len(self._queue) + len(events) > self._max_queue:
+                return False
+            self._ensure_started()
+            self._queue.extend(events)
+            self._accepted += len(events)
+            self._cond.notify_all()
+        return True
+
+    def _write(self, batch: List[Dict[str, Any]]) -> bool:
+        try:
+            self._sink(batch)
+            return True
+        except Exception:
+            with self._cond:
+                self._errors += 1
+            return False
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue and self._stopping:
+                    return
+                # Group commit: give a short window for more events unless the batch is already full
+                if len(self._queue) < self._batch_max and not self._stopping and self._flush_s > 0:
+                    deadline = time.monotonic() + self._flush_s
+                    while len(self._queue) < self._batch_max and not self._stopping:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or self._flush_waiters:
+                            break  # window elapsed, or a reader is waiting in flush()
+                        self._cond.wait(remaining)
+                n = min(len(self._queue), self._batch_max)
+                batch = [self._queue.popleft() for _ in range(n)]
+                self._cond.notify_all()  # room for blocked producers
+            ok = self._write(batch)
+            with self._cond:
+                self._done += n  # failed batches count as done so flush() cannot hang
+                if ok:
+                    self._written += n
+                    self._batches += 1
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until every event accepted before this call has been written; False on timeout."""
+        with self._cond:
+            target = self._accepted
+            if self._done >= target:
+                return True
+            self._flushes += 1
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: self._done >= target, timeout)
+            finally:
+                self._flush_waiters -= 1
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Drain the queue, then stop the background thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "capacity": self._max_queue,
+                "policy": self._policy,
+                "accepted": self._accepted,
+                "written": self._written,
+                "batches": self._batches,
+                "inline": self._inline,
+                "dropped": self._dropped,
+                "flushes": self._flushes,
+                "errors": self._errors,
+            }
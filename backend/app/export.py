@@ -0,0 +1,58 @@
+"""Streaming CSV export helpers for attempt events (constant memory, proper CSV quoting)."""
+
+from __future__ import annotations
+
+import csv
+import io
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+EVENT_CSV_COLUMNS = ("ts", "session_id", "serve_id", "attempt_id", "item_id", "item_type", "action", "correct")
+
+
+def _csv_value(event: Dict[str, Any], column: str) -> str:
+    value = event.get(column)
+    if column == "correct":
+        return "" if value is None else ("true" if bool(value) else "false")
+    return "" if value is None else str(value)
+
+
+def event_csv_chunks(events: Iterable[Dict[str, Any]], *, rows_per_chunk: int = 500) -> Iterator[bytes]:
+    """Yield the header, then UTF-8 CSV chunks of up to ``rows_per_chunk`` rows each."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(EVENT_CSV_COLUMNS)
+    pending = 0
+    for event in events:
+        writer.writerow([_csv_value(event, c) for c in EVENT_CSV_COLUMNS])
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], *, level: int = 6) -> Iterator[bytes]:
+    """Gzip-compress a byte stream incrementally (one gzip member)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def normalize_ts_bound(value: Optional[str]) -> Optional[str]:
+    """Parse an ISO 8601 bound and render it like stored event timestamps (UTC isoformat).
+
+    Naive values are taken as UTC. Raises ValueError for unparseable input; None/"" pass through as None.
+    """
+    if not value:
+        return None
+    ts = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).isoformat()
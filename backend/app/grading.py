@@ -0,0 +1,87 @@
+"""Precompiled answer keys for step grading.
+
+A ``GradingKey`` is compiled once per catalog load (next to the item's ServeTemplate), so
+grading a submission is a couple of dict/set lookups instead of scanning steps and choices
+and re-stripping ``final.answer_text`` on every request. The rules match the original
+per-request grading:
+
+1. Target step: the step with the submitted ``step_id`` (first match), else the first step.
+2. If the step has ``correct_choice_id``, the choice id must equal it.
+3. Else the submitted choice's trimmed text must equal the trimmed ``final.answer_text``
+   (unresolved when the choice is not in the step or there is no final answer).
+4. Unresolved (or no steps): the same text match against legacy top-level ``choices``;
+   anything else is incorrect.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet, Hashable, List, NamedTuple, Optional, Tuple
+
+
+class StepKey(NamedTuple):
+    correct_choice_id: Optional[str]
+    accepted: FrozenSet[Hashable]  # choice ids whose trimmed text equals final.answer_text
+    known: FrozenSet[Hashable]  # choice ids whose text can be compared (empty without a final answer)
+
+
+def _text_keys(choices: Any, final_answer: str) -> Tuple[FrozenSet[Hashable], FrozenSet[Hashable]]:
+    texts: Dict[Hashable, str] = {}
+    for ch in choices if isinstance(choices, list) else ():
+        cid = ch.get("id") if isinstance(ch, dict) else None
+        if isinstance(cid, Hashable) and cid not in texts:  # first match wins, as before
+            texts[cid] = (ch.get("text") or "").strip()
+    if not final_answer:
+        return frozenset(), frozenset()
+    return frozenset(c for c, t in texts.items() if t == final_answer), frozenset(texts)
+
+
+class GradingKey:
+    """Answer key for one canonical item (request-independent; shared, do not mutate)."""
+
+    __slots__ = ("item_id", "item_type", "explanation_html", "_steps", "_first", "_legacy_accepted", "_legacy_known")
+
+    def __init__(self, canonical: Dict[str, Any]) -> None:
+        self.item_id = canonical.get("id")
+        self.item_type = canonical.get("type")
+        final = canonical.get("final") or {}
+        final_answer = (final.get("answer_text") or "").strip()
+        self.explanation_html: Optional[str] = (final.get("explanation") or {}).get("html") or None
+        steps: Dict[Any, StepKey] = {}
+        first: Optional[StepKey] = None
+        for step in canonical.get("steps") or []:
+            correct_id = step.get("correct_choice_id")
+            correct_id = correct_id if isinstance(correct_id, str) and correct_id else None
+            accepted, known = _text_keys(step.get("choices"), final_answer) if correct_id is None else (frozenset(), frozenset())
+            key = StepKey(correct_id, accepted, known)
+            sid = step.get("step_id")
+            if isinstance(sid, Hashable) and sid not in steps:
+                steps[sid] = key
+            if first is None:
+                first = key
+        self._steps = steps
+        self._first = first
+        self._legacy_accepted, self._legacy_known = _text_keys(canonical.get("choices"), final_answer)
+
+    @property
+    def step_ids(self) -> Tuple[Any, ...]:
+        return tuple(self._steps)
+
+    def grade(self, step_id: Optional[str], choice_id: Optional[str]) -> bool:
+        step = (self._steps.get(step_id) if step_id else None) or self._first
+        if step is not None:
+            if step.correct_choice_id is not None:
+                return choice_id == step.correct_choice_id
+            if choice_id in step.known:
+                return choice_id in step.accepted
+        return choice_id in self._legacy_accepted
+
+    def result(self, step_id: Optional[str], choice_id: Optional[str]) -> Dict[str, Any]:
+        """Response body for one graded step: ``{"correct"}`` plus the item explanation when present."""
+        result: Dict[str, Any] = {"correct": self.grade(step_id, choice_id)}
+        if self.explanation_html:
+            result["explanation"] = {"html": self.explanation_html}
+        return result
+
+    def grade_all(self, submissions: List[Tuple[Optional[str], Optional[str]]]) -> List[bool]:
+        """Grade several (step_id, choice_id) pairs of the same item."""
+        return [self.grade(step_id, choice_id) for step_id, choice_id in submissions]
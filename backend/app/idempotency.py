@@ -0,0 +1,115 @@
+"""Bounded cache of recent answer results for idempotent retries.
+
+Clients on flaky networks retry ``/api/answer``; a retry with the same idempotency key gets
+the original response back (same ``attempt_id``) without re-grading or logging another event.
+Keys are scoped to the session and come from the ``Idempotency-Key`` header, else from the
+submission itself (serve_id + step_id; serve_id for whole-item batches), so each serve's step is
+graded and logged once. Reusing a key for a different submission (a header key, or another
+choice on the same serve and step) is a conflict.
+
+Bounded like the serve registry (``bounded_cache``): entries expire after IDEMPOTENCY_TTL_S
+(default 3600) and the oldest are evicted past IDEMPOTENCY_MAX (default 20000).
+
+Replay works within one process only: with several workers, a retry that lands on another
+worker is graded and logged again. With IDEMPOTENCY_PERSIST=1 the live entries are written to
+``dev_state/idempotency.json`` on graceful shutdown only and reloaded on startup, so results
+stored since the last clean shutdown are not replayed after a crash.
+"""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .bounded_cache import BoundedTTLMap, env_flag, env_int
+
+ROOT = Path(__file__).resolve().parents[2]
+DEV_DIR = ROOT / "dev_state"
+CACHE_PATH = DEV_DIR / "idempotency.json"
+
+
+class CachedResult(NamedTuple):
+    fingerprint: str  # the submission the key was first used for
+    result: Dict[str, Any]
+    ts: float
+
+
+def is_persistent() -> bool:
+    return env_flag("IDEMPOTENCY_PERSIST")
+
+
+def fingerprint(*parts: Any) -> str:
+    return "\x1f".join("" if p is None else str(p) for p in parts)
+
+
+def request_key(session_id: str, header_key: Optional[str], derived: Optional[str]) -> Optional[str]:
+    """Session-scoped cache key: the header when sent, else the derived key (None: not idempotent)."""
+    if header_key:
+        return f"{session_id}\x1eh\x1e{header_key}"
+    if derived:
+        return f"{session_id}\x1ed\x1e{derived}"
+    return None
+
+
+class IdempotencyCache(BoundedTTLMap[CachedResult]):
+    def __init__(self, *, max_entries: int = 20000, ttl_s: float = 3600.0) -> None:
+        super().__init__(max_entries=max_entries, ttl_s=ttl_s)
+        self.hits = 0
+        self.misses = 0
+        self.conflicts = 0
+        self.stored = 0
+
+    @classmethod
+    def from_env(cls) -> "IdempotencyCache":
+        return cls(max_entries=env_int("IDEMPOTENCY_MAX", 20000), ttl_s=float(env_int("IDEMPOTENCY_TTL_S", 3600)))
+
+    def lookup(self, key: Optional[str], fp: str) -> Optional[CachedResult]:
+        """The cached entry for ``key`` (check ``entry.fingerprint == fp`` for conflicts), or None."""
+        if key is None:
+            return None
+        entry = self.get(key)
+        if entry is None:
+            self.misses += 1
+        elif entry.fingerprint == fp:
+            self.hits += 1
+        else:
+            self.conflicts += 1
+        return entry
+
+    def store(self, key: Optional[str], fp: str, result: Dict[str, Any]) -> None:
+        if key is None:
+            return
+        self.stored += self.put_many([(key, CachedResult(fp, result, time.time()))])
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "hits": self.hits, "misses": self.misses, "conflicts": self.conflicts, "stored": self.stored}
+
+    # --- Optional persistence (IDEMPOTENCY_PERSIST=1) ---
+    def _parse_row(self, row: List[Any]) -> CachedResult:
+        fp, result, ts = row
+        if not isinstance(result, dict):
+            raise TypeError("result is not an object")
+        return CachedResult(str(fp), result, float(ts))
+
+    def save(self, path: Path = CACHE_PATH) -> int:
+        return super().save(path)
+
+    def load(self, path: Path = CACHE_PATH) -> int:
+        return super().load(path)
+
+
+answer_cache = IdempotencyCache.from_env()
+
+
+def startup() -> None:
+    if is_persistent():
+        answer_cache.load()
+
+
+def shutdown() -> None:
+    if is_persistent():
+        try:
+            answer_cache.save()
+        except Exception:
+            pass
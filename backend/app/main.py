@@ -5,46 +5,61 @@ from .routes.session import router as session_router
 from .routes.item import router as item_router
 from .routes.answer import router as answer_router
 from .routes.health import router as health_router
-from .store import load_mocks
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi import _rate_limit_exceeded_handler as _default_rate_limit_handler
+from .routes.admin import router as admin_router
+from .store import load_mocks, start_catalog_watcher, stop_catalog_watcher
 from .util import get_rate_limiter
+from .rate_limit import RateLimited
+from .selection import selection_manager
+from . import selection_repo
+from . import selection_repo_async
+from . import idempotency, serve_registry
+from .middleware import SecurityHeadersMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
-import inspect
-import os
 
 app = FastAPI(title="Education v3 API", version="0.1.0")
 
 @app.on_event("startup")
 async def startup_event() -> None:
     load_mocks()
+    # Opt-in live reload of data/canonical (env CATALOG_WATCH=1)
+    start_catalog_watcher()
+    # Opt-in write-behind flushing of selection state (env SELECTION_FLUSH_INTERVAL_MS)
+    selection_manager.start_background_flush()
+    # Opt-in restore of recent serves (env SERVE_REGISTRY_PERSIST=1)
+    serve_registry.startup()
+    # Opt-in restore of recent answer results for idempotent retries (env IDEMPOTENCY_PERSIST=1)
+    idempotency.startup()
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    stop_catalog_watcher()
+    # Let in-flight async repository calls finish before the final state/event flush
+    selection_repo_async.shutdown()
+    selection_manager.shutdown()
+    # Write any queued attempt events before exit
+    selection_repo.shutdown_events()
+    serve_registry.shutdown()
+    idempotency.shutdown()
 
 # Serve local media files (SVG/PNG) at /media for development
 ROOT = Path(__file__).resolve().parents[2]
 app.mount("/media", StaticFiles(directory=ROOT / "media"), name="media")
 
-# Rate limiting (slowapi)
+# Rate limiting (token buckets, see rate_limit.py). Limits are enforced by the @limiter.limit
+# route decorators, which also set the X-RateLimit-* headers; no middleware is involved.
 limiter = get_rate_limiter()
 app.state.limiter = limiter
-async def _json_rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    # Delegate to default to compute headers, then wrap JSON
-    resp = _default_rate_limit_handler(request, exc)
-    if inspect.isawaitable(resp):
-        resp = await resp
+async def _json_rate_limit_handler(request: Request, exc: RateLimited):
     data = {"code": "rate_limited", "message": "Too many requests"}
-    out = JSONResponse(status_code=resp.status_code, content=data)
-    for k, v in resp.headers.items():
-        out.headers[k] = v
-    return out
+    return JSONResponse(status_code=429, content=data, headers=exc.decision.headers())
 
-app.add_exception_handler(RateLimitExceeded, _json_rate_limit_handler)
-app.add_middleware(SlowAPIMiddleware)
+app.add_exception_handler(RateLimited, _json_rate_limit_handler)
 
-# Allow Vite dev server (place CORS after slowapi so OPTIONS preflight bypasses limiter)
+# Allow Vite dev server
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -56,29 +71,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Dev-friendly CSP header for media origins
-@app.middleware("http")
-async def csp_header(request: Request, call_next):
-    response = await call_next(request)
-    # IMG src allowlist: self + optional extra origins via env IMG_SRC_EXTRA (comma-separated)
-    img_src_extra = os.environ.get("IMG_SRC_EXTRA", "").strip()
-    extras = [o.strip() for o in img_src_extra.split(",") if o.strip()]
-    img_sources = ["'self'"] + extras
-    csp = f"default-src 'self'; img-src {' '.join(img_sources)}; script-src 'self'; style-src 'self' 'unsafe-inline'"
-    response.headers.setdefault("Content-Security-Policy", csp)
-    return response
+# Dev-friendly CSP header for media origins (outermost: also covers CORS preflights and errors).
+# Precomputed from IMG_SRC_EXTRA; POST /api/admin/reload-config recomputes it.
+app.add_middleware(SecurityHeadersMiddleware)
 
 app.include_router(session_router, prefix="/api", tags=["session"])
 app.include_router(item_router, prefix="/api", tags=["item"])
 app.include_router(answer_router, prefix="/api", tags=["answer"])
 app.include_router(health_router, prefix="/api", tags=["health"])
+app.include_router(admin_router, prefix="/api", tags=["admin"])
 
 
 # --- Stable JSON error shape for 4xx/5xx ---
 @app.exception_handler(HTTPException)
 async def _http_exc_handler(request: Request, exc: HTTPException):
     code = exc.detail if isinstance(exc.detail, str) else "http_error"
-    msg_map = {400: "Bad request", 401: "Unauthorized", 403: "Forbidden", 404: "Not found"}
+    msg_map = {400: "Bad request", 401: "Unauthorized", 403: "Forbidden", 404: "Not found", 409: "Conflict"}
     message = msg_map.get(exc.status_code, "Error")
     return JSONResponse(status_code=exc.status_code, content={"code": code, "message": message})
 
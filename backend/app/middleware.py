@@ -0,0 +1,65 @@
+"""Pure-ASGI middleware (no BaseHTTPMiddleware: no per-request task/stream wrapping, streaming-safe)."""
+
+from __future__ import annotations
+
+import os
+from typing import List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+Header = Tuple[bytes, bytes]
+
+
+def security_headers_from_env() -> List[Header]:
+    """Response headers added to every HTTP response (unless the response already sets them).
+
+    CSP img-src allowlist: self + optional extra origins via env IMG_SRC_EXTRA (comma-separated).
+    """
+    img_src_extra = os.environ.get("IMG_SRC_EXTRA", "").strip()
+    extras = [o.strip() for o in img_src_extra.split(",") if o.strip()]
+    img_sources = ["'self'"] + extras
+    csp = f"default-src 'self'; img-src {' '.join(img_sources)}; script-src 'self'; style-src 'self' 'unsafe-inline'"
+    return [(b"content-security-policy", csp.encode("latin-1"))]
+
+
+# Precomputed headers shared by every SecurityHeadersMiddleware; swapped (one reference
+# assignment) by reload_security_headers() after a config change
+_headers: Tuple[Header, ...] = ()
+
+
+class SecurityHeadersMiddleware:
+    """Adds precomputed security headers on ``http.response.start``.
+
+    Headers are computed from env when the middleware is built and kept in the module-level
+    holder, so the per-request cost is one pass over the response's header names and
+    ``reload_security_headers()`` reaches every app without tracking instances.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        global _headers
+        self.app = app
+        _headers = tuple(security_headers_from_env())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        extra = _headers
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                raw = list(message.get("headers") or ())
+                present = {name.lower() for name, _ in raw}
+                raw.extend(h for h in extra if h[0] not in present)  # setdefault semantics
+                message["headers"] = raw
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def reload_security_headers() -> List[Tuple[str, str]]:
+    """Recompute headers from env for every middleware; returns the new headers."""
+    global _headers
+    headers = security_headers_from_env()
+    _headers = tuple(headers)
+    return [(k.decode("latin-1"), v.decode("latin-1")) for k, v in headers]
@@ -0,0 +1,283 @@
+"""Token-bucket rate limiter for the item/answer routes.
+
+Same decorator API as slowapi's ``Limiter.limit("30/minute")``, minus its per-request cost
+(limit parsing, moving-window storage, signature inspection). A limit of N per period is a bucket
+of N tokens refilled at N/period per second, so a client may burst N requests and then gets one
+more every period/N. Each decision is O(1): one bucket read and write.
+
+Backends (RATE_LIMIT_BACKEND):
+- ``memory`` (default): per-process buckets in RATE_LIMIT_SHARDS (default 16) dicts, each with
+  its own lock, so concurrent threads rarely contend. Bounded by RATE_LIMIT_MAX_KEYS (default
+  100000). Buckets that have refilled completely are dropped first, then the least recently used.
+  With N worker processes a client gets N times the limit.
+- ``sqlite``: buckets in the shared ``rate_buckets`` table (dev_state/app.db), so one limit
+  holds across worker processes. Each decision is a single UPSERT, made atomic by SQLite's
+  write lock, and runs on the repository executor (``selection_repo_async.run``), never on the
+  event loop. The limiter's own connections wait at most RATE_LIMIT_BUSY_TIMEOUT_MS (default 50)
+  for the write lock; when it is busy or the database is unavailable, the decision falls back to
+  memory buckets.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+_PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)s?\s*$")
+
+
+class Rate(NamedTuple):
+    limit: int  # bucket capacity
+    per_s: float  # refill rate (tokens per second)
+
+
+def parse_rate(spec: str) -> Rate:
+    """``"30/minute"`` -> Rate(30, 0.5)."""
+    m = _RATE_RE.match(spec or "")
+    if not m or int(m.group(1)) < 1:
+        raise ValueError(f"invalid rate limit: {spec!r}")
+    limit = int(m.group(1))
+    return Rate(limit, limit / _PERIODS[m.group(2)])
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_at: float  # epoch seconds when the bucket is full again
+    retry_after_s: float  # until the next token (0 when allowed)
+
+    def headers(self) -> Dict[str, str]:
+        out = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_at)),
+        }
+        if not self.allowed:
+            out["Retry-After"] = str(max(1, math.ceil(self.retry_after_s)))
+        return out
+
+
+def _decision(rate: Rate, tokens: float, now: float, allowed: bool) -> Decision:
+    # ``tokens`` is the bucket level after this decision
+    return Decision(
+        allowed,
+        rate.limit,
+        max(0, int(tokens)),
+        now + (rate.limit - tokens) / rate.per_s,
+        0.0 if allowed else (1.0 - tokens) / rate.per_s,
+    )
+
+
+class RateLimited(Exception):
+    def __init__(self, decision: Decision) -> None:
+        super().__init__("rate_limited")
+        self.decision = decision
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+class MemoryBuckets:
+    """Per-process buckets, sharded by key hash; each shard maps key -> (tokens, ts, full_at)."""
+
+    blocking = False  # decisions never wait on I/O: made inline on the event loop
+
+    def __init__(self, *, shards: int = 16, max_keys: int = 100000) -> None:
+        self.shards = max(1, shards)
+        self.max_per_shard = max(1, max_keys // self.shards)
+        self._locks = [threading.Lock() for _ in range(self.shards)]
+        self._buckets: List["OrderedDict[str, Tuple[float, float, float]]"] = [OrderedDict() for _ in range(self.shards)]
+        self.evicted = 0
+
+    def hit(self, key: str, rate: Rate, now: float) -> Decision:
+        i = hash(key) % self.shards
+        buckets = self._buckets[i]
+        with self._locks[i]:
+            state = buckets.pop(key, None)
+            tokens = float(rate.limit) if state is None else min(rate.limit, state[0] + max(0.0, now - state[1]) * rate.per_s)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            buckets[key] = (tokens, now, now + (rate.limit - tokens) / rate.per_s)  # re-insert: LRU order
+            if len(buckets) > self.max_per_shard:
+                self._trim(buckets, now)
+        return _decision(rate, tokens, now, allowed)
+
+    def _trim(self, buckets: "OrderedDict[str, Tuple[float, float, float]]", now: float) -> None:
+        # A full bucket is the same as no bucket: drop those first, then the least recently used
+        for key in [k for k, state in buckets.items() if state[2] <= now]:
+            del buckets[key]
+            self.evicted += 1
+        while len(buckets) > self.max_per_shard:
+            buckets.popitem(last=False)
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return sum(len(b) for b in self._buckets)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "shards": self.shards, "keys": len(self), "evicted": self.evicted}
+
+
+# One atomic statement per decision; SET expressions read the row's previous values
+_TAKE_SQL = """
+INSERT INTO rate_buckets(key, tokens, ts, full_at) VALUES (:key, :cap - 1, :now, :now + 1.0 / :rate)
+ON CONFLICT(key) DO UPDATE SET
+  tokens = MIN(:cap, tokens + MAX(0, :now - ts) * :rate) - 1,
+  ts = :now,
+  full_at = :now + (:cap - MIN(:cap, tokens + MAX(0, :now - ts) * :rate) + 1) / :rate
+WHERE MIN(:cap, tokens + MAX(0, :now - ts) * :rate) >= 1
+RETURNING tokens
+"""
+_PEEK_SQL = "SELECT tokens, ts FROM rate_buckets WHERE key = ?"
+_PURGE_SQL = "DELETE FROM rate_buckets WHERE full_at <= ?"
+
+
+class SQLiteBuckets:
+    """Buckets shared by all worker processes through the dev database (see module docstring)."""
+
+    PURGE_EVERY = 1000  # decisions between purges of full (idle) buckets
+    blocking = True  # decisions may wait on the write lock: made on the repository executor
+
+    def __init__(self, fallback: MemoryBuckets, *, busy_timeout_ms: int = 50) -> None:
+        self.fallback = fallback
+        self.busy_timeout_ms = max(0, busy_timeout_ms)
+        self._ready = False
+        self._local = threading.local()
+        self._decisions = 0
+        self.busy = 0
+        self.errors = 0
+
+    def _connect(self) -> Any:
+        # Per-thread connection with a short busy timeout (db.connect() waits up to DB_BUSY_TIMEOUT_MS)
+        from . import db
+
+        key = (os.getpid(), db.DB_PATH)
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        conn = db.open_connection(busy_ms=self.busy_timeout_ms)
+        self._local.conn = (key, conn)
+        return conn
+
+    def hit(self, key: str, rate: Rate, now: float) -> Decision:
+        from . import db
+
+        try:
+            if not self._ready:
+                db.ensure_tables()
+                self._ready = True
+            conn = self._connect()
+            with conn:
+                rows = conn.execute(_TAKE_SQL, {"key": key, "cap": float(rate.limit), "now": now, "rate": rate.per_s}).fetchall()
+                if rows:
+                    decision = _decision(rate, float(rows[0][0]), now, True)
+                else:
+                    tokens, ts = conn.execute(_PEEK_SQL, (key,)).fetchone()
+                    decision = _decision(rate, min(rate.limit, tokens + max(0.0, now - ts) * rate.per_s), now, False)
+                self._decisions += 1
+                if self._decisions % self.PURGE_EVERY == 0:
+                    conn.execute(_PURGE_SQL, (now,))
+            return decision
+        except sqlite3.OperationalError as exc:
+            # Write lock held past the busy timeout: answer from per-process buckets rather than wait
+            if "locked" in str(exc) or "busy" in str(exc):
+                self.busy += 1
+            else:
+                self.errors += 1
+            return self.fallback.hit(key, rate, now)
+        except Exception:
+            # Dev-only: fall back to per-process buckets
+            self.errors += 1
+            return self.fallback.hit(key, rate, now)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "busy_timeout_ms": self.busy_timeout_ms,
+            "busy": self.busy,
+            "errors": self.errors,
+            "fallback_keys": len(self.fallback),
+        }
+
+
+def backend_from_env() -> Any:
+    memory = MemoryBuckets(shards=_env_int("RATE_LIMIT_SHARDS", 16), max_keys=_env_int("RATE_LIMIT_MAX_KEYS", 100000))
+    if os.environ.get("RATE_LIMIT_BACKEND", "memory").strip().lower() == "sqlite":
+        return SQLiteBuckets(memory, busy_timeout_ms=_env_int("RATE_LIMIT_BUSY_TIMEOUT_MS", 50))
+    return memory
+
+
+class RateLimiter:
+    """``@limiter.limit("30/minute")`` for async routes taking ``request`` (and optionally ``response``).
+
+    Buckets are per route and per ``key_func(request)``. Allowed requests get X-RateLimit-*
+    headers (on the returned Response, else on the injected ``response``); denied requests raise
+    ``RateLimited`` for the app's 429 handler. ``enabled = False`` turns checks off (load tests).
+    """
+
+    def __init__(self, key_func: Callable[[Request], str], backend: Any = None) -> None:
+        self.key_func = key_func
+        self.backend = backend if backend is not None else backend_from_env()
+        self.enabled = True
+        self.allowed = 0
+        self.denied = 0
+
+    async def hit(self, scope: str, request: Request, rate: Rate) -> Decision:
+        key = f"{scope}\x1f{self.key_func(request)}"
+        if self.backend.blocking:
+            from . import selection_repo_async  # lazy: util imports this module
+
+            decision = await selection_repo_async.run(self.backend.hit, key, rate, time.time())
+        else:
+            decision = self.backend.hit(key, rate, time.time())
+        if decision.allowed:
+            self.allowed += 1
+        else:
+            self.denied += 1
+        return decision
+
+    def limit(self, spec: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        rate = parse_rate(spec)
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            if not inspect.iscoroutinefunction(func):
+                raise TypeError(f"{func.__name__}: rate-limited routes must be async")
+            scope = f"{func.__module__}.{func.__name__}"
+
+            @functools.wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                decision = await self.hit(scope, kwargs["request"], rate)
+                if not decision.allowed:
+                    raise RateLimited(decision)
+                result = await func(*args, **kwargs)
+                target: Optional[Response] = result if isinstance(result, Response) else kwargs.get("response")
+                if target is not None:
+                    target.headers.update(decision.headers())
+                return result
+
+            return wrapper
+
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "allowed": self.allowed, "denied": self.denied, **self.backend.stats()}
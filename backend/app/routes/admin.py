@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
+import hmac
+import os
+from .. import selection_repo
+from ..export import event_csv_chunks, gzip_chunks, normalize_ts_bound
+from ..middleware import reload_security_headers
+
+router = APIRouter()
+
+
+def _require_admin(token: str | None) -> None:
+    # Admin endpoints are disabled unless ADMIN_TOKEN is set
+    expected = os.environ.get("ADMIN_TOKEN", "")
+    if not (expected and token and hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="admin_required")
+
+
+@router.get("/admin/events.csv.gz")
+def export_all_events(
+    start: str | None = Query(default=None, description="Inclusive ISO 8601 lower bound on ts (naive = UTC)"),
+    end: str | None = Query(default=None, description="Exclusive ISO 8601 upper bound on ts (naive = UTC)"),
+    x_admin_token: str | None = Header(default=None, alias="X-Admin-Token"),
+) -> StreamingResponse:
+    _require_admin(x_admin_token)
+    try:
+        lo, hi = normalize_ts_bound(start), normalize_ts_bound(end)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_range")
+    if lo and hi and lo >= hi:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_range")
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return StreamingResponse(
+        gzip_chunks(event_csv_chunks(selection_repo.iter_events_in_range(lo, hi))),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="events-{stamp}.csv.gz"'},
+    )
+
+
+@router.post("/admin/reload-config")
+def reload_config(x_admin_token: str | None = Header(default=None, alias="X-Admin-Token")) -> dict:
+    """Recompute the precomputed security headers (CSP) from the current environment."""
+    _require_admin(x_admin_token)
+    return {"security_headers": dict(reload_security_headers())}
@@ -1,14 +1,21 @@
 from fastapi import APIRouter, Header, Request, HTTPException, status, Response
 from pydantic import BaseModel
-from ..store import get_mock_submit_result, get_canonical_by_id
+from ..store import get_mock_submit_result, get_catalog
 from ..util import verify_csrf_token
 from ..util import get_rate_limiter
 from .. import selection_repo
+from .. import selection_repo_async as repo_async
+from .. import idempotency
+from .. import serve_registry as registry
+import time
 import uuid
 
 router = APIRouter()
 limiter = get_rate_limiter()
 
+# Upper bound for steps in one whole-item submission
+MAX_BATCH_STEPS = 50
+
 class SubmitStep(BaseModel):
     session_id: str
     item_id: str
@@ -16,86 +23,162 @@ class SubmitStep(BaseModel):
     choice_id: str | None = None
     serve_id: str | None = None
 
+class StepAnswer(BaseModel):
+    step_id: str | None = None
+    choice_id: str | None = None
+
+class SubmitItem(BaseModel):
+    session_id: str
+    item_id: str
+    serve_id: str | None = None
+    steps: list[StepAnswer]
+
+
+def _require_session(request: Request, x_csrf_token: str | None) -> str:
+    session_id = request.cookies.get("ev3_session")
+    if not session_id or not x_csrf_token or not verify_csrf_token(x_csrf_token, session_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="csrf_required")
+    return session_id
+
+
+def _check_serve(serve_id: str | None, session_id: str, item_id: str) -> int | None:
+    """O(1) serve validation: ms since the serve when it is registered for this session and item.
+
+    Unknown or expired serves are accepted without attribution (rejected with SERVE_REGISTRY_STRICT=1);
+    a registered serve of another session or item is rejected.
+    """
+    record = registry.serve_registry.get(serve_id)
+    if record is None:
+        if registry.is_strict():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="unknown_serve")
+        return None
+    if record.session_id != session_id or record.item_id != item_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="serve_mismatch")
+    return int((time.time() - record.ts) * 1000)
+
+
+async def _grading_key(item_id: str | None):
+    """Precompiled answer key, or None for unknown items; lazy-catalog misses load off the event loop."""
+    catalog = get_catalog()
+    ordinal = catalog.ordinal(item_id or "")
+    if ordinal is None:
+        return None
+    key = catalog.cached_grading_key(ordinal)
+    if key is None:
+        key = await repo_async.run(catalog.grading_key_of, item_id or "")
+    return key
+
+
+def _replay(idem_key: str | None, fp: str, response: Response) -> dict | None:
+    """The original result for a repeated submission (re-graded/re-logged never), else None."""
+    cached = idempotency.answer_cache.lookup(idem_key, fp)
+    if cached is None:
+        return None
+    if cached.fingerprint != fp:
+        # Same Idempotency-Key, different submission
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="idempotency_conflict")
+    response.headers["Idempotent-Replayed"] = "true"
+    return cached.result
+
+
 @router.post("/answer")
 @limiter.limit("30/minute")
-def submit_step(
+async def submit_step(
     body: SubmitStep,
     request: Request,
     response: Response,
     x_csrf_token: str | None = Header(default=None, alias="X-CSRF-Token"),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
 ) -> dict:
-    session_id = request.cookies.get("ev3_session")
-    if not session_id or not x_csrf_token or not verify_csrf_token(x_csrf_token, session_id):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="csrf_required")
+    session_id = _require_session(request, x_csrf_token)
+    # Precompiled answer key (built at catalog load): grading is a few dict/set lookups. Loaded
+    # first: from the replay check to the cache store below nothing awaits.
+    key = await _grading_key(body.item_id)
+    fp = idempotency.fingerprint(body.item_id, body.step_id, body.choice_id, body.serve_id)
+    # One answer per serve and step: another choice on the same step is a conflict, not a new attempt
+    derived = idempotency.fingerprint(body.serve_id, body.step_id) if body.serve_id else None
+    idem_key = idempotency.request_key(session_id, idempotency_key, derived)
+    replayed = _replay(idem_key, fp, response)
+    if replayed is not None:
+        return replayed
+    answer_ms = _check_serve(body.serve_id, session_id, body.item_id)
 
-    canonical = get_canonical_by_id(body.item_id or "")
-    if not canonical:
+    if key is None:
         # Fallback to mock result if item not found (dev)
         result = get_mock_submit_result()
         canonical_type = None
     else:
-        canonical_type = canonical.get("type")
-        # Step-aware grading (dev): prefer steps[].correct_choice_id when present for the targeted step.
-        # Fallback: compare submitted choice text against final.answer_text.
-        final_answer = ((canonical.get("final") or {}).get("answer_text") or "").strip()
-        explanation_html = ((canonical.get("final") or {}).get("explanation") or {}).get("html")
-
-        steps = canonical.get("steps") or []
-        correct: bool | None = None
-
-        if steps:
-            # Determine target step (default to first if unspecified or missing)
-            target_step = None
-            if body.step_id:
-                for s in steps:
-                    if s.get("step_id") == body.step_id:
-                        target_step = s
-                        break
-            if target_step is None:
-                target_step = steps[0]
-
-            correct_choice_id = target_step.get("correct_choice_id")
-            if isinstance(correct_choice_id, str) and correct_choice_id:
-                # Grade by id when available
-                correct = (body.choice_id == correct_choice_id)
-            else:
-                # Fallback by text match within the step's choices
-                submitted_text = None
-                for ch in (target_step.get("choices") or []):
-                    if ch.get("id") == body.choice_id:
-                        submitted_text = (ch.get("text") or "").strip()
-                        break
-                if submitted_text is not None and final_answer:
-                    correct = (submitted_text == final_answer)
-
-        if correct is None:
-            # No steps model or could not resolve step: try top-level choices (legacy) then final.answer_text
-            submitted_text = None
-            if isinstance(canonical.get("choices"), list):
-                for ch in canonical.get("choices"):
-                    if ch.get("id") == body.choice_id:
-                        submitted_text = (ch.get("text") or "").strip()
-                        break
-            if submitted_text is not None and final_answer:
-                correct = (submitted_text == final_answer)
-            else:
-                correct = False
-
-        result = {"correct": bool(correct)}
-        if explanation_html:
-            result["explanation"] = {"html": explanation_html}
+        canonical_type = key.item_type
+        result = key.result(body.step_id, body.choice_id)
 
-    # Dev-only event log
+    event = None
     if selection_repo.is_enabled() and session_id:
-        attempt_id = f"attempt_{uuid.uuid4().hex[:8]}"
-        selection_repo.append_event({
+        result["attempt_id"] = f"attempt_{uuid.uuid4().hex[:8]}"
+        event = {
             "session_id": session_id,
             "serve_id": body.serve_id,
-            "attempt_id": attempt_id,
+            "attempt_id": result["attempt_id"],
             "item_id": body.item_id,
             "item_type": canonical_type,
             "action": "answered",
             "correct": bool(result.get("correct")),
-        })
-        result["attempt_id"] = attempt_id
+            "answer_ms": answer_ms,
+        }
+    # Cache before the first await so a concurrent retry already sees this result
+    idempotency.answer_cache.store(idem_key, fp, result)
+    # Dev-only event log
+    if event is not None:
+        await repo_async.append_event(event)
     return result
+
+
+@router.post("/answer/batch")
+@limiter.limit("30/minute")
+async def submit_item(
+    body: SubmitItem,
+    request: Request,
+    response: Response,
+    x_csrf_token: str | None = Header(default=None, alias="X-CSRF-Token"),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+) -> dict:
+    """Grade a whole-item submission (all steps at once); one event per step, logged in one write."""
+    session_id = _require_session(request, x_csrf_token)
+    if not body.steps or len(body.steps) > MAX_BATCH_STEPS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="bad_request")
+    submitted = [(s.step_id, s.choice_id) for s in body.steps]
+    key = await _grading_key(body.item_id)  # before the replay check: nothing awaits until the store
+    fp = idempotency.fingerprint(body.item_id, body.serve_id, *(p for pair in submitted for p in pair))
+    derived = f"batch\x1f{body.serve_id}" if body.serve_id else None
+    idem_key = idempotency.request_key(session_id, idempotency_key, derived)
+    replayed = _replay(idem_key, fp, response)
+    if replayed is not None:
+        return replayed
+    answer_ms = _check_serve(body.serve_id, session_id, body.item_id)
+    if key is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
+
+    graded = key.grade_all(submitted)
+    results = [{"step_id": s.step_id, "correct": ok} for s, ok in zip(body.steps, graded)]
+    out: dict = {"results": results, "correct": all(graded)}
+    if key.explanation_html:
+        out["explanation"] = {"html": key.explanation_html}
+
+    events = []
+    if selection_repo.is_enabled() and session_id:
+        for r in results:
+            r["attempt_id"] = f"attempt_{uuid.uuid4().hex[:8]}"
+            events.append({
+                "session_id": session_id,
+                "serve_id": body.serve_id,
+                "attempt_id": r["attempt_id"],
+                "item_id": body.item_id,
+                "item_type": key.item_type,
+                "action": "answered",
+                "correct": r["correct"],
+                "answer_ms": answer_ms,
+            })
+    idempotency.answer_cache.store(idem_key, fp, out)
+    # Dev-only event log (one write for all steps)
+    if events:
+        await repo_async.append_events(events)
+    return out
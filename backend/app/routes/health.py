@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Response, status
 from ..util import get_rate_limiter
-from ..store import list_canonical_items
-from .. import selection_repo
+from ..store import get_catalog, get_load_info
+from .. import selection_repo, selection_repo_async
+from ..selection import selection_manager
+from ..serve_registry import serve_registry
+from ..idempotency import answer_cache
 import os
 
 
@@ -21,8 +24,10 @@ def readiness(response: Response) -> dict:
         limiter = get_rate_limiter()
         _ = getattr(limiter, "key_func", None)
         limiter_ok = _ is not None
+        limiter_stats = limiter.stats()
     except Exception:
         limiter_ok = False
+        limiter_stats = None
 
     # Determine persistence mode from env (no IO)
     def _enabled(val: str | None) -> bool:
@@ -35,17 +40,27 @@ def readiness(response: Response) -> dict:
     db_enabled = _enabled(os.environ.get("DB_PERSIST_SELECTION"))
 
     # In dev, consider persistence ready regardless of mode; routers will lazily init as needed
-    items = list_canonical_items()
-    seen_types = sorted({(c.get("type") or "").strip().upper() for c in items if isinstance(c.get("type"), str) and c.get("type").strip()})
+    catalog = get_catalog()
+    load_info = get_load_info()
     diagnostics = {
         "limiter_ok": limiter_ok,
+        "rate_limiter": limiter_stats,
         "persistence": {
             "file": file_enabled,
             "db": db_enabled,
+            "event_writer": selection_repo.event_writer_stats(),
+            "executor": selection_repo_async.stats(),
         },
+        "selection": selection_manager.stats(),
+        "serve_registry": serve_registry.stats(),
+        "idempotency": answer_cache.stats(),
         "canonical": {
-            "count": len(items),
-            "types": seen_types,
+            "count": len(catalog),
+            "types": list(catalog.type_labels()),
+            "source": load_info.get("source"),
+            "generation": catalog.generation,
+            "lazy": bool(load_info.get("lazy")),
+            **({"cache": load_info["cache"]} if "cache" in load_info else {}),
         },
     }
     return {"status": "ready", **diagnostics}
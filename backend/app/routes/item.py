@@ -1,63 +1,85 @@
 from fastapi import APIRouter, Request, Response, Query
 import random
-from ..store import list_canonical_items, get_mock_item_serve
-from ..util import randomize_choice_order, make_watermark, canonical_to_serve
+from ..store import get_catalog, get_mock_item_serve
+from ..util import randomize_choice_order, make_watermark, encode_json, new_serve_seed
 from ..util import get_rate_limiter
 from ..selection import selection_manager
+from ..serve_registry import ServeRecord, serve_registry
 from .. import selection_repo
+from .. import selection_repo_async as repo_async
+import time
 import uuid
 
 router = APIRouter()
 limiter = get_rate_limiter()
 
+# Upper bound for ?count= prefetch batches (larger values are clamped)
+MAX_BATCH = 10
+
 @router.get("/item/next")
 @limiter.limit("30/minute")
-def get_next_item(
+async def get_next_item(
     request: Request,
     response: Response,
     type: str | None = Query(default=None),
     policy: str | None = Query(default=None),
-) -> dict:
+    count: int | None = Query(default=None),
+) -> Response:
+    """Serve the next item; with ``count=N`` serve N upcoming items as ``{"items": [...]}``."""
     session_id = request.cookies.get("ev3_session") or "s_anon"
-    items = list_canonical_items()
-    if items:
+    catalog = get_catalog()
+    n = 1 if count is None else max(1, min(count, MAX_BATCH))
+    watermark = make_watermark(session_id)
+    bodies: list[bytes] = []
+    events: list[dict] = []
+    serves: list[tuple[str, ServeRecord]] = []
+    now = time.time()
+    if catalog:
         if session_id == "s_anon":
-            canonical = random.choice(items)
+            metas = [random.choice(catalog.meta) for _ in range(n)]
         else:
-            canonical = selection_manager.next_canonical(session_id, items, target_type=type, policy=policy) or random.choice(items)
-        payload = canonical_to_serve(canonical, session_id=session_id)
+            # One lock and one state write for the whole batch
+            metas = await repo_async.run_selection(selection_manager.next_metas, session_id, catalog, n, target_type=type, policy=policy)
+            metas += [random.choice(catalog.meta) for _ in range(n - len(metas))]
+        for meta in metas:
+            # Stretch: include serve_id in payload for logging/analytics
+            serve_id = f"serve_{uuid.uuid4().hex[:8]}"
+            # Precompiled per-item template: static part is pre-encoded, only per-request fields
+            # are encoded and spliced in (bypasses generic response encoding)
+            template = catalog.cached_serve_template(meta.ordinal)
+            if template is None:
+                # Lazy catalog cache miss: the body is read from disk off the event loop
+                template = await repo_async.run(catalog.serve_template, meta.ordinal)
+            seed = new_serve_seed()
+            bodies.append(template.render_bytes(session_id=session_id, serve_id=serve_id, watermark=watermark, seed=seed))
+            events.append({"item_id": template.item_id, "item_type": template.item_type, "serve_id": serve_id})
+            serves.append((serve_id, ServeRecord(session_id, template.item_id, meta.ordinal, catalog.generation, seed, now)))
     else:
-        payload = get_mock_item_serve()
-    payload = randomize_choice_order(payload)
-    payload["serve"]["watermark"] = make_watermark(session_id)
-    # Stretch: include serve_id in payload for logging/analytics
-    serve_id = f"serve_{uuid.uuid4().hex[:8]}"
-    payload["serve"]["id"] = serve_id
-    payload["session_id"] = session_id
-    # Dev-only event log
+        for _ in range(n):
+            serve_id = f"serve_{uuid.uuid4().hex[:8]}"
+            payload = randomize_choice_order(get_mock_item_serve())
+            payload["serve"]["watermark"] = watermark
+            payload["serve"]["id"] = serve_id
+            payload["session_id"] = session_id
+            bodies.append(encode_json(payload))
+            events.append({"item_id": payload.get("item", {}).get("id"), "item_type": payload.get("item", {}).get("type"), "serve_id": serve_id})
+            serves.append((serve_id, ServeRecord(session_id, str(events[-1]["item_id"]), -1, catalog.generation, payload["serve"].get("seed"), now)))
+    # Remember what was served so /api/answer can validate and attribute answers (anon cannot answer)
+    if session_id != "s_anon":
+        serve_registry.record_many(serves)
+    # Dev-only event log (one write per request)
     if selection_repo.is_enabled() and session_id != "s_anon":
-        selection_repo.append_event({
-            "session_id": session_id,
-            "item_id": payload.get("item", {}).get("id"),
-            "item_type": payload.get("item", {}).get("type"),
-            "action": "served",
-            "serve_id": serve_id,
-        })
-    return payload
+        await repo_async.append_events([{"session_id": session_id, "action": "served", **e} for e in events])
+    body = bodies[0] if count is None else b'{"items":[' + b",".join(bodies) + b"]}"
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/item/types")
-def list_item_types(request: Request) -> dict:
-    items = list_canonical_items()
-    types = sorted({(c.get("type") or "").strip().upper() for c in items if isinstance(c.get("type"), str) and c.get("type").strip()})
-    return {"types": types}
+async def list_item_types(request: Request) -> dict:
+    return {"types": list(get_catalog().type_labels())}
 
 
 @router.get("/item/ids")
-def list_item_ids(type: str | None = Query(default=None)) -> dict:
-    items = list_canonical_items()
-    if type:
-        tnorm = (type or "").strip().lower()
-        items = [c for c in items if (c.get("type") or "").strip().lower() == tnorm]
-    ids = [c.get("id") for c in items if isinstance(c.get("id"), str) and c.get("id")]
-    return {"ids": ids}
\ No newline at end of file
+async def list_item_ids(type: str | None = Query(default=None)) -> dict:
+    ids = get_catalog().ids(type or None)
+    return {"ids": list(ids)}
\ No newline at end of file
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Response, Request
+from fastapi.responses import StreamingResponse
 import uuid
 from ..util import sign_csrf_token
 from .. import selection_repo
+from .. import selection_repo_async as repo_async
+from ..export import EVENT_CSV_COLUMNS, event_csv_chunks
 from ..selection import selection_manager
 
 # Ensure persistence is initialized when enabled
@@ -12,7 +15,7 @@ router = APIRouter()
 SESSION_COOKIE = "ev3_session"
 
 @router.post("/session")
-def create_session(response: Response) -> dict:
+async def create_session(response: Response) -> dict:
     session_id = f"s_{uuid.uuid4().hex[:8]}"
     # httpOnly cookie; secure flag can be toggled in prod
     response.set_cookie(
@@ -28,24 +31,16 @@ def create_session(response: Response) -> dict:
     return {"session_id": session_id, "csrf_token": csrf_token}
 
 @router.get("/progress")
-def get_progress(request: Request) -> dict:
+async def get_progress(request: Request) -> dict:
     session_id = request.cookies.get(SESSION_COOKIE)
     stats: dict[str, dict[str, int | float]] = {}
     if session_id and selection_repo.is_enabled():
         try:
-            rows = selection_repo.read_events_for_session(session_id)
-            for e in rows:
-                item_type = (e.get("item_type") or "unknown").upper()
-                if item_type not in stats:
-                    stats[item_type] = {"attempts": 0, "correct": 0, "accuracy": 0.0}
-                if e.get("action") == "answered":
-                    stats[item_type]["attempts"] += 1  # type: ignore[index]
-                    if bool(e.get("correct")):
-                        stats[item_type]["correct"] += 1  # type: ignore[index]
-            for t, s in stats.items():
-                a = int(s["attempts"]) or 0
-                c = int(s["correct"]) or 0
-                s["accuracy"] = (c / a) if a > 0 else 0.0
+            # Incrementally maintained per-type counters (O(types), independent of session length)
+            for item_type, counts in (await repo_async.read_progress(session_id)).items():
+                a = int(counts.get("attempts") or 0)
+                c = int(counts.get("correct") or 0)
+                stats[item_type] = {"attempts": a, "correct": c, "accuracy": (c / a) if a > 0 else 0.0}
         except Exception:
             stats = {}
     overall = {"attempts": 0, "correct": 0, "accuracy": 0.0}
@@ -57,44 +52,31 @@ def get_progress(request: Request) -> dict:
     return {"session_id": session_id, "by_type": stats, "overall": overall}
 
 @router.get("/events.csv")
-def export_events_csv(request: Request) -> Response:
+async def export_events_csv(request: Request) -> Response:
     session_id = request.cookies.get(SESSION_COOKIE)
     if not (session_id and selection_repo.is_enabled()):
-        return Response(content="ts,session_id,item_id,item_type,action,correct\n", media_type="text/csv")
-    try:
-        rows = selection_repo.read_events_for_session(session_id)
-        csv_rows = ["ts,session_id,serve_id,attempt_id,item_id,item_type,action,correct"]
-        for e in rows:
-            ts = (e.get("ts") or "").replace(",", " ")
-            sid = e.get("session_id") or ""
-            serve_id = e.get("serve_id") or ""
-            attempt_id = e.get("attempt_id") or ""
-            item_id = e.get("item_id") or ""
-            item_type = e.get("item_type") or ""
-            action = e.get("action") or ""
-            correct = "" if (e.get("correct") is None) else ("true" if bool(e.get("correct")) else "false")
-            csv_rows.append(
-                ",".join([ts, sid, serve_id, attempt_id, item_id, item_type, action, correct])
-            )
-        csv_data = "\n".join(csv_rows) + "\n"
-        return Response(content=csv_data, media_type="text/csv")
-    except Exception:
-        return Response(content="ts,session_id,item_id,item_type,action,correct\n", media_type="text/csv")
+        return Response(content=",".join(EVENT_CSV_COLUMNS) + "\n", media_type="text/csv")
+    # Streamed page by page (constant memory regardless of session length); Starlette iterates
+    # the sync generator in its threadpool, so paging I/O stays off the event loop
+    return StreamingResponse(
+        event_csv_chunks(selection_repo.iter_events_for_session(session_id)),
+        media_type="text/csv",
+    )
 
 # --- Playlist management ---
 @router.post("/playlist")
-def set_playlist(request: Request, body: dict) -> dict:
+async def set_playlist(request: Request, body: dict) -> dict:
     session_id = request.cookies.get(SESSION_COOKIE)
     ids = body.get("ids") if isinstance(body, dict) else None
     if not (session_id and isinstance(ids, list)):
         return {"ok": False}
-    state = selection_manager.set_playlist(session_id, [str(i) for i in ids if isinstance(i, (str, bytes))])
+    state = await repo_async.run_selection(selection_manager.set_playlist, session_id, [str(i) for i in ids if isinstance(i, (str, bytes))])
     return {"ok": True, "state": state}
 
 @router.delete("/playlist")
-def clear_playlist(request: Request) -> dict:
+async def clear_playlist(request: Request) -> dict:
     session_id = request.cookies.get(SESSION_COOKIE)
     if not session_id:
         return {"ok": False}
-    state = selection_manager.clear_playlist(session_id)
+    state = await repo_async.run_selection(selection_manager.clear_playlist, session_id)
     return {"ok": True, "state": state}
@@ -1,22 +1,78 @@
 from __future__ import annotations
 
-from collections import deque
-from typing import Any, Deque, Dict, List, Optional
+from collections import OrderedDict, deque
+from typing import Any, Callable, Container, Deque, Dict, List, Optional, Sequence, Set, TypeVar
 import os
 import random
+import threading
+import time
 from . import selection_repo
 from .policy_engine import choose_next_type
+from .store import Catalog, ItemMeta
+
+
+_UNKNOWN = -1  # _SessionState.version before the shared row has been read
+_SHARED_RETRIES = 8
+_T = TypeVar("_T")
+
+
+class _OrdinalQueue:
+    """Serve queue over a shared pool of catalog ordinals (the pool is never copied).
+
+    Shuffled queues draw with an incremental Fisher-Yates shuffle: each pop swaps a random
+    remaining position to the cursor, recording displaced positions in a sparse dict. Building
+    is O(1) and each pop is O(1) regardless of pool size. Ordinals in ``skip`` (the session's
+    current recent window) are consumed without being returned. Draws come from ``rng`` (the
+    session's generator), not the module-level ``random`` state.
+    """
+
+    __slots__ = ("_pool", "_shuffle", "_rng", "_cursor", "_swaps")
+
+    def __init__(self, pool: Sequence[int], *, rng: random.Random, shuffle: bool = True) -> None:
+        self._pool = pool
+        self._shuffle = shuffle
+        self._rng = rng
+        self._cursor = 0
+        self._swaps: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        # Upper bound: skipped ordinals are only discovered when drawn
+        return len(self._pool) - self._cursor
+
+    def pop(self, skip: Container[int] = ()) -> Optional[int]:
+        pool = self._pool
+        n = len(pool)
+        swaps = self._swaps
+        while self._cursor < n:
+            i = self._cursor
+            self._cursor = i + 1
+            if self._shuffle:
+                j = self._rng.randrange(i, n)
+                picked = swaps.get(j, j)
+                if j != i:
+                    swaps[j] = swaps.get(i, i)
+                swaps.pop(i, None)
+            else:
+                picked = i
+            ordinal = pool[picked]
+            if ordinal not in skip:
+                return ordinal
+        return None
 
 
 class _SessionState:
     def __init__(self, recent_window: int) -> None:
         self.recent_window: int = recent_window
         self.recent_ids: Deque[str] = deque(maxlen=recent_window)
-        self.queue: List[Dict[str, Any]] = []  # queued canonical items for this session
+        self.queue: Optional[_OrdinalQueue] = None  # queued catalog ordinals for this session
+        self.queue_generation: int = -1  # catalog generation the queue was built from
         self.last_type: Optional[str] = None
         self.active_type: Optional[str] = None  # queue corresponds to this type (None = all)
         self.serves_in_current_type: int = 0
         self.playlist_ids: Optional[List[str]] = None  # when set, restrict selection to these ids
+        self.last_access: float = time.monotonic()  # for idle-TTL eviction (not persisted)
+        self.version: Optional[int] = _UNKNOWN  # shared mode: row version last read/written (None = no row)
+        self.rng: Optional[random.Random] = None  # per-session shuffle generator, seeded on first queue build (not persisted)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -30,21 +86,45 @@ class _SessionState:
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "_SessionState":
-        recent_window = int(data.get("recent_window", 5))
-        s = cls(recent_window)
+        s = cls(int(data.get("recent_window", 5)))
+        s.apply(data)
+        return s
+
+    def apply(self, data: Dict[str, Any]) -> None:
+        """Overwrite persisted fields in place (keeps the local queue unless the playlist changed)."""
+        self.recent_ids.clear()
         for rid in data.get("recent_ids", []) or []:
             if isinstance(rid, str) and rid:
-                s.recent_ids.append(rid)
-        s.last_type = data.get("last_type")
-        s.active_type = data.get("active_type")
+                self.recent_ids.append(rid)
+        self.last_type = data.get("last_type")
+        self.active_type = data.get("active_type")
         try:
-            s.serves_in_current_type = int(data.get("serves_in_current_type", 0))
+            self.serves_in_current_type = int(data.get("serves_in_current_type", 0))
         except Exception:
-            s.serves_in_current_type = 0
+            self.serves_in_current_type = 0
         pl = data.get("playlist_ids")
-        if isinstance(pl, list):
-            s.playlist_ids = [str(x) for x in pl if isinstance(x, (str, bytes)) and str(x)]
-        return s
+        playlist_ids = [str(x) for x in pl if isinstance(x, (str, bytes)) and str(x)] if isinstance(pl, list) else None
+        if (playlist_ids or None) != self.playlist_ids:
+            self.queue = None
+        self.playlist_ids = playlist_ids or None
+
+
+class _Shard:
+    """One stripe of the session table: its own lock, LRU map, dirty set and counters."""
+
+    __slots__ = ("lock", "by_session", "dirty", "evicted_dirty", "evictions", "rehydrations", "conflicts", "session_locks")
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        # Shared mode: per-session locks (with in-flight counts) serialize one session's calls while
+        # its row I/O runs outside ``lock``; entries exist only while a call is in flight
+        self.session_locks: Dict[str, List[Any]] = {}
+        self.by_session: "OrderedDict[str, _SessionState]" = OrderedDict()  # LRU order (oldest first)
+        self.dirty: Set[str] = set()
+        self.evicted_dirty: Dict[str, Dict[str, Any]] = {}  # evicted before their flush
+        self.evictions = 0
+        self.rehydrations = 0
+        self.conflicts = 0  # shared mode: optimistic writes lost to another worker
 
 
 class SelectionManager:
@@ -54,41 +134,256 @@ class SelectionManager:
     - Optionally scopes selection by item.type (override via query param or last served type).
     - Optional simple policy: rotate to next type after N serves.
     - Optional policy engine stub: when enabled, recommends next type; defaults to same-type.
-    - Optional dev persistence: load/save state to a local JSON file when enabled.
-    - Rebuilds queue when the active type changes or the queue empties.
+    - Optional dev persistence: load/save state to a local JSON file when enabled. Writes are
+      write-behind: mutated sessions are marked dirty and flushed once per call (or by a background
+      flusher every SELECTION_FLUSH_INTERVAL_MS, bounding the lag), plus on shutdown.
+    - Rebuilds queue when the active type changes or the queue empties. Queues are lazily shuffled
+      views over precomputed per-type ordinal pools, so rebuilds and pops are O(1) in catalog size.
     - If exclusion yields no candidates (e.g., too few items), clears recent and rebuilds.
+    - Batch selection (next_metas) advances N times under one lock with a single flush.
+    - Bounded session table: LRU capacity (SELECTION_MAX_SESSIONS, default 10000) and idle TTL
+      (SELECTION_SESSION_TTL_S, default 3600; 0 disables). Evicted sessions are rehydrated lazily
+      from persistence on their next access; nothing is loaded eagerly at startup.
+    - Thread-safe with lock striping: sessions hash to one of SELECTION_SHARDS (default 16) shards,
+      each with its own lock and LRU table (capacity split evenly), so independent sessions proceed
+      in parallel under the threadpool that runs sync routes.
+    - Shared mode (SELECTION_SHARED_STATE=1 with DB_PERSIST_SELECTION=1): the SQLite row is the source
+      of truth so any worker process can serve any session. Each call writes with an optimistic
+      version check and, on conflict, reloads the row and retries. Queues stay per-worker caches;
+      pops always skip the (shared) recent window.
     """
 
     def __init__(self, recent_window: int = 5) -> None:
         self._recent_window = recent_window
-        self._by_session: Dict[str, _SessionState] = {}
-        # Load persisted state if enabled
-        if selection_repo.is_enabled():
-            raw = selection_repo.load_selection_state()
-            if isinstance(raw, dict):
-                for sid, payload in raw.items():
-                    try:
-                        self._by_session[sid] = _SessionState.from_dict(payload)
-                    except Exception:
-                        continue
-
-    def _save(self) -> None:
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_stop = threading.Event()
+        self._max_sessions, self._session_ttl_s, shards = self._get_bounds()
+        self._shards: tuple[_Shard, ...] = tuple(_Shard() for _ in range(shards))
+        self._shard_capacity = max(1, -(-self._max_sessions // shards))
+
+    @staticmethod
+    def _get_bounds() -> tuple[int, float, int]:
+        try:
+            max_sessions = int(os.environ.get("SELECTION_MAX_SESSIONS", "10000"))
+        except ValueError:
+            max_sessions = 10000
+        try:
+            ttl_s = float(os.environ.get("SELECTION_SESSION_TTL_S", "3600"))
+        except ValueError:
+            ttl_s = 3600.0
+        try:
+            shards = int(os.environ.get("SELECTION_SHARDS", "16"))
+        except ValueError:
+            shards = 16
+        return max(1, max_sessions), max(0.0, ttl_s), max(1, shards)
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Session table metrics (resident sessions, evictions, rehydrations, bounds)."""
+        resident = evictions = rehydrations = dirty = conflicts = 0
+        for shard in self._shards:
+            with shard.lock:
+                resident += len(shard.by_session)
+                evictions += shard.evictions
+                rehydrations += shard.rehydrations
+                dirty += len(shard.dirty) + len(shard.evicted_dirty)
+                conflicts += shard.conflicts
+        return {
+            "resident": resident,
+            "capacity": self._shard_capacity * len(self._shards),
+            "shards": len(self._shards),
+            "ttl_s": self._session_ttl_s,
+            "evictions": evictions,
+            "rehydrations": rehydrations,
+            "dirty": dirty,
+            "shared": selection_repo.is_shared(),
+            "conflicts": conflicts,
+        }
+
+    @staticmethod
+    def _mark_dirty(shard: _Shard, session_id: str) -> None:
+        if session_id and session_id != "s_anon":
+            shard.dirty.add(session_id)
+
+    def _flush_if_inline(self) -> None:
+        # Without a background flusher, persist once at the end of each public call
+        if self._flusher is None:
+            self.flush()
+
+    def flush(self) -> int:
+        """Persist dirty sessions only; returns the number of sessions written.
+
+        Snapshots are taken shard by shard under each shard lock and written under a separate
+        flush lock, so writes happen in snapshot order and selection is not blocked on I/O.
+        """
+        # Shards with nothing dirty are skipped without taking their lock (a racing mark is
+        # picked up by the next flush)
+        pending = [shard for shard in self._shards if shard.dirty or shard.evicted_dirty]
+        if not pending:
+            return 0
         if not selection_repo.is_enabled():
-            return
+            for shard in pending:
+                with shard.lock:
+                    shard.dirty.clear()
+                    shard.evicted_dirty.clear()
+            return 0
+        with self._flush_lock:
+            dirty: Dict[str, Dict[str, Any]] = {}
+            for shard in pending:
+                with shard.lock:
+                    dirty.update(shard.evicted_dirty)
+                    shard.evicted_dirty = {}
+                    dirty.update({sid: st.to_dict() for sid in shard.dirty if (st := shard.by_session.get(sid)) is not None})
+                    shard.dirty.clear()
+            if not dirty:
+                return 0
+            try:
+                selection_repo.save_selection_state(dirty)
+            except Exception:
+                pass
+            return len(dirty)
+
+    def start_background_flush(self) -> bool:
+        """Start the write-behind flusher when SELECTION_FLUSH_INTERVAL_MS > 0 (default 0 = inline)."""
         try:
-            serializable = {sid: st.to_dict() for sid, st in self._by_session.items() if sid and sid != "s_anon"}
-            selection_repo.save_selection_state(serializable)
+            interval_ms = int(os.environ.get("SELECTION_FLUSH_INTERVAL_MS", "0"))
+        except ValueError:
+            interval_ms = 0
+        if interval_ms <= 0 or self._flusher is not None:
+            return False
+        self._flusher_stop.clear()
+
+        def _run() -> None:
+            while not self._flusher_stop.wait(interval_ms / 1000.0):
+                self.flush()
+
+        self._flusher = threading.Thread(target=_run, name="selection-flusher", daemon=True)
+        self._flusher.start()
+        return True
+
+    def shutdown(self) -> None:
+        """Stop the background flusher (if any) and write any remaining dirty sessions."""
+        if self._flusher is not None:
+            self._flusher_stop.set()
+            self._flusher.join(timeout=5)
+            self._flusher = None
+        self.flush()
+
+    @staticmethod
+    def _evict(shard: _Shard, session_id: str) -> None:
+        state = shard.by_session.pop(session_id)
+        if session_id in shard.dirty:
+            # Keep the unflushed snapshot until the next flush writes it
+            shard.dirty.discard(session_id)
+            shard.evicted_dirty[session_id] = state.to_dict()
+        shard.evictions += 1
+
+    def _evict_expired_and_overflow(self, shard: _Shard, now: float) -> None:
+        # Oldest entries sit at the front, so expired sessions are found without a full scan
+        table = shard.by_session
+        while table:
+            sid, oldest = next(iter(table.items()))
+            expired = self._session_ttl_s > 0 and (now - oldest.last_access) > self._session_ttl_s
+            if not (expired or len(table) > self._shard_capacity):
+                break
+            self._evict(shard, sid)
+
+    @staticmethod
+    def _rehydrate(shard: _Shard, session_id: str) -> Optional[_SessionState]:
+        payload = shard.evicted_dirty.pop(session_id, None)
+        if payload is not None:
+            shard.dirty.add(session_id)  # still owes a write
+        elif session_id != "s_anon" and selection_repo.is_enabled() and not selection_repo.is_shared():
+            payload = selection_repo.load_session_state(session_id)
+        if not payload:
+            return None
+        try:
+            state = _SessionState.from_dict(payload)
         except Exception:
-            pass
-
-    def _get_state(self, session_id: str) -> _SessionState:
-        state = self._by_session.get(session_id)
-        if state is None:
-            state = _SessionState(self._recent_window)
-            self._by_session[session_id] = state
-            self._save()
+            return None
+        shard.rehydrations += 1
+        return state
+
+    def _get_state(self, shard: _Shard, session_id: str) -> _SessionState:
+        # Caller holds shard.lock
+        now = time.monotonic()
+        state = shard.by_session.get(session_id)
+        if state is not None:
+            shard.by_session.move_to_end(session_id)
+        else:
+            state = self._rehydrate(shard, session_id)
+            if state is None:
+                state = _SessionState(self._recent_window)
+                self._mark_dirty(shard, session_id)
+            shard.by_session[session_id] = state
+        state.last_access = now
+        self._evict_expired_and_overflow(shard, now)
         return state
 
+    @staticmethod
+    def _session_lock(shard: _Shard, session_id: str) -> threading.Lock:
+        with shard.lock:
+            entry = shard.session_locks.get(session_id)
+            if entry is None:
+                entry = shard.session_locks[session_id] = [threading.Lock(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    @staticmethod
+    def _release_session_lock(shard: _Shard, session_id: str) -> None:
+        with shard.lock:
+            entry = shard.session_locks[session_id]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del shard.session_locks[session_id]
+
+    def _call(self, session_id: str, fn: Callable[[_Shard, _SessionState], _T]) -> _T:
+        """Run ``fn`` on the session's state under its shard lock, then persist.
+
+        In shared mode the write is a compare-and-swap on the row version; a lost race reloads the
+        row and reruns ``fn``. After repeated conflicts the result is kept and the state is left
+        dirty for a last-writer-wins upsert on the next flush. The row read and the CAS run
+        outside the shard lock (only a per-session lock is held), so one session's database
+        waits never stall the other sessions of its shard.
+        """
+        shard = self._shard(session_id)
+        if session_id == "s_anon" or not selection_repo.is_shared():
+            with shard.lock:
+                out = fn(shard, self._get_state(shard, session_id))
+            self._flush_if_inline()
+            return out
+        session_lock = self._session_lock(shard, session_id)
+        try:
+            with session_lock:
+                for _ in range(_SHARED_RETRIES):
+                    # WAL reads are cheap and never block the writer; only apply rows another worker changed
+                    payload, version = selection_repo.load_versioned_state(session_id)
+                    with shard.lock:
+                        # Re-fetched each round: the state may have been evicted while unlocked
+                        state = self._get_state(shard, session_id)
+                        if version != state.version:
+                            if payload is not None:
+                                state.apply(payload)
+                            state.version = version
+                        out = fn(shard, state)
+                        snapshot, expected = state.to_dict(), state.version
+                    version = selection_repo.save_state_if_version(session_id, snapshot, expected)
+                    with shard.lock:
+                        if version is not None:
+                            state.version = version
+                            shard.dirty.discard(session_id)
+                            shard.evicted_dirty.pop(session_id, None)
+                            return out
+                        shard.conflicts += 1
+                        state.version = _UNKNOWN  # another worker wrote in between: reload and retry
+        finally:
+            self._release_session_lock(shard, session_id)
+        self._flush_if_inline()
+        return out
+
     @staticmethod
     def _normalize(value: Optional[str]) -> Optional[str]:
         if not isinstance(value, str):
@@ -120,14 +415,63 @@ class SelectionManager:
     def next_canonical(
         self,
         session_id: str,
-        canonicals: List[Dict[str, Any]],
+        catalog: Catalog,
         *,
         target_type: Optional[str] = None,
         policy: Optional[str] = None,
     ) -> Optional[Dict[str, Any]]:
-        if not canonicals:
+        """Select the next item and return its full canonical document."""
+        meta = self.next_meta(session_id, catalog, target_type=target_type, policy=policy)
+        return None if meta is None else catalog[meta.ordinal]
+
+    def next_meta(
+        self,
+        session_id: str,
+        catalog: Catalog,
+        *,
+        target_type: Optional[str] = None,
+        policy: Optional[str] = None,
+    ) -> Optional[ItemMeta]:
+        """Select the next item using the catalog metadata index only (no document bodies)."""
+        return self._call(
+            session_id,
+            lambda shard, state: self._advance(shard, state, session_id, catalog, target_type=target_type, policy=policy),
+        )
+
+    def next_metas(
+        self,
+        session_id: str,
+        catalog: Catalog,
+        count: int,
+        *,
+        target_type: Optional[str] = None,
+        policy: Optional[str] = None,
+    ) -> List[ItemMeta]:
+        """Advance selection ``count`` times (prefetch) under one lock and one persistence write."""
+
+        def _batch(shard: _Shard, state: _SessionState) -> List[ItemMeta]:
+            out: List[ItemMeta] = []
+            for _ in range(max(0, count)):
+                meta = self._advance(shard, state, session_id, catalog, target_type=target_type, policy=policy)
+                if meta is None:
+                    break
+                out.append(meta)
+            return out
+
+        return self._call(session_id, _batch)
+
+    def _advance(
+        self,
+        shard: _Shard,
+        state: _SessionState,
+        session_id: str,
+        catalog: Catalog,
+        *,
+        target_type: Optional[str] = None,
+        policy: Optional[str] = None,
+    ) -> Optional[ItemMeta]:
+        if not catalog:
             return None
-        state = self._get_state(session_id)
 
         policy_name, policy_n = self._get_policy(policy)
 
@@ -135,7 +479,7 @@ class SelectionManager:
         engine_enabled = policy_name == "engine"
         engine_reco: Optional[str] = None
         if engine_enabled:
-            available_types = [c.get("type", "") for c in canonicals]
+            available_types = list(catalog.type_norms())
             engine_reco = choose_next_type(
                 available_types=available_types,
                 last_type=state.last_type,
@@ -165,55 +509,63 @@ class SelectionManager:
             if self._normalize(target_type) != state.active_type:
                 state.serves_in_current_type = 0
                 state.active_type = None  # force rebuild for new type
-                self._save()
+                self._mark_dirty(shard, session_id)
 
-        # Build candidate pool: apply playlist restriction first (if any), then type filter
-        base_pool = list(canonicals)
+        # Build candidate pool as catalog ordinals: apply playlist restriction first (if any), then type filter.
+        # Without a playlist the pool is a precomputed per-type index (or the whole ordinal range), so
+        # nothing proportional to the catalog is copied. Selection never touches document bodies.
+        base_pool: Sequence[int] = ()
         if state.playlist_ids:
-            ids_set = set(state.playlist_ids)
-            base_pool = [c for c in base_pool if (c.get("id") or "") in ids_set]
-            if not base_pool:
-                # If playlist yields nothing, fall back to all canonicals
-                base_pool = list(canonicals)
-
-        if desired_type_norm:
-            pool = [c for c in base_pool if self._normalize(c.get("type")) == desired_type_norm]
-            if not pool:
-                # Fallback to base pool if requested type has no candidates
-                pool = list(base_pool)
-                desired_type_norm = None
+            base_pool = tuple(o for o in (catalog.ordinal(i) for i in dict.fromkeys(state.playlist_ids)) if o is not None)
+
+        pool: Sequence[int]
+        if base_pool:
+            pool = base_pool
+            if desired_type_norm:
+                metas = catalog.meta
+                pool = tuple(o for o in base_pool if self._normalize(metas[o].type) == desired_type_norm)
+        elif desired_type_norm:
+            pool = catalog.type_ordinals(desired_type_norm)
         else:
-            pool = list(base_pool)
-
-        # Refill queue if empty or type changed
-        if (not state.queue) or (state.active_type != desired_type_norm):
-            recent = set(state.recent_ids)
-            # If playlist is active, we want to preserve playlist order; otherwise shuffle
-            if state.playlist_ids:
-                ordered = [c for c in pool if (c.get("id") or "") in set(state.playlist_ids or [])]
-                candidates = [c for c in ordered if (c.get("id") or "") not in recent] or ordered
-            else:
-                candidates = [c for c in pool if (c.get("id") or "") not in recent]
-            if not candidates:
-                # Too few items; allow repeats by clearing recent and using pool
-                state.recent_ids.clear()
-                candidates = list(pool)
-            if not state.playlist_ids:
-                random.shuffle(candidates)
-            state.queue = candidates
+            pool = range(len(catalog))
+        if not pool:
+            # Fallback to base pool (or all canonicals) if requested type has no candidates
+            pool = base_pool or range(len(catalog))
+            desired_type_norm = None
+
+        ordered = bool(state.playlist_ids)  # playlists keep their order; otherwise shuffle
+        # Recent window as ordinals; pops skip these (in shared mode another worker may have served them)
+        recent = frozenset(o for o in (catalog.ordinal(r) for r in state.recent_ids) if o is not None)
+        chosen_ordinal: Optional[int] = None
+        # Refill queue if empty, type changed, or the catalog was reloaded since it was built
+        if (not state.queue) or (state.active_type != desired_type_norm) or (state.queue_generation != catalog.generation):
+            state.queue = None
+        elif (chosen_ordinal := state.queue.pop(recent)) is None:
+            state.queue = None  # only recently served entries were left
+        if state.queue is None:
+            if state.rng is None:
+                state.rng = random.Random(int.from_bytes(os.urandom(8), "big"))
+            state.queue = _OrdinalQueue(pool, shuffle=not ordered, rng=state.rng)
+            chosen_ordinal = state.queue.pop(recent)
+            if chosen_ordinal is None:
+                # Too few items; allow repeats (clearing recent unless following a playlist)
+                if not ordered:
+                    state.recent_ids.clear()
+                state.queue = _OrdinalQueue(pool, shuffle=not ordered, rng=state.rng)
+                chosen_ordinal = state.queue.pop()
+            state.queue_generation = catalog.generation
             state.active_type = desired_type_norm
             # When (re)building for a type, if that type matches last_type, keep counter; else reset
             if desired_type_norm != self._normalize(state.last_type):
                 state.serves_in_current_type = 0
-            self._save()
+            self._mark_dirty(shard, session_id)
 
-        # Pop next and record in recent
-        chosen = state.queue.pop(0)
-        item_id = chosen.get("id")
-        if isinstance(item_id, str) and item_id:
-            state.recent_ids.append(item_id)
+        # Record the chosen item in recent
+        chosen = catalog.meta[chosen_ordinal]
+        if chosen.id:
+            state.recent_ids.append(chosen.id)
         # Update last_type to the chosen item's type
-        chosen_type = chosen.get("type")
+        chosen_type = chosen.type
         chosen_type_norm = self._normalize(chosen_type)
         if chosen_type_norm:
             # If we just served within the current active type, increment counter
@@ -222,37 +574,41 @@ class SelectionManager:
             else:
                 state.serves_in_current_type = 1
             state.last_type = chosen_type
-            self._save()
+            self._mark_dirty(shard, session_id)
 
         # Simple policy: rotate type after N serves (only when no explicit type override present)
         if policy_name == "simple" and target_type is None and chosen_type_norm and not state.playlist_ids:
             if state.serves_in_current_type >= policy_n:
                 # Determine next type and force next call to rebuild queue for it
-                all_types = [c.get("type", "") for c in canonicals]
-                next_type_norm = self._next_type_in_order(all_types, chosen_type_norm)
+                next_type_norm = self._next_type_in_order(list(catalog.type_norms()), chosen_type_norm)
                 state.active_type = next_type_norm
                 state.serves_in_current_type = 0
-                state.queue = []  # force rebuild on next call
-                self._save()
+                state.queue = None  # force rebuild on next call
+                self._mark_dirty(shard, session_id)
 
         return chosen
 
     # --- Playlist helpers ---
     def set_playlist(self, session_id: str, ids: List[str]) -> Dict[str, Any]:
-        state = self._get_state(session_id)
         valid_ids = [i for i in (ids or []) if isinstance(i, str) and i]
-        state.playlist_ids = valid_ids or None
-        # Reset queue so next call rebuilds using playlist
-        state.queue = []
-        self._save()
-        return state.to_dict()
+
+        def _set(shard: _Shard, state: _SessionState) -> Dict[str, Any]:
+            state.playlist_ids = valid_ids or None
+            # Reset queue so next call rebuilds using playlist
+            state.queue = None
+            self._mark_dirty(shard, session_id)
+            return state.to_dict()
+
+        return self._call(session_id, _set)
 
     def clear_playlist(self, session_id: str) -> Dict[str, Any]:
-        state = self._get_state(session_id)
-        state.playlist_ids = None
-        state.queue = []
-        self._save()
-        return state.to_dict()
+        def _clear(shard: _Shard, state: _SessionState) -> Dict[str, Any]:
+            state.playlist_ids = None
+            state.queue = None
+            self._mark_dirty(shard, session_id)
+            return state.to_dict()
+
+        return self._call(session_id, _clear)
 
 
 # Singleton manager for app usage
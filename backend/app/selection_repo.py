@@ -1,17 +1,48 @@
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from . import event_writer
 from . import selection_repo_db as db_repo
+from .event_log import SegmentedEventLog, segment_bytes_from_env
+from .event_writer import EventWriter
 
 # File-based fallback implemented here (existing functions)
 import json
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime, timezone
 
 ROOT = Path(__file__).resolve().parents[2]
 DEV_DIR = ROOT / "dev_state"
 STATE_PATH = DEV_DIR / "selection_state.json"
-EVENTS_PATH = DEV_DIR / "events.ndjson"
+EVENTS_PATH = DEV_DIR / "events.ndjson"  # legacy single-file log, adopted into EVENTS_DIR
+EVENTS_DIR = DEV_DIR / "events"
+
+# File backend: selection_state.json is a compacted snapshot; saves append only the changed
+# sessions to selection_state.journal (one JSON line each), which is folded into the snapshot on
+# load and whenever it grows past STATE_JOURNAL_MAX_BYTES. The merged state stays resident.
+_file_state: Dict[str, Any] | None = None
+_journal_bytes = 0
+_state_lock = threading.Lock()
+# Background group-commit writer for attempt events (created on first use)
+_event_writer: EventWriter | None = None
+_event_writer_lock = threading.Lock()
+# File backend: segmented event log with a kept-open writer (created on first use)
+_event_log: SegmentedEventLog | None = None
+_event_log_lock = threading.Lock()
+# File backend progress rollups: session -> type -> [attempts, correct]. Built from the session's
+# events on first read, then maintained as events are written (under the same lock). An LRU
+# bounded by PROGRESS_ROLLUP_MAX sessions; an evicted session is rebuilt on its next read.
+_file_rollups: "OrderedDict[str, Dict[str, List[int]]]" = OrderedDict()
+_rollup_lock = threading.Lock()
+
+
+def _rollup_max() -> int:
+    try:
+        return max(1, int(os.environ.get("PROGRESS_ROLLUP_MAX", "10000")))
+    except ValueError:
+        return 10000
 
 
 def _file_is_enabled() -> bool:
@@ -24,6 +55,11 @@ def is_enabled() -> bool:
     return _file_is_enabled() or db_repo.is_enabled()
 
 
+def is_shared() -> bool:
+    # Shared multi-worker selection state is SQLite-only
+    return db_repo.is_shared()
+
+
 def init_if_needed() -> None:
     # Ensure dirs/tables
     if db_repo.is_enabled():
@@ -35,68 +71,276 @@ def init_if_needed() -> None:
             pass
 
 
+def _journal_path() -> Path:
+    return STATE_PATH.with_suffix(".journal")
+
+
+def _journal_max_bytes() -> int:
+    try:
+        return max(1024, int(os.environ.get("STATE_JOURNAL_MAX_BYTES", str(4 << 20))))
+    except ValueError:
+        return 4 << 20
+
+
+def _read_state_file() -> Dict[str, Any]:
+    """Snapshot plus journal replay (later lines win; a torn last line is skipped)."""
+    state: Dict[str, Any] = {}
+    try:
+        data = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+        if isinstance(data, dict):
+            state = data
+    except Exception:
+        pass
+    try:
+        with _journal_path().open("rb") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(rec, dict) and isinstance(rec.get("s"), str):
+                    state[rec["s"]] = rec.get("p")
+    except OSError:
+        pass
+    return state
+
+
+def _compact_locked() -> None:
+    """Write the resident state as the new snapshot (temp file + rename), then drop the journal.
+
+    A crash in between only leaves journal lines that replay to the same state.
+    """
+    global _journal_bytes
+    tmp = STATE_PATH.with_name(STATE_PATH.name + ".tmp")
+    tmp.write_text(json.dumps(_file_state, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, STATE_PATH)
+    _journal_path().unlink(missing_ok=True)
+    _journal_bytes = 0
+
+
+def _load_file_state_locked() -> Dict[str, Any]:
+    global _file_state
+    _file_state = _read_state_file()
+    if _journal_path().exists():
+        try:
+            _compact_locked()
+        except Exception:
+            pass
+    return _file_state
+
+
 def load_selection_state() -> Dict[str, Any]:
     if db_repo.is_enabled():
         return db_repo.load_selection_state()
     if not _file_is_enabled():
         return {}
-    if not STATE_PATH.exists():
-        return {}
-    try:
-        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
+    with _state_lock:
+        return dict(_load_file_state_locked())
+
+
+def load_session_state(session_id: str) -> Dict[str, Any] | None:
+    """Load one session's persisted state, or None when absent (lazy rehydration)."""
+    if db_repo.is_enabled():
+        return db_repo.load_session_state(session_id)
+    if not _file_is_enabled():
+        return None
+    with _state_lock:
+        state = _file_state if _file_state is not None else _load_file_state_locked()
+        payload = state.get(session_id)
+    return payload if isinstance(payload, dict) else None
+
+
+def load_versioned_state(session_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+    """Shared mode: one session's state and its row version (``(None, None)`` when absent)."""
+    return db_repo.load_versioned_state(session_id)
+
+
+def save_state_if_version(session_id: str, payload: Dict[str, Any], version: Optional[int]) -> Optional[int]:
+    """Shared mode: optimistic write; returns the new version or None when another worker won."""
+    return db_repo.save_state_if_version(session_id, payload, version)
 
 
 def save_selection_state(state: Dict[str, Any]) -> None:
+    """Upsert the given sessions (callers pass only the sessions that changed).
+
+    SQLite writes one row per given session. The file backend appends one journal line per
+    given session (O(changed sessions)); the full snapshot is rewritten only on compaction.
+    """
+    global _journal_bytes
     if db_repo.is_enabled():
         db_repo.save_selection_state(state)
         return
-    if not _file_is_enabled():
+    if not (_file_is_enabled() and state):
         return
     try:
-        tmp = json.dumps(state, ensure_ascii=False, separators=(",", ":"))
-        STATE_PATH.write_text(tmp, encoding="utf-8")
+        with _state_lock:
+            resident = _file_state if _file_state is not None else _load_file_state_locked()
+            resident.update(state)
+            lines = b"".join(
+                json.dumps({"s": sid, "p": payload}, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                for sid, payload in state.items()
+            )
+            STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with _journal_path().open("ab") as f:
+                f.write(lines)
+            _journal_bytes += len(lines)
+            if _journal_bytes > _journal_max_bytes():
+                _compact_locked()
     except Exception:
         pass
 
 
-def append_event(event: Dict[str, Any]) -> None:
+def _write_events_now(events: List[Dict[str, Any]]) -> None:
+    """Sink for the event writer: one transaction (SQLite) or one file append per batch."""
     if db_repo.is_enabled():
-        db_repo.append_event(event)
+        db_repo.append_events(events)
         return
     if not _file_is_enabled():
         return
+    with _rollup_lock:
+        _get_event_log().append(events)
+        for e in events:
+            rollup = _file_rollups.get(e.get("session_id") or "")
+            if rollup is not None:
+                _apply_to_rollup(rollup, e)
+
+
+def _apply_to_rollup(rollup: Dict[str, List[int]], event: Dict[str, Any]) -> None:
+    counts = rollup.setdefault((event.get("item_type") or "unknown").upper(), [0, 0])
+    if event.get("action") == "answered":
+        counts[0] += 1
+        if bool(event.get("correct")):
+            counts[1] += 1
+
+
+def _get_event_log() -> SegmentedEventLog:
+    global _event_log
+    with _event_log_lock:
+        if _event_log is None:
+            _event_log = SegmentedEventLog(EVENTS_DIR, segment_bytes=segment_bytes_from_env(), legacy_path=EVENTS_PATH)
+        return _event_log
+
+
+def _get_event_writer() -> EventWriter:
+    global _event_writer
+    with _event_writer_lock:
+        if _event_writer is None:
+            _event_writer = EventWriter.from_env(_write_events_now)
+        return _event_writer
+
+
+def append_event(event: Dict[str, Any]) -> None:
+    append_events([event])
+
+
+def append_events(events: List[Dict[str, Any]]) -> None:
+    """Record events, stamped now; queued for the background group-commit writer when enabled."""
+    if not (events and is_enabled()):
+        return
+    ts = datetime.now(timezone.utc).isoformat()
+    stamped = [{"ts": ts, **e} for e in events]
+    if event_writer.is_enabled():
+        _get_event_writer().submit(stamped)
+        return
     try:
-        DEV_DIR.mkdir(parents=True, exist_ok=True)
-        event_with_ts = {"ts": datetime.now(timezone.utc).isoformat(), **event}
-        with EVENTS_PATH.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(event_with_ts, ensure_ascii=False) + "\n")
+        _write_events_now(stamped)
     except Exception:
         pass
 
 
+def try_append_events(events: List[Dict[str, Any]]) -> bool:
+    """Non-blocking ``append_events``: True when the events were handled without I/O on this thread
+    (persistence off, or queued for the writer); False when the caller must use ``append_events``.
+    """
+    if not (events and is_enabled()):
+        return True
+    if not event_writer.is_enabled():
+        return False
+    ts = datetime.now(timezone.utc).isoformat()
+    return _get_event_writer().try_submit([{"ts": ts, **e} for e in events])
+
+
+def flush_events(timeout: float = 5.0) -> bool:
+    """Wait until queued events are written (read-your-writes for event readers)."""
+    writer = _event_writer
+    return True if writer is None else writer.flush(timeout)
+
+
+def shutdown_events() -> None:
+    """Flush and stop the background event writer, then close the file event log (app shutdown)."""
+    writer = _event_writer
+    if writer is not None:
+        writer.flush()
+        writer.stop()
+    if _event_log is not None:
+        _event_log.close()
+
+
+def event_writer_stats() -> Dict[str, Any] | None:
+    writer = _event_writer
+    return None if writer is None else writer.stats()
+
+
 def read_events_for_session(session_id: str) -> List[Dict[str, Any]]:
+    flush_events()
     if db_repo.is_enabled():
         return db_repo.read_events_for_session(session_id)
-    rows: List[Dict[str, Any]] = []
     if not (_file_is_enabled() and session_id):
-        return rows
-    if not EVENTS_PATH.exists():
-        return rows
+        return []
     try:
-        with EVENTS_PATH.open("r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    e = json.loads(line)
-                except Exception:
-                    continue
-                if e.get("session_id") != session_id:
-                    continue
-                rows.append(e)
+        return _get_event_log().read_session(session_id)
     except Exception:
         return []
-    return rows
+
+
+def iter_events_for_session(session_id: str) -> Iterator[Dict[str, Any]]:
+    """Stream one session's events (keyset pages in SQLite, indexed offsets in the file log)."""
+    flush_events()
+    if db_repo.is_enabled():
+        yield from db_repo.iter_events_for_session(session_id)
+        return
+    if not (_file_is_enabled() and session_id):
+        return
+    try:
+        yield from _get_event_log().iter_session(session_id)
+    except Exception:
+        return
+
+
+def iter_events_in_range(start: Optional[str], end: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Stream all sessions' events with ``start <= ts < end`` (bounds are UTC ISO strings or None)."""
+    flush_events()
+    if db_repo.is_enabled():
+        yield from db_repo.iter_events_in_range(start, end)
+        return
+    if not _file_is_enabled():
+        return
+    try:
+        yield from _get_event_log().iter_range(start, end)
+    except Exception:
+        return
+
+
+def read_progress(session_id: str) -> Dict[str, Dict[str, int]]:
+    """Per-type ``{"attempts", "correct"}`` for one session, read from the rollup in O(types)."""
+    flush_events()
+    if db_repo.is_enabled():
+        return db_repo.read_progress(session_id)
+    if not (_file_is_enabled() and session_id):
+        return {}
+    try:
+        with _rollup_lock:
+            rollup = _file_rollups.get(session_id)
+            if rollup is None:
+                rollup = {}
+                for e in _get_event_log().read_session(session_id):
+                    _apply_to_rollup(rollup, e)
+                _file_rollups[session_id] = rollup
+                limit = _rollup_max()
+                while len(_file_rollups) > limit:
+                    _file_rollups.popitem(last=False)
+            else:
+                _file_rollups.move_to_end(session_id)
+            return {t: {"attempts": a, "correct": c} for t, (a, c) in rollup.items()}
+    except Exception:
+        return {}
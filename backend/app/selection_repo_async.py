@@ -0,0 +1,88 @@
+"""Async facade over ``selection_repo`` for ``async def`` routes.
+
+SQLite and file I/O run on a dedicated, bounded executor (REPO_EXECUTOR_THREADS, default 4), so
+persistence never blocks the event loop and does not compete with Starlette's shared threadpool.
+Work that is known to be I/O-free stays on the loop: selection calls without persistence, and
+event appends that fit in the group-commit writer's queue.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from . import selection_repo
+
+_T = TypeVar("_T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_offloaded = 0
+_fast_path = 0
+
+
+def _threads_from_env() -> int:
+    try:
+        return max(1, int(os.environ.get("REPO_EXECUTOR_THREADS", "4")))
+    except ValueError:
+        return 4
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_threads_from_env(), thread_name_prefix="repo-io")
+        return _executor
+
+
+async def run(fn: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+    """Run a blocking repository call on the repository executor."""
+    global _offloaded
+    _offloaded += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_selection(fn: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+    """Run a SelectionManager operation: inline when in-memory only, offloaded when it may persist."""
+    global _fast_path
+    if not selection_repo.is_enabled():
+        _fast_path += 1
+        return fn(*args, **kwargs)
+    return await run(fn, *args, **kwargs)
+
+
+# --- Events ---
+async def append_events(events: List[Dict[str, Any]]) -> None:
+    global _fast_path
+    if selection_repo.try_append_events(events):
+        _fast_path += 1
+        return
+    await run(selection_repo.append_events, events)
+
+
+async def append_event(event: Dict[str, Any]) -> None:
+    await append_events([event])
+
+
+async def read_progress(session_id: str) -> Dict[str, Dict[str, int]]:
+    return await run(selection_repo.read_progress, session_id)
+
+
+# --- Lifecycle ---
+def shutdown() -> None:
+    """Wait for in-flight repository calls, then stop the executor (app shutdown)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def stats() -> Dict[str, Any]:
+    return {"threads": _threads_from_env(), "started": _executor is not None, "offloaded": _offloaded, "fast_path": _fast_path}
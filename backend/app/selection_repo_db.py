@@ -1,7 +1,7 @@
 import json
 import os
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from .db import connect, ensure_tables
 
 
@@ -10,12 +10,55 @@ def is_enabled() -> bool:
     return val in ("1", "true", "yes", "on")
 
 
+def is_shared() -> bool:
+    """Shared selection state across worker processes (requires DB_PERSIST_SELECTION)."""
+    val = os.environ.get("SELECTION_SHARED_STATE", "").strip().lower()
+    return is_enabled() and val in ("1", "true", "yes", "on")
+
+
 def init_db() -> None:
     if not is_enabled():
         return
     ensure_tables()
 
 
+# Served by idx_attempt_events_session (see tools/check_db_indexes.py)
+READ_EVENTS_FOR_SESSION_SQL = (
+    "SELECT ts, session_id, serve_id, attempt_id, item_id, item_type, action, correct, answer_ms "
+    "FROM attempt_events WHERE session_id=? ORDER BY id ASC"
+)
+
+_EVENT_COLUMNS = "id, ts, session_id, serve_id, attempt_id, item_id, item_type, action, correct, answer_ms"
+# Keyset pages (see tools/check_db_indexes.py): idx_attempt_events_session / idx_attempt_events_ts
+EVENTS_PAGE_FOR_SESSION_SQL = f"SELECT {_EVENT_COLUMNS} FROM attempt_events WHERE session_id=? AND id>? ORDER BY id LIMIT ?"
+EVENTS_PAGE_IN_RANGE_SQL = f"SELECT {_EVENT_COLUMNS} FROM attempt_events WHERE (ts, id) > (?, ?) AND ts < ? ORDER BY ts, id LIMIT ?"
+
+_STATE_COLUMNS = "last_type, active_type_norm, serves_in_current_type, recent_ids_json, playlist_ids_json"
+
+
+def _state_from_row(row: Any) -> Dict[str, Any]:
+    return {
+        "last_type": row["last_type"],
+        "active_type": row["active_type_norm"],
+        "serves_in_current_type": row["serves_in_current_type"],
+        "recent_window": 5,
+        "recent_ids": json.loads(row["recent_ids_json"] or "[]"),
+        "playlist_ids": json.loads(row["playlist_ids_json"]) if row["playlist_ids_json"] else None,
+    }
+
+
+def _state_params(payload: Dict[str, Any]) -> Tuple[Any, ...]:
+    playlist_ids = payload.get("playlist_ids")
+    return (
+        payload.get("last_type"),
+        payload.get("active_type"),
+        int(payload.get("serves_in_current_type") or 0),
+        json.dumps(payload.get("recent_ids") or [], ensure_ascii=False),
+        json.dumps(playlist_ids, ensure_ascii=False) if playlist_ids else None,
+        datetime.now(timezone.utc).isoformat(),
+    )
+
+
 def load_selection_state() -> Dict[str, Any]:
     if not is_enabled():
         return {}
@@ -23,21 +66,75 @@ def load_selection_state() -> Dict[str, Any]:
     try:
         with connect() as conn:
             cur = conn.cursor()
-            for row in cur.execute("SELECT session_id, last_type, active_type_norm, serves_in_current_type, recent_ids_json FROM selection_state"):
-                sid = row["session_id"]
-                out[sid] = {
-                    "last_type": row["last_type"],
-                    "active_type": row["active_type_norm"],
-                    "serves_in_current_type": row["serves_in_current_type"],
-                    "recent_window": 5,
-                    "recent_ids": json.loads(row["recent_ids_json"] or "[]"),
-                    # playlist_ids persisted later; DB schema remains minimal for dev
-                }
+            for row in cur.execute(f"SELECT session_id, {_STATE_COLUMNS} FROM selection_state"):
+                out[row["session_id"]] = _state_from_row(row)
     except Exception:
         return {}
     return out
 
 
+def load_session_state(session_id: str) -> Dict[str, Any] | None:
+    """Load one session's selection state (lazy rehydration), or None when absent."""
+    if not (is_enabled() and session_id):
+        return None
+    try:
+        with connect() as conn:
+            row = conn.execute(f"SELECT {_STATE_COLUMNS} FROM selection_state WHERE session_id=?", (session_id,)).fetchone()
+    except Exception:
+        return None
+    return None if row is None else _state_from_row(row)
+
+
+def load_versioned_state(session_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+    """Return ``(state, version)`` for one session; ``(None, None)`` when absent or on error."""
+    if not (is_enabled() and session_id):
+        return None, None
+    try:
+        with connect() as conn:
+            row = conn.execute(f"SELECT {_STATE_COLUMNS}, version FROM selection_state WHERE session_id=?", (session_id,)).fetchone()
+    except Exception:
+        return None, None
+    if row is None:
+        return None, None
+    return _state_from_row(row), int(row["version"] or 0)
+
+
+def save_state_if_version(session_id: str, payload: Dict[str, Any], version: Optional[int]) -> Optional[int]:
+    """Compare-and-swap one session's state; returns the new version, or None on conflict/error.
+
+    ``version`` None means the caller saw no row (insert only if still absent); otherwise the
+    row is updated only if its version is unchanged since the caller read it.
+    """
+    if not (is_enabled() and session_id):
+        return None
+    params = _state_params(payload)
+    try:
+        with connect() as conn:
+            if version is None:
+                cur = conn.execute(
+                    f"""
+                    INSERT INTO selection_state(session_id, {_STATE_COLUMNS}, updated_at, version)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+                    ON CONFLICT(session_id) DO NOTHING
+                    """,
+                    (session_id, *params),
+                )
+            else:
+                cur = conn.execute(
+                    """
+                    UPDATE selection_state SET
+                      last_type=?, active_type_norm=?, serves_in_current_type=?, recent_ids_json=?,
+                      playlist_ids_json=?, updated_at=?, version=version+1
+                    WHERE session_id=? AND version=?
+                    """,
+                    (*params, session_id, version),
+                )
+            conn.commit()
+            return ((version or 0) + 1) if cur.rowcount == 1 else None
+    except Exception:
+        return None
+
+
 def save_selection_state(state: Dict[str, Any]) -> None:
     if not is_enabled():
         return
@@ -45,26 +142,20 @@ def save_selection_state(state: Dict[str, Any]) -> None:
         with connect() as conn:
             cur = conn.cursor()
             for sid, payload in state.items():
-                recent_ids = payload.get("recent_ids") or []
                 cur.execute(
-                    """
-                    INSERT INTO selection_state(session_id, last_type, active_type_norm, serves_in_current_type, recent_ids_json, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    f"""
+                    INSERT INTO selection_state(session_id, {_STATE_COLUMNS}, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(session_id) DO UPDATE SET
                       last_type=excluded.last_type,
                       active_type_norm=excluded.active_type_norm,
                       serves_in_current_type=excluded.serves_in_current_type,
                       recent_ids_json=excluded.recent_ids_json,
-                      updated_at=excluded.updated_at
+                      playlist_ids_json=excluded.playlist_ids_json,
+                      updated_at=excluded.updated_at,
+                      version=selection_state.version+1
                     """,
-                    (
-                        sid,
-                        payload.get("last_type"),
-                        payload.get("active_type"),
-                        int(payload.get("serves_in_current_type") or 0),
-                        json.dumps(recent_ids, ensure_ascii=False),
-                        datetime.now(timezone.utc).isoformat(),
-                    ),
+                    (sid, *_state_params(payload)),
                 )
             conn.commit()
     except Exception:
@@ -72,53 +163,142 @@ def save_selection_state(state: Dict[str, Any]) -> None:
 
 
 def append_event(event: Dict[str, Any]) -> None:
-    if not is_enabled():
+    append_events([event])
+
+
+def _rollup_type(event: Dict[str, Any]) -> str:
+    return (event.get("item_type") or "unknown").upper()
+
+
+def append_events(events: List[Dict[str, Any]]) -> None:
+    """Insert events and update progress_rollup in one transaction (keeps each event's ``ts``)."""
+    if not (is_enabled() and events):
         return
+    ts = datetime.now(timezone.utc).isoformat()
+    # Per-batch deltas: every event creates its (session, type) row; answered events count
+    deltas: Dict[Tuple[str, str], List[int]] = {}
+    for e in events:
+        sid = e.get("session_id")
+        if not sid:
+            continue
+        d = deltas.setdefault((sid, _rollup_type(e)), [0, 0])
+        if e.get("action") == "answered":
+            d[0] += 1
+            d[1] += 1 if bool(e.get("correct")) else 0
     try:
         with connect() as conn:
             cur = conn.cursor()
-            cur.execute(
+            cur.executemany(
                 """
-                INSERT INTO attempt_events(ts, session_id, serve_id, attempt_id, item_id, item_type, action, correct)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO attempt_events(ts, session_id, serve_id, attempt_id, item_id, item_type, action, correct, answer_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                (
-                    datetime.now(timezone.utc).isoformat(),
-                    event.get("session_id"),
-                    event.get("serve_id"),
-                    event.get("attempt_id"),
-                    event.get("item_id"),
-                    event.get("item_type"),
-                    event.get("action"),
-                    1 if bool(event.get("correct")) else (None if event.get("correct") is None else 0),
-                ),
+                [
+                    (
+                        e.get("ts") or ts,
+                        e.get("session_id"),
+                        e.get("serve_id"),
+                        e.get("attempt_id"),
+                        e.get("item_id"),
+                        e.get("item_type"),
+                        e.get("action"),
+                        1 if bool(e.get("correct")) else (None if e.get("correct") is None else 0),
+                        e.get("answer_ms"),
+                    )
+                    for e in events
+                ],
+            )
+            cur.executemany(
+                """
+                INSERT INTO progress_rollup(session_id, item_type, attempts, correct) VALUES (?, ?, ?, ?)
+                ON CONFLICT(session_id, item_type) DO UPDATE SET
+                  attempts=attempts+excluded.attempts,
+                  correct=correct+excluded.correct
+                """,
+                [(sid, t, a, c) for (sid, t), (a, c) in deltas.items()],
             )
             conn.commit()
     except Exception:
         pass
 
 
+def read_progress(session_id: str) -> Dict[str, Dict[str, int]]:
+    """Per-type ``{"attempts", "correct"}`` for one session from the rollup (O(types))."""
+    out: Dict[str, Dict[str, int]] = {}
+    if not (is_enabled() and session_id):
+        return out
+    try:
+        with connect() as conn:
+            for row in conn.execute("SELECT item_type, attempts, correct FROM progress_rollup WHERE session_id=?", (session_id,)):
+                out[row["item_type"]] = {"attempts": int(row["attempts"]), "correct": int(row["correct"])}
+    except Exception:
+        return {}
+    return out
+
+
+def _event_from_row(row: Any) -> Dict[str, Any]:
+    return {
+        "ts": row["ts"],
+        "session_id": row["session_id"],
+        "serve_id": row["serve_id"],
+        "attempt_id": row["attempt_id"],
+        "item_id": row["item_id"],
+        "item_type": row["item_type"],
+        "action": row["action"],
+        "correct": (True if row["correct"] == 1 else (False if row["correct"] == 0 else None)),
+        "answer_ms": row["answer_ms"],
+    }
+
+
 def read_events_for_session(session_id: str) -> List[Dict[str, Any]]:
     rows: List[Dict[str, Any]] = []
     if not (is_enabled() and session_id):
         return rows
     try:
         with connect() as conn:
-            cur = conn.cursor()
-            for row in cur.execute(
-                "SELECT ts, session_id, serve_id, attempt_id, item_id, item_type, action, correct FROM attempt_events WHERE session_id=? ORDER BY id ASC",
-                (session_id,),
-            ):
-                rows.append({
-                    "ts": row["ts"],
-                    "session_id": row["session_id"],
-                    "serve_id": row["serve_id"],
-                    "attempt_id": row["attempt_id"],
-                    "item_id": row["item_id"],
-                    "item_type": row["item_type"],
-                    "action": row["action"],
-                    "correct": (True if row["correct"] == 1 else (False if row["correct"] == 0 else None)),
-                })
+            for row in conn.execute(READ_EVENTS_FOR_SESSION_SQL, (session_id,)):
+                rows.append(_event_from_row(row))
     except Exception:
         return []
     return rows
+
+
+def iter_events_for_session(session_id: str, *, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Stream one session's events in id order, one keyset page per query (constant memory).
+
+    Each page is fetched in full before rows are yielded, so no cursor stays open between pages
+    (consumers may resume on a different thread).
+    """
+    if not (is_enabled() and session_id):
+        return
+    last_id = 0
+    while True:
+        try:
+            with connect() as conn:
+                page = conn.execute(EVENTS_PAGE_FOR_SESSION_SQL, (session_id, last_id, page_size)).fetchall()
+        except Exception:
+            return
+        for row in page:
+            yield _event_from_row(row)
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["id"]
+
+
+def iter_events_in_range(start: Optional[str], end: Optional[str], *, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Stream all sessions' events with ``start <= ts < end`` in (ts, id) order via a keyset cursor."""
+    if not is_enabled():
+        return
+    cursor = (start or "", 0)
+    end = end or "\uffff"
+    while True:
+        try:
+            with connect() as conn:
+                page = conn.execute(EVENTS_PAGE_IN_RANGE_SQL, (*cursor, end, page_size)).fetchall()
+        except Exception:
+            return
+        for row in page:
+            yield _event_from_row(row)
+        if len(page) < page_size:
+            return
+        cursor = (page[-1]["ts"], page[-1]["id"])
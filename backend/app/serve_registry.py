@@ -0,0 +1,102 @@
+"""In-memory registry of recent serves, keyed by serve_id.
+
+``/api/item/next`` records every serve (session, item, catalog ordinal/generation, seed and
+time). ``/api/answer`` looks the serve_id up in O(1) to check that the answer belongs to that
+session and item, and to attribute time-to-answer (``answer_ms``) on the answered event, so
+analytics need not join served/answered rows.
+
+Bounded two ways: entries older than SERVE_REGISTRY_TTL_S (default 3600) expire, and past
+SERVE_REGISTRY_MAX entries (default 50000) the oldest are evicted (insertion order is serve
+order, so the map behaves as a ring buffer; see ``bounded_cache``). The registry is per process:
+with several workers, an answer routed to another worker finds no serve. With
+SERVE_REGISTRY_PERSIST=1 the live entries are written to ``dev_state/serve_registry.json`` on
+graceful shutdown only and reloaded on startup.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .bounded_cache import BoundedTTLMap, env_flag, env_int
+
+ROOT = Path(__file__).resolve().parents[2]
+DEV_DIR = ROOT / "dev_state"
+REGISTRY_PATH = DEV_DIR / "serve_registry.json"
+
+
+class ServeRecord(NamedTuple):
+    session_id: str
+    item_id: str
+    ordinal: int  # position in catalog ``generation`` (-1 when unknown)
+    generation: int
+    seed: Optional[str]
+    ts: float  # epoch seconds
+
+
+def is_persistent() -> bool:
+    return env_flag("SERVE_REGISTRY_PERSIST")
+
+
+def is_strict() -> bool:
+    return env_flag("SERVE_REGISTRY_STRICT")
+
+
+class ServeRegistry(BoundedTTLMap[ServeRecord]):
+    def __init__(self, *, max_entries: int = 50000, ttl_s: float = 3600.0) -> None:
+        super().__init__(max_entries=max_entries, ttl_s=ttl_s)
+        self.recorded = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "ServeRegistry":
+        return cls(max_entries=env_int("SERVE_REGISTRY_MAX", 50000), ttl_s=float(env_int("SERVE_REGISTRY_TTL_S", 3600)))
+
+    def record_many(self, serves: Iterable[Tuple[str, ServeRecord]]) -> None:
+        """Register serves (one lock acquisition per request, including ``?count=`` batches)."""
+        self.recorded += self.put_many(serves)
+
+    def record(self, serve_id: str, record: ServeRecord) -> None:
+        self.record_many([(serve_id, record)])
+
+    def get(self, serve_id: Optional[str]) -> Optional[ServeRecord]:
+        """The live record for ``serve_id``, or None when unknown or expired."""
+        if not serve_id:
+            return None
+        record = super().get(serve_id)
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "recorded": self.recorded, "hits": self.hits, "misses": self.misses}
+
+    # --- Optional persistence (SERVE_REGISTRY_PERSIST=1) ---
+    def _parse_row(self, row: List[Any]) -> ServeRecord:
+        session_id, item_id, ordinal, generation, seed, ts = row
+        return ServeRecord(str(session_id), str(item_id), int(ordinal), int(generation), seed, float(ts))
+
+    def save(self, path: Path = REGISTRY_PATH) -> int:
+        return super().save(path)
+
+    def load(self, path: Path = REGISTRY_PATH) -> int:
+        return super().load(path)
+
+
+serve_registry = ServeRegistry.from_env()
+
+
+def startup() -> None:
+    if is_persistent():
+        serve_registry.load()
+
+
+def shutdown() -> None:
+    if is_persistent():
+        try:
+            serve_registry.save()
+        except Exception:
+            pass
@@ -1,38 +1,608 @@
+import functools
 import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
 from pathlib import Path
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+
+from .catalog_snapshot import SnapshotError, read_snapshot, read_snapshot_index_from
+from .grading import GradingKey
+from .util import ServeTemplate
 
 _mock_item_serve: Dict[str, Any] | None = None
 _mock_submit_result: Dict[str, Any] | None = None
-_canonical_items: list[Dict[str, Any]] | None = None
-_canonical_by_id: Dict[str, Dict[str, Any]] | None = None
 
 ROOT = Path(__file__).resolve().parents[2]
+CANONICAL_DIR = ROOT / "data" / "canonical"
+DEFAULT_SNAPSHOT_PATH = ROOT / "data" / "catalog.snapshot"
+
+
+def _norm(value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    v = value.strip()
+    return v.lower() if v else None
+
+
+def _intern(value: Any) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else None
+
+
+def _freeze(index: Dict[str, list[int]]) -> Mapping[str, Tuple[int, ...]]:
+    return MappingProxyType({k: tuple(v) for k, v in index.items()})
+
+
+class ItemMeta(NamedTuple):
+    """Compact, always-resident metadata for one canonical item.
+
+    ``offset``/``length`` locate the document body inside the snapshot file; ``offset == -1``
+    means the body is read from ``source`` (file name under data/canonical).
+    """
+    id: str
+    type: Optional[str]
+    skill: Optional[str]
+    difficulty: Optional[str]
+    template_id: Optional[str]
+    status: Optional[str]
+    source: str = ""
+    offset: int = -1
+    length: int = 0
+    ordinal: int = -1
+
+
+def meta_from_doc(doc: Dict[str, Any], source: str = "") -> ItemMeta:
+    tags = doc.get("tags") or {}
+    cid = doc.get("id")
+    return ItemMeta(
+        id=cid if isinstance(cid, str) else "",
+        type=_intern(doc.get("type")),
+        skill=_intern(tags.get("skill")),
+        difficulty=_intern(tags.get("difficulty")),
+        template_id=_intern(doc.get("template_id")),
+        status=_intern(doc.get("status")),
+        source=source,
+    )
+
+
+class BodyCache:
+    """Size-bounded LRU of full canonical documents (and their compiled serve templates and
+    grading keys) for the lazy catalog mode. Keys are ``(source, offset, kind)``.
+
+    ``discard`` records the catalog generation that replaced a source; a load started by an
+    older generation still returns its value but is not cached, so a refresh cannot be undone
+    by a slow read that began before it.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self._entries: "OrderedDict[Tuple[str, int, str], Any]" = OrderedDict()
+        self._replaced: Dict[Tuple[str, int], int] = {}  # (source, offset) -> generation that replaced it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, int, str], load: Callable[[], Any], generation: int = 0) -> Any:
+        with self._lock:
+            doc = self._entries.get(key)
+            if doc is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return doc
+            self.misses += 1
+        doc = load()  # outside the lock; a concurrent miss may load the same body twice
+        with self._lock:
+            if generation < self._replaced.get(key[:2], 0):
+                return doc  # loaded for a catalog generation older than the source's replacement
+            self._entries[key] = doc
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return doc
+
+    def discard(self, source: str, offset: int, generation: int) -> None:
+        """Drop a source's entries; loads by catalogs older than ``generation`` are no longer cached."""
+        with self._lock:
+            self._replaced[(source, offset)] = generation
+            self._entries.pop((source, offset, "doc"), None)
+            self._entries.pop((source, offset, "serve"), None)
+            self._entries.pop((source, offset, "grade"), None)
+
+    def peek(self, key: Tuple[str, int, str]) -> Any:
+        """The cached value (counted as a hit), or None without loading anything."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class Catalog(Sequence):
+    """Immutable, indexed view over the loaded canonical items.
+
+    Built once per load; secondary indexes map a normalized key to item ordinals
+    (positions in the catalog) so that scoped lookups cost O(result) instead of O(catalog).
+    Indexed keys: id, type, tags.skill, tags.difficulty, template_id and status (all but id
+    lowercased). ``by_skill``/``by_difficulty``/``by_template``/``by_status`` return metadata, so
+    they never load bodies, even in lazy mode.
+    ``generation`` increases on every reload so holders of ordinals can detect a swap.
+
+    Metadata (``meta``) is always resident. Document bodies, their compiled serve templates
+    and grading keys are either resident (``docs`` given; templates/keys compiled here unless
+    passed in) or fetched on demand through ``loader``/``template_loader``/``grading_loader``
+    (lazy mode).
+    """
+
+    def __init__(
+        self,
+        metas: Iterable[ItemMeta] = (),
+        docs: Optional[Iterable[Dict[str, Any]]] = None,
+        *,
+        templates: Optional[Iterable[ServeTemplate]] = None,
+        gradings: Optional[Iterable[GradingKey]] = None,
+        generation: int = 0,
+        loader: Optional[Callable[[ItemMeta], Dict[str, Any]]] = None,
+        template_loader: Optional[Callable[[ItemMeta], ServeTemplate]] = None,
+        grading_loader: Optional[Callable[[ItemMeta], GradingKey]] = None,
+        peek: Optional[Callable[[ItemMeta, str], Any]] = None,
+    ) -> None:
+        self.generation = generation
+        self._meta: Tuple[ItemMeta, ...] = tuple(m._replace(ordinal=i) for i, m in enumerate(metas))
+        self._docs: Optional[Tuple[Dict[str, Any], ...]] = tuple(docs) if docs is not None else None
+        self._templates: Optional[Tuple[ServeTemplate, ...]] = None
+        if templates is not None:
+            self._templates = tuple(templates)
+        elif self._docs is not None:
+            self._templates = tuple(ServeTemplate(d) for d in self._docs)
+        self._gradings: Optional[Tuple[GradingKey, ...]] = None
+        if gradings is not None:
+            self._gradings = tuple(gradings)
+        elif self._docs is not None:
+            self._gradings = tuple(GradingKey(d) for d in self._docs)
+        self._loader = loader
+        self._template_loader = template_loader
+        self._grading_loader = grading_loader
+        self._peek = peek
+        by_id: Dict[str, int] = {}
+        by_type: Dict[str, list[int]] = {}
+        by_skill: Dict[str, list[int]] = {}
+        by_difficulty: Dict[str, list[int]] = {}
+        by_template: Dict[str, list[int]] = {}
+        by_status: Dict[str, list[int]] = {}
+        type_labels: set[str] = set()
+        for m in self._meta:
+            if m.id:
+                by_id[m.id] = m.ordinal
+            tnorm = _norm(m.type)
+            if tnorm:
+                by_type.setdefault(tnorm, []).append(m.ordinal)
+                type_labels.add(m.type.strip().upper())  # type: ignore[union-attr]
+            for index, key in (
+                (by_skill, _norm(m.skill)),
+                (by_difficulty, _norm(m.difficulty)),
+                (by_template, _norm(m.template_id)),
+                (by_status, _norm(m.status)),
+            ):
+                if key:
+                    index.setdefault(key, []).append(m.ordinal)
+        self._by_id: Mapping[str, int] = MappingProxyType(by_id)
+        self._by_type = _freeze(by_type)
+        self._by_skill = _freeze(by_skill)
+        self._by_difficulty = _freeze(by_difficulty)
+        self._by_template = _freeze(by_template)
+        self._by_status = _freeze(by_status)
+        self._type_labels: Tuple[str, ...] = tuple(sorted(type_labels))
+        self._type_norms: Tuple[str, ...] = tuple(sorted(by_type))
+        self._ids: Tuple[str, ...] = tuple(by_id)
+        self._ids_by_type: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+            t: tuple(self._meta[i].id for i in ordinals if self._meta[i].id) for t, ordinals in by_type.items()
+        })
+
+    @classmethod
+    def from_docs(cls, docs: Iterable[Dict[str, Any]], *, generation: int = 0) -> "Catalog":
+        """Fully resident catalog from parsed documents."""
+        docs = tuple(docs)
+        return cls((meta_from_doc(d) for d in docs), docs, generation=generation)
+
+    # --- Sequence protocol (positional access by ordinal; returns full documents) ---
+    def __getitem__(self, ordinal):  # type: ignore[override]
+        if self._docs is not None:
+            return self._docs[ordinal]
+        if isinstance(ordinal, slice):
+            return tuple(self[i] for i in range(*ordinal.indices(len(self._meta))))
+        return self._loader(self._meta[ordinal])  # type: ignore[misc]
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def serve_template(self, ordinal: int) -> ServeTemplate:
+        """Precompiled serve template for the item at ``ordinal``."""
+        if self._templates is not None:
+            return self._templates[ordinal]
+        return self._template_loader(self._meta[ordinal])  # type: ignore[misc]
+
+    def grading_key(self, ordinal: int) -> GradingKey:
+        """Precompiled answer key for the item at ``ordinal``."""
+        if self._gradings is not None:
+            return self._gradings[ordinal]
+        return self._grading_loader(self._meta[ordinal])  # type: ignore[misc]
+
+    def cached_serve_template(self, ordinal: int) -> Optional[ServeTemplate]:
+        """``serve_template`` when it is available without I/O (resident or cached), else None."""
+        if self._templates is not None:
+            return self._templates[ordinal]
+        return self._peek(self._meta[ordinal], "serve") if self._peek is not None else None
+
+    def cached_grading_key(self, ordinal: int) -> Optional[GradingKey]:
+        """``grading_key`` when it is available without I/O (resident or cached), else None."""
+        if self._gradings is not None:
+            return self._gradings[ordinal]
+        return self._peek(self._meta[ordinal], "grade") if self._peek is not None else None
+
+    @property
+    def resident(self) -> bool:
+        return self._docs is not None
+
+    @property
+    def items(self) -> Tuple[Dict[str, Any], ...]:
+        """All documents. In lazy mode this loads every body; prefer ``meta`` for scans."""
+        if self._docs is not None:
+            return self._docs
+        return tuple(self[i] for i in range(len(self._meta)))
+
+    @property
+    def meta(self) -> Tuple[ItemMeta, ...]:
+        return self._meta
+
+    # --- Lookups ---
+    def get(self, item_id: str) -> Dict[str, Any] | None:
+        ordinal = self._by_id.get(item_id)
+        if ordinal is None:
+            return None
+        try:
+            return self[ordinal]
+        except (OSError, ValueError):
+            # Lazy body vanished or is unreadable (e.g. file removed after this generation)
+            return None
+
+    def ordinal(self, item_id: str) -> Optional[int]:
+        return self._by_id.get(item_id)
+
+    def grading_key_of(self, item_id: str) -> Optional[GradingKey]:
+        ordinal = self._by_id.get(item_id)
+        if ordinal is None:
+            return None
+        try:
+            return self.grading_key(ordinal)
+        except (OSError, ValueError):
+            return None
+
+    def meta_of(self, item_id: str) -> Optional[ItemMeta]:
+        ordinal = self._by_id.get(item_id)
+        return None if ordinal is None else self._meta[ordinal]
+
+    def type_labels(self) -> Tuple[str, ...]:
+        """Unique item types, stripped and uppercased, sorted (for listings)."""
+        return self._type_labels
+
+    def type_norms(self) -> Tuple[str, ...]:
+        """Unique normalized (lowercased) item types, sorted (for policy rotation)."""
+        return self._type_norms
+
+    def type_ordinals(self, type_norm: Optional[str]) -> Tuple[int, ...]:
+        return self._by_type.get(type_norm or "", ())
+
+    def _metas(self, index: Mapping[str, Tuple[int, ...]], value: Optional[str]) -> Tuple[ItemMeta, ...]:
+        return tuple(self._meta[i] for i in index.get(_norm(value) or "", ()))
+
+    def by_skill(self, value: Optional[str]) -> Tuple[ItemMeta, ...]:
+        """Items tagged with this ``tags.skill`` (case-insensitive), in load order."""
+        return self._metas(self._by_skill, value)
+
+    def by_difficulty(self, value: Optional[str]) -> Tuple[ItemMeta, ...]:
+        return self._metas(self._by_difficulty, value)
+
+    def by_template(self, value: Optional[str]) -> Tuple[ItemMeta, ...]:
+        return self._metas(self._by_template, value)
+
+    def by_status(self, value: Optional[str]) -> Tuple[ItemMeta, ...]:
+        return self._metas(self._by_status, value)
+
+    def ids(self, type_value: Optional[str] = None) -> Tuple[str, ...]:
+        """Item ids in load order, optionally scoped to a type (case-insensitive)."""
+        if type_value is None:
+            return self._ids
+        return self._ids_by_type.get(_norm(type_value) or "", ())
+
+
+class SourceFile(NamedTuple):
+    """A loaded canonical file: stat signature (for change detection), metadata and,
+    unless the catalog is lazy, the parsed document, its compiled serve template and grading key."""
+    mtime_ns: int
+    size: int
+    meta: ItemMeta
+    doc: Optional[Dict[str, Any]]
+    template: Optional[ServeTemplate] = None
+    grading: Optional[GradingKey] = None
+
+
+def _source(mtime_ns: int, size: int, meta: ItemMeta, doc: Optional[Dict[str, Any]]) -> SourceFile:
+    if doc is None:
+        return SourceFile(mtime_ns, size, meta, None)
+    return SourceFile(mtime_ns, size, meta, doc, ServeTemplate(doc), GradingKey(doc))
+
+
+_catalog: Catalog = Catalog()
+_sources: Dict[str, SourceFile] = {}
+_reload_lock = threading.Lock()
+_load_info: Dict[str, Any] = {"source": None, "count": 0, "seconds": 0.0, "lazy": False}
+_lazy: bool = False
+_body_cache: BodyCache = BodyCache(1024)
+_snapshot_fh: Optional[BinaryIO] = None
+_snapshot_lock = threading.Lock()
+
+
+def snapshot_path() -> Optional[Path]:
+    """Snapshot location from env CATALOG_SNAPSHOT (path, or 0/off to disable)."""
+    val = os.environ.get("CATALOG_SNAPSHOT", "").strip()
+    if val.lower() in ("0", "false", "no", "off"):
+        return None
+    return Path(val) if val else DEFAULT_SNAPSHOT_PATH
+
+
+def _lazy_enabled() -> bool:
+    val = os.environ.get("CATALOG_LAZY", "").strip().lower()
+    return val in ("1", "true", "yes", "on")
+
+
+def _cache_capacity() -> int:
+    try:
+        return max(1, int(os.environ.get("CATALOG_CACHE_ITEMS", "1024")))
+    except ValueError:
+        return 1024
+
+
+def load_sources_from_files(canonical_dir: Path, *, keep_docs: bool = True) -> Dict[str, SourceFile]:
+    """Per-file loader: parse every ``*.json`` in the directory (bad files skipped)."""
+    sources: Dict[str, SourceFile] = {}
+    if canonical_dir.exists():
+        for p in sorted(canonical_dir.glob("*.json")):
+            try:
+                st = p.stat()
+                doc = json.loads(p.read_text(encoding="utf-8"))
+                sources[p.name] = _source(st.st_mtime_ns, st.st_size, meta_from_doc(doc, p.name), doc if keep_docs else None)
+            except Exception:
+                # Skip bad files quietly (keep startup quiet)
+                continue
+    return sources
+
+
+def load_sources_from_snapshot(path: Path, canonical_dir: Path | None = None) -> Dict[str, SourceFile]:
+    """Snapshot loader; raises SnapshotError when missing, corrupt, or stale."""
+    items, entries = read_snapshot(path, canonical_dir=canonical_dir)
+    return {e.file_name: _source(e.mtime_ns, e.size, meta_from_doc(doc, e.file_name), doc) for e, doc in zip(entries, items)}
+
+
+def load_meta_from_snapshot(f: BinaryIO, canonical_dir: Path | None = None) -> Dict[str, SourceFile]:
+    """Lazy snapshot loader over an open snapshot: metadata and body byte ranges only (no
+    document parsing). Offsets are valid for reads through ``f``."""
+    entries, body_start = read_snapshot_index_from(f, canonical_dir=canonical_dir)
+    return {
+        e.file_name: SourceFile(
+            e.mtime_ns,
+            e.size,
+            ItemMeta(
+                e.id, _intern(e.type), _intern(e.skill), _intern(e.difficulty), _intern(e.template_id),
+                _intern(e.status), e.file_name, body_start + e.offset, e.length,
+            ),
+            None,
+        )
+        for e in entries
+    }
+
+
+def _read_body(meta: ItemMeta) -> Dict[str, Any]:
+    if meta.offset >= 0 and _snapshot_fh is not None:
+        with _snapshot_lock:
+            _snapshot_fh.seek(meta.offset)
+            raw = _snapshot_fh.read(meta.length)
+        return json.loads(raw)
+    return json.loads((CANONICAL_DIR / meta.source).read_text(encoding="utf-8"))
+
+
+def _load_body(meta: ItemMeta, generation: int = 0) -> Dict[str, Any]:
+    return _body_cache.get((meta.source, meta.offset, "doc"), lambda: _read_body(meta), generation)
+
+
+def _load_template(meta: ItemMeta, generation: int = 0) -> ServeTemplate:
+    return _body_cache.get((meta.source, meta.offset, "serve"), lambda: ServeTemplate(_load_body(meta, generation)), generation)
+
+
+def _load_grading(meta: ItemMeta, generation: int = 0) -> GradingKey:
+    return _body_cache.get((meta.source, meta.offset, "grade"), lambda: GradingKey(_load_body(meta, generation)), generation)
+
+
+def _peek(meta: ItemMeta, kind: str) -> Any:
+    return _body_cache.peek((meta.source, meta.offset, kind))
+
+
+def _build_catalog(sources: Dict[str, SourceFile], generation: int) -> Catalog:
+    metas = (f.meta for f in sources.values())
+    if _lazy:
+        return Catalog(
+            metas,
+            generation=generation,
+            # Loaders carry the generation so a load finishing after a refresh is not cached
+            loader=functools.partial(_load_body, generation=generation),
+            template_loader=functools.partial(_load_template, generation=generation),
+            grading_loader=functools.partial(_load_grading, generation=generation),
+            peek=_peek,
+        )
+    return Catalog(
+        metas,
+        (f.doc for f in sources.values()),  # type: ignore[misc]
+        templates=(f.template for f in sources.values()),  # type: ignore[misc]
+        gradings=(f.grading for f in sources.values()),  # type: ignore[misc]
+        generation=generation,
+    )
+
+
+def _load_canonical_sources() -> Tuple[Dict[str, SourceFile], str]:
+    global _snapshot_fh
+    path = snapshot_path()
+    if path is not None and path.exists():
+        try:
+            if not _lazy:
+                return load_sources_from_snapshot(path, CANONICAL_DIR), "snapshot"
+            # Open first and verify through the handle that body reads will use: a rebuild or
+            # os.replace of the path afterwards cannot swap the bytes behind the offsets
+            fh = path.open("rb")
+            try:
+                sources = load_meta_from_snapshot(fh, CANONICAL_DIR)
+            except Exception:
+                fh.close()
+                raise
+            _snapshot_fh = fh
+            return sources, "snapshot"
+        except (SnapshotError, OSError):
+            pass
+    return load_sources_from_files(CANONICAL_DIR, keep_docs=not _lazy), "files"
 
 
 def load_mocks() -> None:
-    global _mock_item_serve, _mock_submit_result, _canonical_items, _canonical_by_id
+    global _mock_item_serve, _mock_submit_result, _catalog, _sources, _lazy, _body_cache, _snapshot_fh
     item_path = ROOT / "mock_item_serve.json"
     result_path = ROOT / "mock_submit_result.json"
     if item_path.exists():
         _mock_item_serve = json.loads(item_path.read_text(encoding="utf-8"))
     if result_path.exists():
         _mock_submit_result = json.loads(result_path.read_text(encoding="utf-8"))
-    # Load any canonical JSON files for local MVP serve adapter
-    canonical_dir = ROOT / "data" / "canonical"
-    _canonical_items = []
-    _canonical_by_id = {}
-    if canonical_dir.exists():
-        for p in canonical_dir.glob("*.json"):
+    # Load canonical items for local MVP serve adapter: compiled snapshot when present and
+    # valid, else the per-file glob of data/canonical/*.json. With CATALOG_LAZY=1 only the
+    # metadata index stays resident; bodies go through a CATALOG_CACHE_ITEMS-bounded LRU.
+    started = time.perf_counter()
+    with _reload_lock:
+        if _snapshot_fh is not None:
+            _snapshot_fh.close()
+            _snapshot_fh = None
+        _lazy = _lazy_enabled()
+        _body_cache = BodyCache(_cache_capacity())
+        sources, source = _load_canonical_sources()
+        _sources = sources
+        _catalog = _build_catalog(sources, _catalog.generation + 1)
+    _load_info.update(source=source, count=len(_catalog), seconds=round(time.perf_counter() - started, 4), lazy=_lazy)
+
+
+def refresh_catalog(canonical_dir: Path | None = None) -> Dict[str, int]:
+    """Incrementally reload the catalog from ``data/canonical`` (or ``canonical_dir``).
+
+    Only files whose (mtime, size) changed, or that were added, are re-parsed; removed files
+    are dropped. When anything changed, a new Catalog generation is built from the retained
+    documents and swapped in with a single reference assignment, so a request that read
+    ``get_catalog()`` keeps a consistent view. A file that fails to parse (e.g. mid-write)
+    keeps its previous document and is retried on the next refresh.
+    """
+    global _catalog, _sources
+    directory = canonical_dir or CANONICAL_DIR
+    counts = {"added": 0, "changed": 0, "removed": 0}
+    with _reload_lock:
+        generation = _catalog.generation + 1
+        current: Dict[str, os.stat_result] = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        current[entry.name] = entry.stat()
+        except OSError:
+            return counts
+        sources = dict(_sources)
+        for name in list(sources):
+            if name not in current:
+                _body_cache.discard(name, sources[name].meta.offset, generation)
+                del sources[name]
+                counts["removed"] += 1
+        for name, st in current.items():
+            prev = sources.get(name)
+            if prev is not None and (prev.mtime_ns, prev.size) == (st.st_mtime_ns, st.st_size):
+                continue
             try:
-                obj = json.loads(p.read_text(encoding="utf-8"))
-                _canonical_items.append(obj)
-                cid = obj.get("id")
-                if isinstance(cid, str) and cid:
-                    _canonical_by_id[cid] = obj
+                doc = json.loads((directory / name).read_text(encoding="utf-8"))
+                meta = meta_from_doc(doc, name)
             except Exception:
-                # Skip bad files quietly (keep startup quiet)
                 continue
+            if prev is not None:
+                _body_cache.discard(name, prev.meta.offset, generation)
+            sources[name] = _source(st.st_mtime_ns, st.st_size, meta, None if _lazy else doc)
+            counts["changed" if prev is not None else "added"] += 1
+        if any(counts.values()):
+            ordered = {name: sources[name] for name in sorted(sources)}
+            _sources = ordered
+            _catalog = _build_catalog(ordered, generation)
+            _load_info.update(count=len(_catalog))
+    return counts
+
+
+class CatalogWatcher(threading.Thread):
+    """Opt-in polling watcher (env CATALOG_WATCH=1) that calls refresh_catalog() every interval."""
+
+    def __init__(self, interval_s: float) -> None:
+        super().__init__(name="catalog-watcher", daemon=True)
+        self.interval_s = interval_s
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_s):
+            try:
+                refresh_catalog()
+            except Exception:
+                # Dev-only; keep serving the current generation
+                continue
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+_watcher: CatalogWatcher | None = None
+
+
+def start_catalog_watcher() -> bool:
+    """Start the watcher when CATALOG_WATCH is on (interval: CATALOG_WATCH_INTERVAL_S, default 2)."""
+    global _watcher
+    val = os.environ.get("CATALOG_WATCH", "").strip().lower()
+    if val not in ("1", "true", "yes", "on") or _watcher is not None:
+        return False
+    try:
+        interval = float(os.environ.get("CATALOG_WATCH_INTERVAL_S", "2"))
+    except ValueError:
+        interval = 2.0
+    _watcher = CatalogWatcher(max(0.1, interval))
+    _watcher.start()
+    return True
+
+
+def stop_catalog_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher.join(timeout=5)
+        _watcher = None
 
 
 def get_mock_item_serve() -> Dict[str, Any]:
@@ -61,14 +631,24 @@ def get_mock_submit_result() -> Dict[str, Any]:
     return json.loads(json.dumps(_mock_submit_result))
 
 
-def list_canonical_items() -> list[Dict[str, Any]]:
-    """Return loaded canonical items (may be empty)."""
-    global _canonical_items
-    return list(_canonical_items or [])
+def get_catalog() -> Catalog:
+    """Return the current catalog (read once per request for a consistent view)."""
+    return _catalog
+
+
+def get_load_info() -> Dict[str, Any]:
+    """Where the catalog came from (snapshot|files), item count, load time, generation and,
+    in lazy mode, body cache counters (hits/misses/evictions)."""
+    info = {**_load_info, "generation": _catalog.generation}
+    if _lazy:
+        info["cache"] = _body_cache.stats()
+    return info
+
+
+def list_canonical_items() -> Tuple[Dict[str, Any], ...]:
+    """Return loaded canonical items as an immutable view (may be empty; loads all bodies in lazy mode)."""
+    return _catalog.items
 
 
 def get_canonical_by_id(item_id: str) -> Dict[str, Any] | None:
-    global _canonical_by_id
-    if not _canonical_by_id:
-        return None
-    return _canonical_by_id.get(item_id)
+    return _catalog.get(item_id)
@@ -1,24 +1,60 @@
+import hashlib
+import json
 import os
-import random
+import secrets
 import time
 from typing import Dict, Any, List, Optional
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from starlette.requests import Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from .rate_limit import RateLimiter
 
-def randomize_choice_order(payload: Dict[str, Any]) -> Dict[str, Any]:
+def new_serve_seed() -> str:
+    # 64 bits from the OS CSPRNG: serves are reconstructible from (item_id, seed), so seeds must not collide
+    return secrets.token_hex(8)
+
+
+class ServeShuffler:
+    """Per-serve PRNG: all randomness of one serve derives from (item_id, seed).
+
+    Fisher-Yates driven by a BLAKE2b stream over ``item_id:seed`` plus a block counter, so a serve
+    can be regenerated in any process, and no state is shared between requests (unlike the global
+    ``random`` module). Hashing is about half the cost of seeding a ``random.Random`` (MT19937
+    init) per request.
+    """
+
+    __slots__ = ("_key", "_block", "_pool")
+
+    def __init__(self, item_id: Any, seed: str) -> None:
+        self._key = f"{item_id}:{seed}".encode("utf-8")
+        self._block = 0
+        self._pool = 0  # unused stream entropy, consumed by divmod
+
+    def shuffled(self, ids: List[Any]) -> List[Any]:
+        order = list(ids)
+        pool = self._pool
+        for i in range(len(order) - 1, 0, -1):
+            if pool < (1 << 64):  # keep >= 64 bits in the pool: modulo bias is negligible
+                digest = hashlib.blake2b(self._key + self._block.to_bytes(4, "big"), digest_size=64).digest()
+                pool = int.from_bytes(digest, "big")
+                self._block += 1
+            pool, j = divmod(pool, i + 1)
+            order[i], order[j] = order[j], order[i]
+        self._pool = pool
+        return order
+
+
+def randomize_choice_order(payload: Dict[str, Any], seed: Optional[str] = None) -> Dict[str, Any]:
+    """Set choice orders derived from ``seed`` (new when omitted; stored as ``serve.seed``)."""
+    seed = seed or new_serve_seed()
+    payload.setdefault("serve", {})["seed"] = seed
+    rng = ServeShuffler((payload.get("item") or {}).get("id"), seed)
     # Support both top-level choices and per-step choices
     if "choices" in payload and payload.get("choices"):
-        ids = [c.get("id") for c in payload["choices"]]
-        random.shuffle(ids)
-        payload.setdefault("serve", {})["choice_order"] = ids
+        payload["serve"]["choice_order"] = rng.shuffled([c.get("id") for c in payload["choices"]])
     elif payload.get("item", {}).get("steps"):
         # Randomize each step's local order into a parallel array on step.serve.choice_order
         for step in payload["item"]["steps"]:
-            ids = [c.get("id") for c in (step.get("choices") or [])]
-            random.shuffle(ids)
-            step.setdefault("serve", {})["choice_order"] = ids
+            step.setdefault("serve", {})["choice_order"] = rng.shuffled([c.get("id") for c in (step.get("choices") or [])])
     return payload
 
 
@@ -28,94 +64,166 @@ def make_watermark(session_id: str) -> str:
     return f"{session_id}_{bucket}"
 
 
-def canonical_to_serve(
-    canonical: Dict[str, Any],
-    *,
-    session_id: str,
-    media_base_url: str = "/media",
-    contract_version: str = "1.0",
-) -> Dict[str, Any]:
-    """Transform a canonical item (server-only) to a minimal serve snapshot.
-
-    This local adapter uses plain media URLs under /media and a stub ttl_s.
-    """
-    item_media = []
-    for m in canonical.get("media", []) or []:
+def _serve_media(media: List[Dict[str, Any]] | None, media_base_url: str) -> List[Dict[str, Any]]:
+    out = []
+    for m in media or []:
         object_key = m.get("object_key") or ""
-        signed_url = f"{media_base_url}/{object_key}"
-        item_media.append({
+        out.append({
             "id": m.get("id"),
-            "signed_url": signed_url,
+            "signed_url": f"{media_base_url}/{object_key}",
             "ttl_s": 120,
             "alt": m.get("alt", ""),
             **({"long_alt": m.get("long_alt")} if m.get("long_alt") else {}),
         })
+    return out
+
+
+# Placeholder used to cut the encoded template into static byte chunks; contains NUL so it
+# cannot collide with authored content in practice (checked at compile time anyway).
+_SLOT = "\x00ev3_slot\x00"
+
+
+def encode_json(obj: Any) -> bytes:
+    """Encode exactly like Starlette's JSONResponse.render (compact, UTF-8, no NaN)."""
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
 
-    # Build steps (if present) for multi-step items; otherwise use top-level choices
-    steps = canonical.get("steps") or []
-    serve_steps: List[Dict[str, Any]] = []
-    top_level_choices: List[Dict[str, Any]] = []
-    if steps:
-        for step in steps:
+
+class ServeTemplate:
+    """Precompiled, request-independent part of a serve snapshot for one canonical item.
+
+    Compiled once per catalog load; ``render`` only overlays the per-request fields
+    (session_id, serve.seed/id/watermark and the shuffled choice orders). Static parts
+    (content, media, choices) are shared between renders and must not be mutated.
+    Media URLs are plain /media paths in the local adapter, so they are part of the template.
+    """
+
+    __slots__ = ("item_id", "item_type", "version", "_item", "_steps", "_step_choice_ids", "_choices", "_chunks")
+
+    def __init__(
+        self,
+        canonical: Dict[str, Any],
+        *,
+        media_base_url: str = "/media",
+        contract_version: str = "1.0",
+    ) -> None:
+        self.item_id = canonical.get("id", "i_local")
+        self.item_type = canonical.get("type", "mcq")
+        self.version = contract_version
+        steps: List[Dict[str, Any]] = []
+        step_choice_ids: List[List[Any]] = []
+        for step in canonical.get("steps") or []:
             serve_choices: List[Dict[str, Any]] = []
             for ch in (step.get("choices") or []):
-                choice_media = []
-                for cm in (ch.get("media") or []):
-                    object_key = cm.get("object_key") or ""
-                    signed_url = f"{media_base_url}/{object_key}"
-                    choice_media.append({
-                        "id": cm.get("id"),
-                        "signed_url": signed_url,
-                        "ttl_s": 120,
-                        "alt": cm.get("alt", ""),
-                        **({"long_alt": cm.get("long_alt")} if cm.get("long_alt") else {}),
-                    })
                 payload_choice: Dict[str, Any] = {"id": ch.get("id"), "text": ch.get("text")}
+                choice_media = _serve_media(ch.get("media"), media_base_url)
                 if choice_media:
                     payload_choice["media"] = choice_media
                 serve_choices.append(payload_choice)
-
-            serve_steps.append(
-                {
-                    "step_id": step.get("step_id"),
-                    "prompt": {"html": (step.get("prompt") or {}).get("html", "")},
-                    "choices": serve_choices,
-                }
-            )
-    else:
-        # Single-step/simple item: expose choices at the top level (with optional media)
-        for ch in (canonical.get("steps") or [{}])[0].get("choices", []) if canonical.get("steps") else []:
-            payload_choice = {"id": ch.get("id"), "text": ch.get("text")}
-            choice_media = []
-            for cm in (ch.get("media") or []):
-                object_key = cm.get("object_key") or ""
-                signed_url = f"{media_base_url}/{object_key}"
-                choice_media.append({
-                    "id": cm.get("id"),
-                    "signed_url": signed_url,
-                    "ttl_s": 120,
-                    "alt": cm.get("alt", ""),
-                    **({"long_alt": cm.get("long_alt")} if cm.get("long_alt") else {}),
-                })
-            if choice_media:
-                payload_choice["media"] = choice_media
-            top_level_choices.append(payload_choice)  # type: ignore[arg-type]
-
-    serve_payload: Dict[str, Any] = {
-        "version": contract_version,
-        "session_id": session_id,
-        "item": {
-            "id": canonical.get("id", "i_local"),
-            "type": canonical.get("type", "mcq"),
+            steps.append({
+                "step_id": step.get("step_id"),
+                "prompt": {"html": (step.get("prompt") or {}).get("html", "")},
+                "choices": serve_choices,
+            })
+            step_choice_ids.append([c["id"] for c in serve_choices])
+        self._steps = tuple(steps)
+        self._step_choice_ids = tuple(step_choice_ids)
+        # Items without steps expose an (empty) top-level choices list, as before
+        self._choices: List[Dict[str, Any]] = []
+        self._item: Dict[str, Any] = {
+            "id": self.item_id,
+            "type": self.item_type,
             "title": canonical.get("title"),
             "content": {"html": (canonical.get("content") or {}).get("html", "")},
-            "media": item_media,
-        } | ({"steps": serve_steps} if serve_steps else {}),
-        **({"choices": top_level_choices} if not serve_steps else {}),
-        "serve": {"seed": f"s{random.randint(1000,9999)}", "choice_order": [], "watermark": ""},
-        "ui": {"layout": "question-above-choices", "actions": ["submit"]},
-    }
-    return serve_payload
+            "media": _serve_media(canonical.get("media"), media_base_url),
+        }
+        self._chunks: Optional[List[bytes]] = None
+
+    def _assemble(self, session_id: Any, step_orders: List[Any] | None, serve: Any) -> Dict[str, Any]:
+        item = dict(self._item)
+        if self._steps:
+            if step_orders is None:
+                item["steps"] = [dict(step) for step in self._steps]
+            else:
+                item["steps"] = [{**step, "serve": {"choice_order": order}} for step, order in zip(self._steps, step_orders)]
+        payload: Dict[str, Any] = {"version": self.version, "session_id": session_id, "item": item}
+        if not self._steps:
+            payload["choices"] = self._choices
+        payload["serve"] = serve
+        payload["ui"] = {"layout": "question-above-choices", "actions": ["submit"]}
+        return payload
+
+    def _per_request(
+        self, serve_id: Optional[str], watermark: str, seed: Optional[str], shuffle: bool
+    ) -> tuple[List[List[Any]] | None, Dict[str, Any]]:
+        seed = seed or new_serve_seed()
+        step_orders = self.choice_orders(seed) if shuffle else None
+        serve: Dict[str, Any] = {"seed": seed, "choice_order": [], "watermark": watermark}
+        if serve_id is not None:
+            serve["id"] = serve_id
+        return step_orders, serve
+
+    def choice_orders(self, seed: str) -> List[List[Any]]:
+        """Per-step choice orders of the serve with ``seed`` (reconstructs a past serve exactly)."""
+        rng = ServeShuffler(self.item_id, seed)
+        return [rng.shuffled(ids) for ids in self._step_choice_ids]
+
+    def render(
+        self,
+        *,
+        session_id: str,
+        serve_id: Optional[str] = None,
+        watermark: str = "",
+        seed: Optional[str] = None,
+        shuffle: bool = True,
+    ) -> Dict[str, Any]:
+        """Serve snapshot for one request (choice orders shuffled unless ``shuffle`` is False)."""
+        step_orders, serve = self._per_request(serve_id, watermark, seed, shuffle)
+        return self._assemble(session_id, step_orders, serve)
+
+    def render_bytes(
+        self,
+        *,
+        session_id: str,
+        serve_id: Optional[str] = None,
+        watermark: str = "",
+        seed: Optional[str] = None,
+    ) -> bytes:
+        """Encoded serve snapshot: the static part is encoded once and cached as byte chunks,
+        and only the per-request values are encoded and spliced in. Output is byte-identical
+        to ``encode_json(self.render(...))``."""
+        chunks = self._chunks
+        if chunks is None:
+            slot_count = len(self._steps) + 2  # session_id, one choice order per step, serve
+            skeleton = encode_json(self._assemble(_SLOT, [_SLOT] * len(self._steps), _SLOT))
+            chunks = skeleton.split(encode_json(_SLOT))
+            if len(chunks) != slot_count + 1:
+                chunks = []  # placeholder collided with content; always use the generic encoder
+            self._chunks = chunks
+        step_orders, serve = self._per_request(serve_id, watermark, seed, True)
+        if not chunks:
+            return encode_json(self._assemble(session_id, step_orders, serve))
+        values = [session_id, *(step_orders or []), serve]
+        out = [chunks[0]]
+        for value, chunk in zip(values, chunks[1:]):
+            out.append(encode_json(value))
+            out.append(chunk)
+        return b"".join(out)
+
+
+def canonical_to_serve(
+    canonical: Dict[str, Any],
+    *,
+    session_id: str,
+    media_base_url: str = "/media",
+    contract_version: str = "1.0",
+) -> Dict[str, Any]:
+    """Transform a canonical item (server-only) to a minimal serve snapshot.
+
+    This local adapter uses plain media URLs under /media and a stub ttl_s.
+    Hot paths should render a precompiled ServeTemplate instead (see Catalog.serve_template).
+    """
+    template = ServeTemplate(canonical, media_base_url=media_base_url, contract_version=contract_version)
+    return template.render(session_id=session_id, shuffle=False)
 
 
 # --- CSRF helpers ---
@@ -139,19 +247,16 @@ def verify_csrf_token(token: str, session_id: str, max_age_s: int = 3600) -> boo
 
 
 # --- Rate limiter (singleton) ---
-_rate_limiter: Optional[Limiter] = None
+_rate_limiter: Optional[RateLimiter] = None
 
 
 def _limiter_key_func(request: Request) -> str:
     session_id = request.cookies.get("ev3_session")
-    return session_id or get_remote_address(request)
+    return session_id or (request.client.host if request.client else "127.0.0.1")
 
 
-def get_rate_limiter() -> Limiter:
+def get_rate_limiter() -> RateLimiter:
     global _rate_limiter
     if _rate_limiter is None:
-        _rate_limiter = Limiter(
-            key_func=_limiter_key_func,
-            headers_enabled=True,
-        )
+        _rate_limiter = RateLimiter(key_func=_limiter_key_func)
     return _rate_limiter
@@ -147,6 +147,13 @@ export default function App() {
       setExplanationHtml(null)
       return
     }
+    if (res.status === 409 && json?.code === 'idempotency_conflict') {
+      // One answer per serve and step: a different choice needs a new item
+      setResult('This step was already answered. Load the next item to try again.')
+      setIsCorrect(null)
+      setExplanationHtml(null)
+      return
+    }
     setIsCorrect(Boolean(json.correct))
     setResult(json.correct ? 'Correct' : 'Incorrect')
     setExplanationHtml(json.explanation?.html ?? null)
@@ -0,0 +1,60 @@
+"""
+Rebuild the SQLite progress rollup (per-session, per-type attempts/correct) from attempt_events.
+
+/api/progress reads the rollup, which is maintained incrementally as events are written. The
+schema migration that creates it also backfills it once; run this after importing events by
+other means or to repair drift. The file backend keeps its rollups in memory and rebuilds a
+session's counters from the event log on first read, so it needs no backfill.
+
+Example (PowerShell, run from repo root):
+  python tools/backfill_progress.py
+  python tools/backfill_progress.py --db dev_state/app.db
+
+Exit behavior
+- Exit 0 with a single summary line on success
+- Exit 1 with a brief error line on failure
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend.app import db  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Rebuild progress_rollup from attempt_events", add_help=True)
+    parser.add_argument("--db", type=Path, default=db.DB_PATH, help="SQLite database (default: dev_state/app.db)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.db.exists():
+        print(f"Database not found: {args.db.as_posix()}", file=sys.stderr)
+        return 1
+    db.DB_PATH = args.db
+    db.DEV_DIR = args.db.parent
+    conn = db.connect()
+    version = db.migrate(conn)
+    started = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    rows = db.backfill_progress_rollup(conn)
+    conn.commit()
+    events = conn.execute("SELECT COUNT(*) FROM attempt_events").fetchone()[0]
+    print(f"Done: {rows} rollup rows from {events} events in {(time.perf_counter() - started) * 1000:.0f} ms (schema version {version})")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001 - top-level guard to keep output terse
+        print(f"Backfill failed ({type(exc).__name__}: {exc})", file=sys.stderr)
+        raise SystemExit(1)
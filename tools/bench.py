@@ -0,0 +1,604 @@
+"""
+Local micro-benchmarks for backend hot paths.
+
+Each subcommand builds a synthetic catalog in a temp directory (or uses --src) and
+prints one summary line per measured variant. Numbers are machine-dependent; compare
+variants within a single run rather than across machines.
+
+Example (PowerShell, run from repo root):
+  python tools/bench.py catalog-load --items 20000
+  python tools/bench.py serve --serves 50000
+  python tools/bench.py grade --steps 6
+  python tools/bench.py select --items 100000
+  python tools/bench.py select-shared --workers 1,2,4
+  python tools/bench.py events --events 5000
+  python tools/bench.py middleware --requests 5000
+  python tools/bench.py ratelimit --threads 1,4,16 --workers 4
+
+Exit behavior
+- Exit 0 after printing results
+- Exit 1 with a brief error line on failure
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from backend.app import selection, store, util  # noqa: E402
+from backend.app.catalog_snapshot import build_snapshot  # noqa: E402
+
+TYPES = ["TYPE_A", "TYPE_B", "TYPE_C", "LOREM_TYPE"]
+
+
+def make_item(n: int, steps: int = 2) -> Dict:
+    template_id = f"tpl_bench_{n % 50:03d}"
+    return {
+        "id": f"i_bench_{n:07d}",
+        "template_id": template_id,
+        "content_version": 1,
+        "type": TYPES[n % len(TYPES)],
+        "title": f"Bench Item {n}",
+        "content": {"html": f"Filler prompt {n}: \\( x \\) zizzle."},
+        "media": [
+            {"id": "fig1", "object_key": f"items/{template_id}/fig1.svg", "alt": "Placeholder figure 1"},
+        ],
+        "steps": [
+            {
+                "step_id": f"s{i}",
+                "prompt": {"html": f"Step {i}: filler prompt lorem \\( x \\) ipsum?"},
+                "choices": [{"id": cid, "text": f"{cid}-option"} for cid in ["A", "B", "C", "D"]],
+                "correct_choice_id": "B",
+                "explanation": {"html": "Filler explanation."},
+            }
+            for i in range(1, steps + 1)
+        ],
+        "final": {"answer_text": "B-option", "explanation": {"html": "n/a"}},
+        "tags": {"skill": f"skill_group_{n % 7}", "difficulty": random.choice(["E", "M", "H"])},
+        "generator_version": "bench_v1",
+    }
+
+
+def write_items(directory: Path, count: int) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    for n in range(count):
+        item = make_item(n)
+        (directory / f"{item['id']}.json").write_text(json.dumps(item, indent=2), encoding="utf-8")
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def report(label: str, count: int, seconds: float, unit: str = "items") -> None:
+    rate = count / seconds if seconds > 0 else float("inf")
+    print(f"{label:<32} {count:>8} {unit} in {seconds * 1000:9.1f} ms  -> {rate:12,.0f} {unit}/s")
+
+
+# --- Subcommands ---
+
+def bench_catalog_load(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        src = args.src or Path(tmp) / "canonical"
+        if args.src is None:
+            write_items(src, args.items)
+        snap = Path(tmp) / "catalog.snapshot"
+        build_snapshot(src, snap)
+        count = len(store.load_sources_from_files(src))
+        report("per-file glob + json.loads", count, timed(lambda: store.load_sources_from_files(src), args.repeat))
+        report("snapshot", count, timed(lambda: store.load_sources_from_snapshot(snap, src), args.repeat))
+        report(
+            "snapshot + Catalog indexes",
+            count,
+            timed(lambda: store.Catalog.from_docs(f.doc for f in store.load_sources_from_snapshot(snap, src).values()), args.repeat),
+        )
+
+
+def bench_serve(args: argparse.Namespace) -> None:
+    catalog = store.Catalog.from_docs(make_item(n) for n in range(args.items))
+    picks = [random.randrange(len(catalog)) for _ in range(args.serves)]
+
+    def per_request_transform() -> None:
+        for i in picks:
+            payload = util.canonical_to_serve(catalog[i], session_id="s_bench")
+            payload = util.randomize_choice_order(payload)
+            payload["serve"]["watermark"] = util.make_watermark("s_bench")
+            payload["serve"]["id"] = "serve_bench"
+
+    def precompiled_template() -> None:
+        for i in picks:
+            catalog.serve_template(i).render(session_id="s_bench", serve_id="serve_bench", watermark=util.make_watermark("s_bench"))
+
+    def template_generic_encoding() -> None:
+        for i in picks:
+            payload = catalog.serve_template(i).render(session_id="s_bench", serve_id="serve_bench", watermark=util.make_watermark("s_bench"))
+            util.encode_json(jsonable_encoder(payload))
+
+    def template_preencoded_bytes() -> None:
+        for i in picks:
+            catalog.serve_template(i).render_bytes(session_id="s_bench", serve_id="serve_bench", watermark=util.make_watermark("s_bench"))
+
+    report("canonical_to_serve (dict)", args.serves, timed(per_request_transform, args.repeat), "serves")
+    report("ServeTemplate.render (dict)", args.serves, timed(precompiled_template, args.repeat), "serves")
+    report("render + jsonable_encoder+dumps", args.serves, timed(template_generic_encoding, args.repeat), "serves")
+    report("render_bytes (pre-encoded)", args.serves, timed(template_preencoded_bytes, args.repeat), "serves")
+
+
+def _scan_grade(canonical: Dict, step_id: str | None, choice_id: str | None) -> bool:
+    """Reference: the per-request scan /api/answer used before grading keys."""
+    final_answer = ((canonical.get("final") or {}).get("answer_text") or "").strip()
+    steps = canonical.get("steps") or []
+    correct = None
+    if steps:
+        target = next((s for s in steps if step_id and s.get("step_id") == step_id), steps[0])
+        cid = target.get("correct_choice_id")
+        if isinstance(cid, str) and cid:
+            correct = choice_id == cid
+        else:
+            text = next(((ch.get("text") or "").strip() for ch in target.get("choices") or [] if ch.get("id") == choice_id), None)
+            if text is not None and final_answer:
+                correct = text == final_answer
+    if correct is None:
+        text = next(((ch.get("text") or "").strip() for ch in canonical.get("choices") or [] if ch.get("id") == choice_id), None)
+        correct = text == final_answer if (text is not None and final_answer) else False
+    return bool(correct)
+
+
+def bench_grade(args: argparse.Namespace) -> None:
+    docs = [make_item(n, steps=args.steps) for n in range(args.items)]
+    for n, doc in enumerate(docs):
+        if n % 2:  # half the items grade by choice text instead of correct_choice_id
+            for step in doc["steps"]:
+                step.pop("correct_choice_id", None)
+    catalog = store.Catalog.from_docs(docs)
+    subs = [
+        (i, f"s{random.randint(1, args.steps)}", random.choice("ABCD"))
+        for i in (random.randrange(len(catalog)) for _ in range(args.grades))
+    ]
+    mismatches = sum(_scan_grade(catalog[i], sid, cid) != catalog.grading_key(i).grade(sid, cid) for i, sid, cid in subs)
+    if mismatches:
+        raise RuntimeError(f"{mismatches} grading mismatches between scan and index")
+
+    def scan() -> None:
+        for i, sid, cid in subs:
+            _scan_grade(catalog[i], sid, cid)
+
+    def indexed() -> None:
+        for i, sid, cid in subs:
+            catalog.grading_key(i).grade(sid, cid)
+
+    report(f"scan steps/choices ({args.steps} steps)", args.grades, timed(scan, args.repeat), "grades")
+    report("GradingKey lookups", args.grades, timed(indexed, args.repeat), "grades")
+
+
+def bench_select(args: argparse.Namespace) -> None:
+    catalog = store.Catalog.from_docs({"id": f"i_bench_{n:07d}", "type": TYPES[n % len(TYPES)]} for n in range(args.items))
+    type_norm = TYPES[0].lower()
+
+    def copy_filter_shuffle() -> None:
+        # Previous approach: copy + filter the catalog per rebuild, pop(0) per serve
+        queue: List[store.ItemMeta] = []
+        for _ in range(args.selects):
+            if not queue:
+                queue = [m for m in list(catalog.meta) if (m.type or "").lower() == type_norm]
+                random.shuffle(queue)
+            queue.pop(0)
+
+    def ordinal_queue() -> None:
+        queue = None
+        rng = random.Random()  # one generator per session, as SelectionManager does
+        for _ in range(args.selects):
+            if not queue:
+                queue = selection._OrdinalQueue(catalog.type_ordinals(type_norm), rng=rng)
+            queue.pop()
+
+    def manager_rebuild_each_serve() -> None:
+        # Worst case for rebuilds: explicit type switch on every call
+        manager = selection.SelectionManager(recent_window=5)
+        for n in range(args.selects):
+            manager.next_meta("s_bench", catalog, target_type=TYPES[n % len(TYPES)])
+
+    def manager_same_type() -> None:
+        manager = selection.SelectionManager(recent_window=5)
+        for _ in range(args.selects):
+            manager.next_meta("s_bench", catalog, target_type=TYPES[0])
+
+    report("copy+filter+shuffle, pop(0)", args.selects, timed(copy_filter_shuffle, args.repeat), "selects")
+    report("per-type ordinals, lazy shuffle", args.selects, timed(ordinal_queue, args.repeat), "selects")
+    report("SelectionManager (same type)", args.selects, timed(manager_same_type, args.repeat), "selects")
+    report("SelectionManager (type switch)", args.selects, timed(manager_rebuild_each_serve, args.repeat), "selects")
+
+
+def _shared_worker(db_path: str, items: int, sessions: int, selects: int, window: int, seed: int, threads: int = 1) -> Tuple[int, int, List[Tuple[str, int, str]]]:
+    # Runs in a separate process: its own SelectionManager (``threads`` callers), shared state through SQLite
+    import threading
+
+    from backend.app import db, selection_repo
+
+    db.DB_PATH = Path(db_path)
+    db.DEV_DIR = db.DB_PATH.parent
+    catalog = store.Catalog.from_docs({"id": f"i_bench_{n:07d}", "type": TYPES[n % len(TYPES)]} for n in range(items))
+    manager = selection.SelectionManager(recent_window=window)
+    served: List[Tuple[str, int, str]] = []
+
+    def run(thread_seed: int, count: int) -> None:
+        rng = random.Random(thread_seed)
+        for _ in range(count):
+            sid = f"s_bench_{rng.randrange(sessions)}"
+            meta = manager.next_meta(sid, catalog)
+            state = manager._shard(sid).by_session.get(sid)
+            if meta is not None and state is not None:
+                served.append((sid, state.version, meta.id))
+
+    pool = [threading.Thread(target=run, args=(seed * 1000 + t, selects // threads)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return selects // threads * threads, manager.stats()["conflicts"], served
+
+
+def bench_select_shared(args: argparse.Namespace) -> None:
+    os.environ["DB_PERSIST_SELECTION"] = "1"
+    os.environ["SELECTION_SHARED_STATE"] = "1"
+    from backend.app import db, selection_repo
+
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_PATH = Path(tmp) / "app.db"
+            db.DEV_DIR = Path(tmp)
+            selection_repo.init_if_needed()
+            per_worker = args.selects // workers
+            jobs = [(str(db.DB_PATH), args.items, args.sessions, per_worker, 5, seed, args.threads) for seed in range(workers)]
+            with multiprocessing.get_context("spawn").Pool(workers) as pool:
+                pool.apply(os.getpid)  # start-up cost is not part of the measurement
+                started = time.perf_counter()
+                results = pool.starmap(_shared_worker, jobs)
+                elapsed = time.perf_counter() - started
+            # Row versions order each session's serves across processes: check the recent window
+            by_session: Dict[str, List[Tuple[int, str]]] = {}
+            for _, _, served in results:
+                for sid, version, item_id in served:
+                    by_session.setdefault(sid, []).append((version, item_id))
+            repeats = 0
+            for serves in by_session.values():
+                ids = [item_id for version, item_id in sorted(serves) if version > 0]
+                repeats += sum(1 for k, item_id in enumerate(ids) if item_id in ids[max(0, k - 5):k])
+            conflicts = sum(r[1] for r in results)
+            total = sum(r[0] for r in results)
+            report(f"{workers} worker(s) x {args.threads} thread(s)", total, elapsed, "selects")
+            print(f"{'':<32} conflicts={conflicts} window repeats={repeats}")
+
+
+def bench_events(args: argparse.Namespace) -> None:
+    os.environ["DB_PERSIST_SELECTION"] = "1"
+    from backend.app import db, selection_repo_db
+
+    event = {"session_id": "s_bench", "serve_id": "srv_bench", "item_id": "i_bench_0000001", "item_type": "TYPE_A", "action": "served"}
+    for label, pool in (("append_event, connect per call", "0"), ("append_event, pooled + WAL", "1")):
+        os.environ["DB_POOL"] = pool
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_PATH = Path(tmp) / "app.db"
+            db.DEV_DIR = Path(tmp)
+            selection_repo_db.init_db()
+            started = time.perf_counter()
+            for _ in range(args.events):
+                selection_repo_db.append_event(event)
+            report(label, args.events, time.perf_counter() - started, "events")
+            db.close_connection()
+    os.environ.pop("DB_POOL", None)
+
+    # Request-path cost through selection_repo: inline write vs enqueue to the group-commit writer
+    from backend.app import selection_repo
+
+    for label, writer in (("repo append_event, inline", "0"), ("repo append_event, enqueued", "1")):
+        os.environ["EVENT_WRITER"] = writer
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_PATH = Path(tmp) / "app.db"
+            db.DEV_DIR = Path(tmp)
+            selection_repo_db.init_db()
+            started = time.perf_counter()
+            for _ in range(args.events):
+                selection_repo.append_event(event)
+            report(label, args.events, time.perf_counter() - started, "events")
+            if writer == "1":
+                selection_repo.flush_events()
+                report("  ... until written (flush)", args.events, time.perf_counter() - started, "events")
+                selection_repo.shutdown_events()
+            db.close_connection()
+    os.environ.pop("EVENT_WRITER", None)
+
+
+async def _asgi_requests(app, path: str, count: int) -> float:
+    """Drive ``app`` with raw ASGI GETs (fresh session cookie each, so per-session limits never trip)."""
+    async def receive() -> Dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict) -> None:
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path} returned {message['status']}")
+
+    started = time.perf_counter()
+    for n in range(count):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+            "headers": [(b"host", b"bench.test"), (b"cookie", f"ev3_session=s_bench_{n}".encode())],
+            "client": ("127.0.0.1", 50000), "server": ("bench.test", 80),
+        }
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+
+def bench_middleware(args: argparse.Namespace) -> None:
+
+    from starlette.middleware import Middleware
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    from backend.app.main import app
+    from backend.app.middleware import SecurityHeadersMiddleware
+
+    async def legacy_csp(request, call_next):
+        # Previous per-request CSP: rebuilt from env, applied through BaseHTTPMiddleware
+        response = await call_next(request)
+        extras = [o.strip() for o in os.environ.get("IMG_SRC_EXTRA", "").strip().split(",") if o.strip()]
+        img_sources = ["'self'"] + extras
+        csp = f"default-src 'self'; img-src {' '.join(img_sources)}; script-src 'self'; style-src 'self' 'unsafe-inline'"
+        response.headers.setdefault("Content-Security-Policy", csp)
+        return response
+
+    current = list(app.user_middleware)
+    legacy = [Middleware(BaseHTTPMiddleware, dispatch=legacy_csp) if m.cls is SecurityHeadersMiddleware else m for m in current]
+    stacks = (("BaseHTTP CSP hook", legacy), ("pure ASGI", current))
+
+    async def run() -> None:
+        await app.router.startup()
+        try:
+            for path in ("/api/health", "/api/item/next"):
+                for label, middleware in stacks:
+                    app.user_middleware = middleware
+                    app.middleware_stack = app.build_middleware_stack()
+                    await _asgi_requests(app, path, min(200, args.requests))  # warm-up
+                    best = min([await _asgi_requests(app, path, args.requests) for _ in range(max(1, args.repeat))])
+                    report(f"{path} {label}", args.requests, best, "req")
+        finally:
+            app.user_middleware = current
+            app.middleware_stack = None
+            await app.router.shutdown()
+
+    asyncio.run(run())
+
+
+def _decide_loop(hit: Callable[[str], object], keys: List[str], decisions: int, samples: List[float]) -> None:
+    local = []
+    for n in range(decisions):
+        started = time.perf_counter()
+        hit(keys[n % len(keys)])
+        local.append(time.perf_counter() - started)
+    samples.extend(local)
+
+
+async def _limiter_loop_lag(hit: Callable[[str], Any], keys: List[str], clients: int, per_client: int, hold_s: float) -> float:
+    # Worst delay of a 1 ms ticker while ``clients`` tasks make decisions and another connection
+    # holds the SQLite write lock for ``hold_s`` (a busy writer in another worker process)
+    import sqlite3
+    import threading
+
+    from backend.app import db
+
+    lag = 0.0
+    done = False
+
+    async def ticker() -> None:
+        nonlocal lag
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - started - 0.001)
+
+    async def client(c: int) -> None:
+        for n in range(per_client):
+            await hit(keys[(c * per_client + n) % len(keys)])
+            await asyncio.sleep(0)
+
+    def writer(locked: threading.Event) -> None:
+        conn = sqlite3.connect(db.DB_PATH, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        locked.set()
+        time.sleep(hold_s)
+        conn.execute("COMMIT")
+        conn.close()
+
+    locked = threading.Event()
+    holder = threading.Thread(target=writer, args=(locked,))
+    holder.start()
+    locked.wait()
+    tick = asyncio.create_task(ticker())
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    done = True
+    await tick
+    holder.join()
+    return lag * 1000
+
+
+def _rate_worker(db_path: str, attempts: int, busy_timeout_ms: int) -> Tuple[int, int]:
+    # One worker process hammering a single shared key; returns (allowed, busy fallbacks)
+    from backend.app import db, rate_limit
+
+    db.DB_PATH = Path(db_path)
+    db.DEV_DIR = Path(db_path).parent
+    buckets = rate_limit.SQLiteBuckets(rate_limit.MemoryBuckets(), busy_timeout_ms=busy_timeout_ms)
+    rate = rate_limit.parse_rate("30/minute")
+    allowed = sum(1 for _ in range(attempts) if buckets.hit("route\x1fs_shared", rate, time.time()).allowed)
+    return (allowed if buckets.errors == 0 else -1), buckets.busy
+
+
+def bench_ratelimit(args: argparse.Namespace) -> None:
+    import threading
+
+    from backend.app import db, rate_limit
+
+    rate = rate_limit.parse_rate("30/minute")
+    variants: List[Tuple[str, Callable[[], Callable[[str], object]]]] = []
+    try:
+        from limits import parse as parse_limit
+        from limits.storage import MemoryStorage
+        from limits.strategies import FixedWindowRateLimiter
+
+        def slowapi_storage() -> Callable[[str], object]:
+            # What slowapi's default Limiter did per decision (decorator overhead not included)
+            limiter, item = FixedWindowRateLimiter(MemoryStorage()), parse_limit("30/minute")
+            return lambda key: limiter.hit(item, key)
+
+        variants.append(("limits fixed window (slowapi)", slowapi_storage))
+    except ImportError:
+        print("limits not installed: skipping the slowapi baseline")
+    for shards in (1, 16):
+        variants.append((f"memory buckets, {shards} shard(s)", lambda shards=shards: (lambda key, b=rate_limit.MemoryBuckets(shards=shards): b.hit(key, rate, time.time()))))
+    busy_ms = args.busy_timeout_ms
+    variants.append(("sqlite buckets (shared)", lambda: (lambda key, b=rate_limit.SQLiteBuckets(rate_limit.MemoryBuckets(), busy_timeout_ms=busy_ms): b.hit(key, rate, time.time()))))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "app.db"
+        db.DEV_DIR = Path(tmp)
+        keys = [f"route\x1fs_bench_{n}" for n in range(args.keys)]
+        for label, make in variants:
+            for threads in args.threads:
+                hit = make()
+                samples: List[float] = []
+                per_thread = max(1, args.decisions // threads)
+                pool = [threading.Thread(target=_decide_loop, args=(hit, keys, per_thread, samples)) for _ in range(threads)]
+                started = time.perf_counter()
+                for t in pool:
+                    t.start()
+                for t in pool:
+                    t.join()
+                elapsed = time.perf_counter() - started
+                samples.sort()
+                p50, p99 = (samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6 for q in (0.50, 0.99))
+                report(f"{label}, {threads} thread(s)", len(samples), elapsed, "decisions")
+                print(f"{'':<32} p50 {p50:7.1f} us  p99 {p99:8.1f} us")
+            db.close_connection()
+
+        # Event-loop lag while a writer holds the lock: inline decisions (before) vs the limiter's executor path
+        from backend.app import selection_repo_async
+
+        print("event-loop lag, 16 clients x 20 decisions, write lock held 200 ms by another connection:")
+        inline = rate_limit.SQLiteBuckets(rate_limit.MemoryBuckets(), busy_timeout_ms=5000)
+
+        async def inline_hit(key: str) -> object:
+            return inline.hit(key, rate, time.time())
+
+        offloaded = rate_limit.SQLiteBuckets(rate_limit.MemoryBuckets(), busy_timeout_ms=busy_ms)
+        limiter = rate_limit.RateLimiter(lambda request: request, offloaded)
+        for label, hit, buckets in (
+            ("inline, 5000 ms busy timeout", inline_hit, inline),
+            (f"executor, {busy_ms} ms busy timeout", lambda key: limiter.hit("bench", key, rate), offloaded),
+        ):
+            lag_ms = asyncio.run(_limiter_loop_lag(hit, keys, 16, 20, 0.2))
+            print(f"  {label:<32} max tick lag {lag_ms:7.1f} ms  busy fallbacks {buckets.busy}")
+        selection_repo_async.shutdown()
+
+        # Shared limit across processes: one key, N workers; memory buckets would allow N x 30
+        ctx = multiprocessing.get_context("spawn")
+        shared_db = Path(tmp) / "shared.db"
+        with ctx.Pool(args.workers) as pool:
+            results = pool.starmap(_rate_worker, [(str(shared_db), 100, args.busy_timeout_ms)] * args.workers)
+        allowed = [a for a, _ in results]
+        if min(allowed) < 0:
+            raise RuntimeError("sqlite backend failed and fell back to memory buckets")
+        busy = sum(b for _, b in results)
+        print(
+            f"{args.workers} worker(s) x 100 requests on one key at 30/minute, sqlite: {sum(allowed)} allowed "
+            f"(per worker {allowed}; {busy} busy fallback(s) at {args.busy_timeout_ms} ms busy timeout)"
+        )
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backend micro-benchmarks", add_help=True)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("catalog-load", help="Startup catalog load: per-file glob vs compiled snapshot")
+    p.add_argument("--items", type=int, default=10000, help="Synthetic items to generate (default: 10000)")
+    p.add_argument("--src", type=Path, default=None, help="Use an existing canonical directory instead")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per variant; best time is reported (default: 3)")
+    p.set_defaults(func=bench_catalog_load)
+
+    p = sub.add_parser("serve", help="Serve snapshot build and encoding: per-request vs precompiled/pre-encoded")
+    p.add_argument("--items", type=int, default=1000, help="Synthetic catalog size (default: 1000)")
+    p.add_argument("--serves", type=int, default=20000, help="Serves per run (default: 20000)")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per variant; best time is reported (default: 3)")
+    p.set_defaults(func=bench_serve)
+
+    p = sub.add_parser("grade", help="Answer grading: per-request step/choice scan vs precompiled grading keys")
+    p.add_argument("--items", type=int, default=1000, help="Synthetic catalog size (default: 1000)")
+    p.add_argument("--steps", type=int, default=6, help="Steps per item (default: 6)")
+    p.add_argument("--grades", type=int, default=50000, help="Grades per run (default: 50000)")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per variant; best time is reported (default: 3)")
+    p.set_defaults(func=bench_grade)
+
+    p = sub.add_parser("select", help="Selection queue rebuild/pop cost against catalog size")
+    p.add_argument("--items", type=int, default=100000, help="Synthetic catalog size (default: 100000)")
+    p.add_argument("--selects", type=int, default=2000, help="Selections per run (default: 2000)")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per variant; best time is reported (default: 3)")
+    p.set_defaults(func=bench_select)
+
+    p = sub.add_parser("select-shared", help="Shared selection state: throughput from 1 to N worker processes")
+    p.add_argument("--workers", type=lambda v: [int(x) for x in v.split(",") if x], default=[1, 2, 4], help="Comma-separated process counts (default: 1,2,4)")
+    p.add_argument("--items", type=int, default=10000, help="Synthetic catalog size (default: 10000)")
+    p.add_argument("--sessions", type=int, default=200, help="Sessions shared by all workers (default: 200)")
+    p.add_argument("--selects", type=int, default=4000, help="Total selections per run, split across workers (default: 4000)")
+    p.add_argument("--threads", type=int, default=1, help="Concurrent callers per worker process (default: 1)")
+    p.set_defaults(func=bench_select_shared)
+
+    p = sub.add_parser("events", help="SQLite append_event throughput: per-call vs pooled connections, inline vs group-commit writer")
+    p.add_argument("--events", type=int, default=2000, help="Events per variant (default: 2000)")
+    p.set_defaults(func=bench_events)
+
+    p = sub.add_parser("middleware", help="Requests through the full middleware stack: BaseHTTPMiddleware vs pure ASGI")
+    p.add_argument("--requests", type=int, default=3000, help="Requests per path and variant (default: 3000)")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per variant; best time is reported (default: 3)")
+    p.set_defaults(func=bench_middleware)
+
+    p = sub.add_parser("ratelimit", help="Rate-limit decision latency under thread contention, and the shared limit across processes")
+    p.add_argument("--threads", type=lambda v: [int(x) for x in v.split(",") if x], default=[1, 4, 16], help="Comma-separated thread counts (default: 1,4,16)")
+    p.add_argument("--decisions", type=int, default=40000, help="Decisions per run, split across threads (default: 40000)")
+    p.add_argument("--keys", type=int, default=1000, help="Distinct client keys (default: 1000)")
+    p.add_argument("--workers", type=int, default=4, help="Processes sharing one SQLite-backed key (default: 4)")
+    p.add_argument("--busy-timeout-ms", type=int, default=50, help="SQLite buckets' busy timeout (default: 50)")
+    p.set_defaults(func=bench_ratelimit)
+
+    return parser.parse_args(argv)
+
+
+def main() -> int:
+    args = parse_args()
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001 - top-level guard to keep output terse
+        print(f"Benchmark failed ({type(exc).__name__}: {exc})", file=sys.stderr)
+        raise SystemExit(1)
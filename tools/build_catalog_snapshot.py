@@ -0,0 +1,62 @@
+"""
+Compile canonical JSON items into a single catalog snapshot file.
+
+The backend loads this snapshot at startup instead of parsing every file under
+data/canonical (falls back to the per-file glob when the snapshot is missing,
+corrupt, or stale: any source file added, removed, or edited since the build).
+
+Example (PowerShell, run from repo root):
+  python tools/build_catalog_snapshot.py
+  python tools/build_catalog_snapshot.py --src data/canonical --out data/catalog.snapshot
+
+Exit behavior
+- Exit 0 with a single summary line on success
+- Exit 1 with a brief error line on failure
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend.app.catalog_snapshot import build_snapshot  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compile canonical items into a catalog snapshot", add_help=True)
+    parser.add_argument(
+        "--src",
+        type=Path,
+        default=ROOT / "data" / "canonical",
+        help="Directory of canonical JSON files (default: data/canonical)",
+    )
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=ROOT / "data" / "catalog.snapshot",
+        help="Snapshot file to write (default: data/catalog.snapshot)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.src.is_dir():
+        print(f"Canonical directory not found: {args.src.as_posix()}", file=sys.stderr)
+        return 1
+    count = build_snapshot(args.src, args.out)
+    size_kb = args.out.stat().st_size / 1024
+    print(f"Done: wrote {count} items to {args.out.as_posix()} ({size_kb:.1f} KiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001 - top-level guard to keep output terse
+        print(f"Snapshot build failed ({type(exc).__name__}: {exc})", file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,103 @@
+"""
+Check that the SQLite schema migrates cleanly and that event queries stay index-backed.
+
+Runs the migrations on a fresh temporary database (and a second time, to confirm they are
+idempotent), loads some synthetic rows, refreshes statistics, and asserts via
+EXPLAIN QUERY PLAN that per-session, per-item and time-range queries (including the keyset-paged
+CSV export queries) on attempt_events use
+an index rather than scanning the table.
+
+Example (PowerShell, run from repo root):
+  python tools/check_db_indexes.py
+  python tools/check_db_indexes.py --rows 200000
+
+Exit behavior
+- Exit 0 with one line per checked query when all plans use an index
+- Exit 1 listing the offending plans otherwise
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend.app import db  # noqa: E402
+from backend.app.selection_repo_db import (  # noqa: E402
+    EVENTS_PAGE_FOR_SESSION_SQL,
+    EVENTS_PAGE_IN_RANGE_SQL,
+    READ_EVENTS_FOR_SESSION_SQL,
+)
+
+# (label, sql, params, index expected in the plan)
+QUERIES: List[Tuple[str, str, tuple, str]] = [
+    ("events for session", READ_EVENTS_FOR_SESSION_SQL, ("s_check_7",), "idx_attempt_events_session"),
+    ("events for item", "SELECT id, session_id FROM attempt_events WHERE item_id=?", ("i_check_0003",), "idx_attempt_events_item"),
+    (
+        "events in time range",
+        "SELECT id FROM attempt_events WHERE ts >= ? AND ts < ? ORDER BY ts",
+        ("2025-01-01T00:00:00", "2025-01-02T00:00:00"),
+        "idx_attempt_events_ts",
+    ),
+    ("export page for session", EVENTS_PAGE_FOR_SESSION_SQL, ("s_check_7", 100, 1000), "idx_attempt_events_session"),
+    (
+        "export page in range",
+        EVENTS_PAGE_IN_RANGE_SQL,
+        ("2025-01-01T00:00:00", 100, "2025-01-02T00:00:00", 1000),
+        "idx_attempt_events_ts",
+    ),
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Verify schema migrations and index-backed event queries", add_help=True)
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic attempt_events rows (default: 20000)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "app.db"
+        db.DEV_DIR = Path(tmp)
+        conn = db.connect()
+        version = db.migrate(conn)
+        if db.migrate(conn) != version or version != db.MIGRATIONS[-1][0]:
+            failures.append(f"schema version {version} != latest {db.MIGRATIONS[-1][0]} or re-run changed it")
+        conn.executemany(
+            "INSERT INTO attempt_events(ts, session_id, item_id, item_type, action, correct) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (f"2025-01-{1 + n % 28:02d}T00:00:{n % 60:02d}", f"s_check_{n % 997}", f"i_check_{n % 5000:04d}", "TYPE_A", "answered", n % 2)
+                for n in range(args.rows)
+            ),
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+        for label, sql, params, index in QUERIES:
+            plan = " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+            ok = index in plan and "SCAN attempt_events" not in plan.replace(f"USING INDEX {index}", "")
+            print(f"{'OK ' if ok else 'BAD'} {label:<24} {plan}")
+            if not ok:
+                failures.append(f"{label}: expected {index}, got: {plan}")
+        db.close_connection()
+    if failures:
+        print(f"FAILED: {len(failures)} check(s)", file=sys.stderr)
+        for line in failures:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print(f"Done: schema version {version}, {len(QUERIES)} queries index-backed")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001 - top-level guard to keep output terse
+        print(f"Index check failed ({type(exc).__name__}: {exc})", file=sys.stderr)
+        raise SystemExit(1)
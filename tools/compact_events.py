@@ -0,0 +1,60 @@
+"""
+Compact the file-backend event log (dev_state/events/) and apply retention.
+
+Rewrites all segments into fresh, full segments with rebuilt session indexes, dropping
+events older than --retain-days and then the oldest segments beyond --max-segments.
+A legacy dev_state/events.ndjson is adopted first. Run with the backend stopped.
+
+Example (PowerShell, run from repo root):
+  python tools/compact_events.py
+  python tools/compact_events.py --retain-days 30 --max-segments 20
+
+Exit behavior
+- Exit 0 with a single summary line on success
+- Exit 1 with a brief error line on failure
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend.app.event_log import SegmentedEventLog, segment_bytes_from_env  # noqa: E402
+from backend.app.selection_repo import EVENTS_DIR, EVENTS_PATH  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compact the segmented event log and apply retention", add_help=True)
+    parser.add_argument("--dir", type=Path, default=EVENTS_DIR, help="Event log directory (default: dev_state/events)")
+    parser.add_argument("--retain-days", type=float, default=None, help="Drop events older than this many days")
+    parser.add_argument("--max-segments", type=int, default=None, help="Keep at most this many segments (oldest dropped)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    legacy = EVENTS_PATH if args.dir == EVENTS_DIR else None
+    if not args.dir.is_dir() and not (legacy and legacy.exists()):
+        print(f"Event log not found: {args.dir.as_posix()}", file=sys.stderr)
+        return 1
+    log = SegmentedEventLog(args.dir, segment_bytes=segment_bytes_from_env(), legacy_path=legacy)
+    before = log.stats()
+    result = log.compact(retain_days=args.retain_days, max_segments=args.max_segments)
+    after = log.stats()
+    print(
+        f"Done: kept {result['kept']} events, dropped {result['dropped']}; "
+        f"segments {before['segments']} -> {after['segments']}, {before['bytes'] / 1024:.1f} -> {after['bytes'] / 1024:.1f} KiB"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001 - top-level guard to keep output terse
+        print(f"Compaction failed ({type(exc).__name__}: {exc})", file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,132 @@
+"""
+In-process load test for the item/answer request path (no server needed).
+
+Drives the ASGI app through httpx's ASGITransport with N concurrent virtual users, each with
+its own session: GET /api/item/next, then POST /api/answer for the served item. Reports
+throughput and p50/p99 latency per concurrency level, and the highest level whose p99 stays
+within --slo-ms. Rate limiting is disabled for the run. Set persistence env vars (for example
+DB_PERSIST_SELECTION=1) to include SQLite/file I/O; dev_state is redirected to a temp dir.
+
+Example (PowerShell, run from repo root):
+  python tools/load_test.py
+  $env:DB_PERSIST_SELECTION="1"; python tools/load_test.py --concurrency 8,32,128,256 --requests 4000
+
+Exit behavior
+- Exit 0 after printing one line per concurrency level and a summary line
+- Exit 1 with a brief error line on failure
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Concurrent item/answer load test against the in-process app", add_help=True)
+    parser.add_argument("--concurrency", default="8,32,128,256", help="Comma-separated virtual user counts (default: 8,32,128,256)")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per level, split across users (default: 2000)")
+    parser.add_argument("--slo-ms", type=float, default=50.0, help="p99 latency budget used for the capacity summary (default: 50)")
+    return parser.parse_args()
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def user(client, iterations: int, latencies: List[float]) -> None:
+    resp = await client.post("/api/session")
+    headers = {"X-CSRF-Token": resp.json()["csrf_token"]}
+    for _ in range(iterations):
+        started = time.perf_counter()
+        item = (await client.get("/api/item/next")).json()
+        latencies.append(time.perf_counter() - started)
+        step = ((item.get("item") or {}).get("steps") or [{}])[0]
+        choices = step.get("choices") or [{}]
+        body = {
+            "session_id": item.get("session_id", ""),
+            "item_id": (item.get("item") or {}).get("id", ""),
+            "step_id": step.get("step_id"),
+            "choice_id": choices[0].get("id"),
+            "serve_id": (item.get("serve") or {}).get("id"),
+        }
+        started = time.perf_counter()
+        resp = await client.post("/api/answer", json=body, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        if resp.status_code != 200:
+            raise RuntimeError(f"/api/answer returned {resp.status_code}")
+
+
+async def run_level(app, users: int, total: int) -> Dict[str, float]:
+    import httpx
+
+    iterations = max(1, total // (2 * users))
+    latencies: List[float] = []
+    transport = httpx.ASGITransport(app=app)
+    clients = [httpx.AsyncClient(transport=transport, base_url="http://load.test") for _ in range(users)]
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(c, iterations, latencies) for c in clients))
+        elapsed = time.perf_counter() - started
+    finally:
+        await asyncio.gather(*(c.aclose() for c in clients))
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "n": len(latencies),
+    }
+
+
+async def run(args: argparse.Namespace) -> int:
+    from backend.app import db, selection_repo
+    from backend.app.main import app
+
+    with tempfile.TemporaryDirectory(prefix="ev3_load_") as tmp_name:
+        tmp = Path(tmp_name)
+        selection_repo.DEV_DIR = tmp
+        selection_repo.STATE_PATH = tmp / "selection_state.json"
+        selection_repo.EVENTS_PATH = tmp / "events.ndjson"
+        selection_repo.EVENTS_DIR = tmp / "events"
+        db.DEV_DIR = tmp
+        db.DB_PATH = tmp / "app.db"
+        selection_repo.init_if_needed()
+        app.state.limiter.enabled = False
+        await app.router.startup()
+        capacity = 0
+        try:
+            for users in [int(x) for x in args.concurrency.split(",") if x.strip()]:
+                r = await run_level(app, users, args.requests)
+                ok = r["p99"] <= args.slo_ms
+                if ok:
+                    capacity = max(capacity, users)
+                print(
+                    f"users={users:<5} requests={r['n']:<6} {r['rps']:8.0f} req/s  "
+                    f"p50 {r['p50']:6.2f} ms  p99 {r['p99']:7.2f} ms  {'within' if ok else 'over'} SLO"
+                )
+        finally:
+            await app.router.shutdown()
+            db.close_connection()
+    print(f"Done: highest concurrency with p99 <= {args.slo_ms:g} ms: {capacity or 'none'}")
+    return 0
+
+
+def main() -> int:
+    return asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001 - top-level guard to keep output terse
+        print(f"Load test failed ({type(exc).__name__}: {exc})", file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,56 @@
+"""
+Regenerate the per-step choice orders of a past serve from its item id and serve seed.
+
+Serve randomness is derived from (item.id, serve.seed), so the seed logged with a serve is
+enough to reconstruct exactly what the learner saw (given the same item content).
+Only choice order is replayed: item selection (which item was served next) uses a
+per-session generator that is not logged.
+
+Example (PowerShell, run from repo root):
+  python tools/replay_serve.py --item i_type_a_001 --seed 9f2c4e1a0b7d3c55
+
+Exit behavior
+- Exit 0 printing one line per step: step_id and its choice order
+- Exit 1 with a brief error line when the item is not found or on failure
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend.app import store  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reconstruct a serve's choice orders from (item_id, seed)", add_help=True)
+    parser.add_argument("--item", required=True, help="Canonical item id")
+    parser.add_argument("--seed", required=True, help="serve.seed from the served snapshot or logs")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    store.load_mocks()
+    catalog = store.get_catalog()
+    ordinal = catalog.ordinal(args.item)
+    if ordinal is None:
+        print(f"Item not found: {args.item}", file=sys.stderr)
+        return 1
+    template = catalog.serve_template(ordinal)
+    step_ids = [step.get("step_id") for step in template.render(session_id="", shuffle=False)["item"].get("steps", [])]
+    for step_id, order in zip(step_ids, template.choice_orders(args.seed)):
+        print(f"{step_id}: {','.join(str(c) for c in order)}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001 - top-level guard to keep output terse
+        print(f"Replay failed ({type(exc).__name__}: {exc})", file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,169 @@
+"""
+Concurrency stress test for SelectionManager (lock striping by session id).
+
+Many threads drive many sessions against a synthetic in-memory catalog:
+- owned sessions: each is driven by exactly one thread, so its full serve sequence is known
+  and must never repeat an item within the recent window;
+- shared sessions: every thread hits them concurrently (single and batch selection, type
+  switches, playlist set/clear); each batch must be repeat-free within the window and the
+  final session state must be internally consistent.
+Afterwards the manager counters are checked against what the threads observed.
+
+Example (PowerShell, run from repo root):
+  python tools/stress_selection.py
+  python tools/stress_selection.py --threads 32 --sessions 2000 --ops 5000 --shards 16
+
+Exit behavior
+- Exit 0 with a single summary line when all invariants hold
+- Exit 1 listing the first violations otherwise
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+TYPES = ["TYPE_A", "TYPE_B", "TYPE_C", "LOREM_TYPE"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Stress SelectionManager from many threads", add_help=True)
+    parser.add_argument("--threads", type=int, default=16, help="Worker threads (default: 16)")
+    parser.add_argument("--sessions", type=int, default=500, help="Owned sessions, split across threads (default: 500)")
+    parser.add_argument("--shared", type=int, default=8, help="Sessions hit by every thread (default: 8)")
+    parser.add_argument("--ops", type=int, default=2000, help="Operations per thread (default: 2000)")
+    parser.add_argument("--items", type=int, default=400, help="Synthetic catalog size (default: 400)")
+    parser.add_argument("--window", type=int, default=5, help="Recent window (default: 5)")
+    parser.add_argument("--shards", type=int, default=16, help="SELECTION_SHARDS for the run (default: 16)")
+    return parser.parse_args()
+
+
+def check_window(ids: List[str], window: int) -> int:
+    """Return the index of the first repeat within ``window`` previous serves, or -1."""
+    for k, item_id in enumerate(ids):
+        if item_id in ids[max(0, k - window):k]:
+            return k
+    return -1
+
+
+def main() -> int:
+    args = parse_args()
+    os.environ["SELECTION_SHARDS"] = str(args.shards)
+    # Room for every session: eviction without persistence would (correctly) forget recent windows
+    os.environ["SELECTION_MAX_SESSIONS"] = str((args.sessions + args.shared) * args.shards)
+    os.environ.pop("DEV_PERSIST_SELECTION", None)
+    os.environ.pop("DB_PERSIST_SELECTION", None)
+
+    from backend.app.selection import SelectionManager
+    from backend.app.store import Catalog
+
+    catalog = Catalog.from_docs({"id": f"i_stress_{n:05d}", "type": TYPES[n % len(TYPES)]} for n in range(args.items))
+    all_ids = list(catalog.ids())
+    manager = SelectionManager(recent_window=args.window)
+    shared = [f"s_shared_{n}" for n in range(args.shared)]
+    owned: Dict[int, List[str]] = {t: [f"s_own_{t}_{n}" for n in range(t, args.sessions, args.threads)] for t in range(args.threads)}
+    sequences: Dict[str, List[str]] = {sid: [] for sids in owned.values() for sid in sids}
+    served = Counter()
+    errors: List[str] = []
+    start = threading.Barrier(args.threads)
+
+    def worker(t: int) -> None:
+        rng = random.Random(t)
+        mine = owned[t]
+        local = Counter()
+        start.wait()
+        try:
+            for _ in range(args.ops):
+                roll = rng.random()
+                if mine and roll < 0.6:
+                    sid = rng.choice(mine)
+                    meta = manager.next_meta(sid, catalog, target_type=rng.choice([None, None, None, rng.choice(TYPES)]))
+                    if meta is not None:
+                        sequences[sid].append(meta.id)
+                        local[sid] += 1
+                    continue
+                sid = rng.choice(shared)
+                if roll < 0.85:
+                    batch = [m.id for m in manager.next_metas(sid, catalog, rng.randint(1, 10), policy=rng.choice([None, "simple"]))]
+                    if check_window(batch, args.window) >= 0:
+                        errors.append(f"{sid}: repeat within window in batch {batch}")
+                    local[sid] += len(batch)
+                elif roll < 0.95:
+                    meta = manager.next_meta(sid, catalog, target_type=rng.choice(TYPES))
+                    local[sid] += meta is not None
+                elif roll < 0.98:
+                    manager.set_playlist(sid, rng.sample(all_ids, 12))
+                else:
+                    manager.clear_playlist(sid)
+        except Exception as exc:  # noqa: BLE001 - surface any worker crash as a violation
+            errors.append(f"thread {t}: {type(exc).__name__}: {exc}")
+        with lock:
+            served.update(local)
+
+    lock = threading.Lock()
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(args.threads)]
+    started = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - started
+
+    for sid, ids in sequences.items():
+        k = check_window(ids, args.window)
+        if k >= 0:
+            errors.append(f"{sid}: {ids[k]} repeated within window at serve {k}")
+        if len(ids) != served[sid]:
+            errors.append(f"{sid}: recorded {len(ids)} serves, counted {served[sid]}")
+
+    stats = manager.stats()
+    touched = sum(1 for sid in sequences if served[sid]) + len(shared)
+    if stats["evictions"]:
+        errors.append(f"unexpected evictions: {stats['evictions']}")
+    if stats["resident"] != touched:
+        errors.append(f"resident sessions {stats['resident']} != touched sessions {touched}")
+    if stats["resident"] > stats["capacity"]:
+        errors.append(f"resident sessions {stats['resident']} exceed capacity {stats['capacity']}")
+    for shard in manager._shards:
+        with shard.lock:
+            for sid, state in shard.by_session.items():
+                recent = list(state.recent_ids)
+                # A playlist with fewer eligible items than the window repeats by design (recent is kept)
+                if len(set(recent)) != len(recent) and not state.playlist_ids:
+                    errors.append(f"{sid}: duplicate ids in recent window {recent}")
+                if state.serves_in_current_type < 0:
+                    errors.append(f"{sid}: negative serves_in_current_type")
+                if sid in sequences and sequences[sid]:
+                    tail = sequences[sid][-len(recent):]
+                    if recent and tail != recent:
+                        errors.append(f"{sid}: recent window {recent} != last serves {tail}")
+
+    total = sum(served.values())
+    if errors:
+        print(f"FAILED: {len(errors)} violation(s)", file=sys.stderr)
+        for line in errors[:20]:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print(
+        f"OK: {total} selections by {args.threads} threads over {touched} sessions in {elapsed:.2f}s "
+        f"({total / elapsed:,.0f}/s); shards={stats['shards']} resident={stats['resident']} evictions={stats['evictions']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001 - top-level guard to keep output terse
+        print(f"Stress run failed ({type(exc).__name__}: {exc})", file=sys.stderr)
+        raise SystemExit(1)